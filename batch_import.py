@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""Streaming Excel/CSV import for batch screening.
+
+Workbook columns are matched to the ``FIELD_SOURCE_MAP`` keys (the key
+itself, its title, the rules-card label such as ``\u8425\u4e1a\u6536\u5165 (C)``, or the bare
+letter). Rows are read in read-only / line-by-line mode and handed to the rule
+checker one chunk at a time, so a 500k-row \u91d1\u7a0e\u4e09\u671f export never sits in
+memory as a whole.
+"""
+import csv
+import os
+from collections import namedtuple
+from time import perf_counter
+
+from rule_engine import FIELD_KEYS, FIELD_SOURCE_MAP
+from benefits import TAX_ITEMS, SHOULD_SUFFIX, ENJOYED_SUFFIX, should_key, enjoyed_key
+from rule_columns import to_columns, evaluate_columns, issues_from_masks
+from metrics import METRICS
+
+CREDIT_CODE_KEY = "\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801"
+COMPANY_NAME_KEY = "\u4f01\u4e1a\u540d\u79f0"
+
+CHUNK_SIZE = 5000
+
+ScreenedRow = namedtuple("ScreenedRow", "row credit_code record issues error")
+
+
+def _header_aliases():
+    aliases = {
+        CREDIT_CODE_KEY: CREDIT_CODE_KEY,
+        "\u7edf\u4e00\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801": CREDIT_CODE_KEY,
+        "\u7eb3\u7a0e\u4eba\u8bc6\u522b\u53f7": CREDIT_CODE_KEY,
+        COMPANY_NAME_KEY: COMPANY_NAME_KEY,
+        "\u7eb3\u7a0e\u4eba\u540d\u79f0": COMPANY_NAME_KEY,
+    }
+    for key in FIELD_KEYS:
+        letter, _ = key.split("_", 1)
+        title = FIELD_SOURCE_MAP[key]["title"]
+        for alias in (key, letter, title, f"{title} ({letter})", f"{title}({letter})"):
+            aliases.setdefault(alias, key)
+    # Exports spell K with the usual character; the form key keeps its own.
+    k_key = next(k for k in FIELD_KEYS if k.startswith("K_"))
+    for alias in ("\u8ba1\u63d0\u6298\u65e7", "\u8ba1\u63d0\u6298\u65e7 (K)", "\u8ba1\u63d0\u6298\u65e7(K)"):
+        aliases.setdefault(alias, k_key)
+    for item in TAX_ITEMS:
+        for suffix, key in ((SHOULD_SUFFIX, should_key(item)), (ENJOYED_SUFFIX, enjoyed_key(item))):
+            for alias in (key, f"{item}{suffix}", f"{item}{suffix[:2]}"):
+                aliases.setdefault(alias, key)
+    return aliases
+
+
+HEADER_ALIASES = _header_aliases()
+
+
+def map_header(header):
+    """Return the record key for each column (None for unrecognised columns)."""
+    return [HEADER_ALIASES.get(str(h).strip()) if h is not None else None for h in header]
+
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        # openpyxl hands back floats for numeric cells; avoid "1e+16" style
+        # text, but let genuine third decimals through to fail validation.
+        if value.is_integer():
+            return str(int(value))
+        if abs(value * 100 - round(value * 100)) > 1e-6:
+            return repr(value)
+        return f"{value:.2f}"
+    return str(value).strip()
+
+
+def _rows_xlsx(path, sheet=None):
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.active
+        yield from ws.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _rows_csv(path, encoding):
+    with open(path, newline="", encoding=encoding) as fh:
+        yield from csv.reader(fh)
+
+
+def iter_rows(path, sheet=None, encoding="utf-8-sig"):
+    """Yield raw rows (header first) from an .xlsx/.xlsm or .csv file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        return _rows_xlsx(path, sheet)
+    if ext in (".csv", ".txt"):
+        return _rows_csv(path, encoding)
+    raise ValueError(f"\u4e0d\u652f\u6301\u7684\u6587\u4ef6\u7c7b\u578b\uff1a{ext}")
+
+
+def estimate_rows(path, sheet=None):
+    """Data rows in ``path`` for a progress bar, or None when unknown.
+
+    Counts line breaks of a CSV (quoted multi-line cells make it an upper
+    bound) and trusts the sheet dimension of a workbook.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".csv", ".txt"):
+        lines = 0
+        last = b"\n"
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                lines += block.count(b"\n")
+                last = block[-1:]
+        lines += last != b"\n"
+        return max(lines - 1, 0)
+    if ext in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True)
+        try:
+            ws = wb[sheet] if sheet else wb.active
+            return max(ws.max_row - 1, 0) if ws.max_row else None
+        finally:
+            wb.close()
+    return None
+
+
+def iter_chunks(path, chunk_size=CHUNK_SIZE, sheet=None, encoding="utf-8-sig", required=None):
+    """Yield lists of ``(row_number, record)`` of at most ``chunk_size`` rows.
+
+    Row numbers are 1-based as shown in Excel (the header is row 1). Blank
+    rows are skipped. Raises ValueError if no column maps to an A-R field
+    (or to one of the ``required`` keys, when given).
+    """
+    rows = iter_rows(path, sheet, encoding)
+    header = next(rows, None)
+    if header is None:
+        return
+    keys = map_header(header)
+    if required is not None:
+        if not any(k in required for k in keys):
+            raise ValueError("\u672a\u8bc6\u522b\u5230\u6240\u9700\u7684\u5217\uff0c\u8bf7\u68c0\u67e5\u8868\u5934")
+    elif not any(k in FIELD_KEYS for k in keys):
+        raise ValueError("\u672a\u8bc6\u522b\u5230 A-R \u5b57\u6bb5\u5217\uff0c\u8bf7\u68c0\u67e5\u8868\u5934")
+    chunk = []
+    timed = METRICS.enabled
+    t0 = perf_counter() if timed else 0.0
+    for n, row in enumerate(rows, start=2):
+        record = {}
+        for key, value in zip(keys, row):
+            if key is not None:
+                record[key] = _cell_text(value)
+        if not any(record.values()):
+            continue
+        chunk.append((n, record))
+        if len(chunk) >= chunk_size:
+            if timed:
+                METRICS.observe("phase_seconds", "read", perf_counter() - t0)
+            yield chunk
+            chunk = []
+            if timed:
+                t0 = perf_counter()
+    if chunk:
+        if timed:
+            METRICS.observe("phase_seconds", "read", perf_counter() - t0)
+        yield chunk
+
+
+def screen_records(records):
+    """Return ``(issues_list, errors)`` for a list of records.
+
+    Records are evaluated columnar; a row that fails validation gets its
+    error text and ``None`` in place of an issue list.
+    """
+    errors = []
+    with METRICS.phase("parse"):
+        cols = to_columns(records, errors)
+    with METRICS.phase("rules"):
+        masks = evaluate_columns(cols)
+    with METRICS.phase("issues"):
+        found = issues_from_masks(masks)
+        results = [issues if err is None else None for issues, err in zip(found, errors)]
+    return results, errors
+
+
+def rows_from_results(chunk, results, errors):
+    return [
+        ScreenedRow(n, record.get(CREDIT_CODE_KEY, ""), record, issues, err)
+        for (n, record), issues, err in zip(chunk, results, errors)
+    ]
+
+
+def screen_chunk(chunk):
+    """Run the rules over one chunk and return a list of ``ScreenedRow``."""
+    results, errors = screen_records([record for _, record in chunk])
+    return rows_from_results(chunk, results, errors)
+
+
+def screen_file(path, chunk_size=CHUNK_SIZE, sheet=None, encoding="utf-8-sig"):
+    """Stream ``ScreenedRow`` results for every data row in ``path``.
+
+    Each chunk is screened as soon as it has been read, so results start
+    flowing before the rest of the file is parsed.
+    """
+    for chunk in iter_chunks(path, chunk_size, sheet, encoding):
+        yield from screen_chunk(chunk)
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""Multi-process batch screening with ordered output.
+
+Chunks from ``batch_import.iter_chunks`` are sharded across a process pool
+and merged back in input order. At most ``2 * workers`` chunks are in flight,
+so memory stays bounded however large the input is. Workers only send back
+the issue lists; the records themselves never make the return trip. A chunk whose worker
+fails is re-run in this process; if the pool itself breaks, the rest of the
+run continues serially. With a ``result_cache.ResultCache`` only the rows it
+has not seen are sent to the workers. While ``metrics.METRICS`` is recording,
+each worker sends its timings back with the results and they are merged here.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from batch_import import (
+    CHUNK_SIZE, CREDIT_CODE_KEY, ScreenedRow, iter_chunks, screen_chunk,
+    screen_records, rows_from_results,
+)
+from metrics import METRICS
+
+PROGRESS_EVERY = 10000
+
+
+def default_workers():
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def progress_text(done, total=None):
+    """Status-bar text in the same register as ``TaxBenefitApp._set_status``."""
+    if total:
+        return f"\u6279\u91cf\u68c0\u67e5\u4e2d \u2014 \u5df2\u5b8c\u6210 {done:,} / {total:,} \u6237\uff08{done * 100 // total}%\uff09"
+    return f"\u6279\u91cf\u68c0\u67e5\u4e2d \u2014 \u5df2\u5b8c\u6210 {done:,} \u6237"
+
+
+def _screen_local(chunk):
+    try:
+        return screen_chunk(chunk)
+    except Exception as ex:
+        return [ScreenedRow(n, record.get(CREDIT_CODE_KEY, ""), record, None,
+                            f"\u68c0\u67e5\u5f02\u5e38\uff1a{ex}")
+                for n, record in chunk]
+
+
+def _screen_remote(records, timed):
+    """``screen_records`` in a worker, plus that chunk's metrics when ``timed``."""
+    if not timed:
+        return screen_records(records) + (None,)
+    METRICS.enable()
+    METRICS.reset()
+    return screen_records(records) + (METRICS.snapshot(),)
+
+
+def _split(chunk, cache):
+    """The rows of ``chunk`` that still need screening, and the lookup to merge with."""
+    if cache is None:
+        return chunk, None
+    keys, cached = cache.lookup([record for _, record in chunk])
+    return [item for item, c in zip(chunk, cached) if c is None], (keys, cached)
+
+
+def _merge(chunk, rows, plan, cache):
+    if plan is None:
+        return rows
+    keys, cached = plan
+    fresh = iter(rows)
+    out, learned = [], []
+    for (n, record), key, issues in zip(chunk, keys, cached):
+        if issues is None:
+            row = next(fresh)
+            if row.error is None:
+                learned.append((key, row.issues))
+        else:
+            row = ScreenedRow(n, record.get(CREDIT_CODE_KEY, ""), record, issues, None)
+        out.append(row)
+    cache.store(learned)
+    return out
+
+
+def screen_parallel(chunks, workers=None, progress=None, total=None, cache=None):
+    """Yield ``ScreenedRow`` for every row of ``chunks`` in input order.
+
+    ``progress`` is called with a status string (see ``progress_text``)
+    roughly every ``PROGRESS_EVERY`` rows and once at the end. Rows found in
+    ``cache`` are not screened again; new results are added to it.
+    """
+    workers = workers or default_workers()
+    chunks = iter(chunks)
+    done = reported = 0
+
+    def report(force=False):
+        nonlocal reported
+        if progress and done != reported and (force or done - reported >= PROGRESS_EVERY):
+            reported = done
+            progress(progress_text(done, total))
+
+    if workers <= 1:
+        for chunk in chunks:
+            todo, plan = _split(chunk, cache)
+            rows = _merge(chunk, _screen_local(todo) if todo else [], plan, cache)
+            done += len(rows)
+            yield from rows
+            report()
+        report(True)
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        for chunk in chunks:
+            todo, plan = _split(chunk, cache)
+            fut = None
+            if pool is not None and todo:
+                try:
+                    fut = pool.submit(_screen_remote, [r for _, r in todo], METRICS.enabled)
+                except BrokenProcessPool:
+                    pool = _abandon(pool, progress)
+            pending.append((chunk, todo, fut, plan))
+            while pending and (len(pending) >= 2 * workers or pool is None):
+                rows, pool = _collect(pending.popleft(), pool, progress, cache)
+                done += len(rows)
+                yield from rows
+                report()
+        while pending:
+            rows, pool = _collect(pending.popleft(), pool, progress, cache)
+            done += len(rows)
+            yield from rows
+            report()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    report(True)
+
+
+def _collect(item, pool, progress, cache=None):
+    chunk, todo, fut, plan = item
+    if not todo:
+        rows = []
+    elif fut is None:
+        rows = _screen_local(todo)
+    else:
+        try:
+            results, errors, snap = fut.result()
+            if snap is not None:
+                METRICS.merge(snap)
+            rows = rows_from_results(todo, results, errors)
+        except BrokenProcessPool:
+            if pool is not None:
+                pool = _abandon(pool, progress)
+            rows = _screen_local(todo)
+        except Exception:
+            rows = _screen_local(todo)
+    return _merge(chunk, rows, plan, cache), pool
+
+
+def _abandon(pool, progress):
+    pool.shutdown(wait=False, cancel_futures=True)
+    if progress:
+        progress("\u6279\u91cf\u68c0\u67e5 \u2014 \u5de5\u4f5c\u8fdb\u7a0b\u5f02\u5e38\u9000\u51fa\uff0c\u5269\u4f59\u6570\u636e\u6539\u4e3a\u5355\u8fdb\u7a0b\u7ee7\u7eed")
+    return None
+
+
+def screen_file_parallel(path, workers=None, chunk_size=CHUNK_SIZE, sheet=None,
+                         encoding="utf-8-sig", progress=None, cache=None):
+    """``batch_import.screen_file`` over a process pool."""
+    chunks = iter_chunks(path, chunk_size, sheet, encoding)
+    yield from screen_parallel(chunks, workers, progress, cache=cache)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Throughput of the batch \u672a\u4eab\u4f18\u60e0 roll-up vs per-record ``calculate_benefits``.
+
+    python benchmarks/bench_benefits.py [rows] [top n]
+
+Builds ``rows`` synthetic enterprises (default 1,000,000) with \u5e94\u4eab/\u5df2\u4eab
+amounts for every tax item, runs them through ``BenefitRollup`` and times
+``calculate_benefits`` on the first 100,000 as the baseline. Each record's
+fen tuple is checked against the Decimal result on that sample.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rule_engine import INDUSTRY_CHOICES
+from benefits import TAX_ITEMS, BenefitRollup, calculate_benefits, should_key, enjoyed_key
+
+BASELINE_ROWS = 100_000
+
+
+def make_records(n, seed=17, distinct=5000):
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(distinct):
+        rec = {}
+        for item in TAX_ITEMS:
+            should = rng.randrange(0, 5_000_000_000)
+            rec[should_key(item)] = f"{should / 100:.2f}"
+            rec[enjoyed_key(item)] = f"{rng.randrange(0, should + 1) * rng.choice((1, 1, 0)) / 100:.2f}"
+        pool.append(rec)
+    for i in range(n):
+        yield f"91{i:016d}", pool[i % distinct], INDUSTRY_CHOICES[i % len(INDUSTRY_CHOICES)]
+
+
+def main(argv):
+    n = int(argv[1]) if len(argv) > 1 else 1_000_000
+    top_n = int(argv[2]) if len(argv) > 2 else 100
+    rows = list(make_records(n))
+
+    roll = BenefitRollup(top_n)
+    t0 = time.perf_counter()
+    for code, rec, industry in rows:
+        roll.add(code, rec, industry)
+    batch_s = time.perf_counter() - t0
+
+    sample = rows[:BASELINE_ROWS]
+    t0 = time.perf_counter()
+    expected = [calculate_benefits(rec) for _, rec, _ in sample]
+    base_s = (time.perf_counter() - t0) / len(sample) * n
+
+    check = BenefitRollup(0)
+    mismatches = sum(1 for (code, rec, ind), (diffs, _) in zip(sample, expected)
+                     if check.add(code, rec, ind) != tuple(int(diffs[i] * 100) for i in TAX_ITEMS))
+
+    print(f"rows              {n:,}")
+    print(f"rollup            {batch_s:.2f} s   {n / batch_s:,.0f} rows/s")
+    print(f"calculate_benefits {base_s:.2f} s   (extrapolated from {len(sample):,})")
+    print(f"total unclaimed   {sum(y for _, _, y in roll.by_item()):,.2f}")
+    print(f"top {top_n} smallest {roll.top()[-1][2]:,.2f}" if roll.top() else "top               -")
+    print(f"industries        {len(roll.industries)}")
+    print(f"mismatches        {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Bulk-load and lookup speed of the SQLite case store.
+
+    python benchmarks/bench_case_store.py [cases] [db path]
+
+Writes ``cases`` synthetic cases (default 1,000,000) with ``save_many``,
+then times single-case ``load`` by credit code on a random sample.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rule_engine import INDUSTRY_KEY, NUMERIC_FIELDS, INDUSTRY_CHOICES
+from benefits import TAX_ITEMS
+from case_store import Case, CaseStore
+
+LOOKUPS = 2000
+
+
+def make_cases(n, seed=11, distinct=1000):
+    # a pool of records reused under new credit codes keeps generation cheap
+    rng = random.Random(seed)
+    pool = []
+    for i in range(distinct):
+        record = {key: f"{rng.randrange(0, 300_000_000) / 100:.2f}" for key in NUMERIC_FIELDS}
+        record[INDUSTRY_KEY] = INDUSTRY_CHOICES[i % len(INDUSTRY_CHOICES)]
+        benefits = {item: [str(rng.randrange(0, 100000)), "0", ""] for item in TAX_ITEMS[:2]}
+        issues = [("\u6210\u672c\u504f\u9ad8", "red")] if i % 7 == 0 else []
+        pool.append((record, benefits, issues))
+    for i in range(n):
+        record, benefits, issues = pool[i % distinct]
+        period = f"2024Q{i % 4 + 1}"
+        yield Case(f"91{i // 4:016d}", period, f"\u4f01\u4e1a{i // 4}", record, benefits, issues)
+
+
+def main(argv):
+    n = int(argv[1]) if len(argv) > 1 else 1_000_000
+    tmp = None
+    if len(argv) > 2:
+        path = argv[2]
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp.name, "cases.db")
+
+    with CaseStore(path) as store:
+        t0 = time.perf_counter()
+        done = store.save_many(make_cases(n))
+        load_s = time.perf_counter() - t0
+        size = os.path.getsize(path) + os.path.getsize(path + "-wal") if os.path.exists(path + "-wal") \
+            else os.path.getsize(path)
+
+        rng = random.Random(5)
+        codes = [f"91{rng.randrange(max(1, n // 4)):016d}" for _ in range(LOOKUPS)]
+        t0 = time.perf_counter()
+        found = sum(1 for c in codes if store.load(c) is not None)
+        look_s = time.perf_counter() - t0
+
+    print(f"cases             {done:,}")
+    print(f"bulk load         {load_s:.2f} s   {done / load_s:,.0f} cases/s   "
+          f"{size / load_s / 2**20:.1f} MB/s")
+    print(f"database          {size / 2**20:.1f} MB")
+    print(f"load by code      {look_s / LOOKUPS * 1e3:.3f} ms/case  ({found}/{LOOKUPS} found)")
+    if tmp is not None:
+        tmp.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
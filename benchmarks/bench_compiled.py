@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""Per-record latency of the compiled rule set vs the inline rule code.
+
+    python benchmarks/bench_compiled.py [rows] [copies]
+
+Times, on ``rows`` pre-normalized records (default 50,000):
+
+* ``inline``   - the hand-written checks ``run_rule_checks`` used before the
+                 rule table, kept here verbatim as the baseline;
+* ``unshared`` - the generated function without common sub-expressions;
+* ``compiled`` - the generated function with shared terms (what runs).
+
+then repeats the last two for a rule set made of ``copies`` renamed copies
+of the default table (default 6, i.e. 54 rules) to show how sharing scales.
+"""
+import copy
+import os
+import re
+import sys
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rule_engine import (
+    ISSUE_REVENUE_GAP, ISSUE_TRADE_RATIO, ISSUE_SERVICE_RATIO, ISSUE_COST_HIGH,
+    ISSUE_FEE_HIGH, ISSUE_VOUCHER, ISSUE_WAGE, ISSUE_STAMP, ISSUE_INPUT_VAT,
+    TRADE_INDUSTRIES, SERVICE_INDUSTRIES, normalize_record,
+)
+from rule_table import DEFAULT_RULESET, compile_ruleset
+from bench_columnar import make_columns, to_records
+
+_ZERO = Decimal("0")
+_CENT = Decimal("0.01")
+_SEV = {r["message"]: (r["message"], r["severity"]) for r in DEFAULT_RULESET["rules"]}
+
+
+def inline_evaluate(r):
+    A   = r["A_\u4e3b\u8425\u884c\u4e1a"]
+    C_v = r["C_\u8425\u4e1a\u6536\u5165"]
+    D   = r["D_\u9500\u552e\u6536\u5165"]
+    E   = r["E_\u6210\u672c"]
+    F_v = r["F_\u9500\u552e\u8d39\u7528"]
+    G   = r["G_\u7ba1\u7406\u8d39\u7528"]
+    H   = r["H_\u8d22\u52a1\u8d39\u7528"]
+    I   = r["I_\u5de5\u8d44\u85aa\u91d1"]
+    J   = r["J_\u4e2a\u7a0e\u6263\u7f34\u5de5\u8d44\u603b\u989d"]
+    K   = r["K_\u8ba1\u63d0\u6298\u65f7"]
+    L   = r["L_\u5f53\u671f\u5f00\u7968\u989d\u5ea6"]
+    M   = r["M_\u5f53\u671f\u53d7\u7968\u989d\u5ea6"]
+    N   = r["N_\u5370\u82b1\u7a0e\u8ba1\u7a0e\u4f9d\u636e"]
+    O   = r["O_\u7b80\u6613\u8ba1\u7a0e\u9500\u552e\u989d"]
+    Q   = r["Q_\u8fdb\u9879\u7a0e\u989d"]
+    R   = r["R_\u8fdb\u9879\u7a0e\u989d\u8f6c\u51fa"]
+
+    ws = _SEV.__getitem__
+    issues = []
+
+    if abs(D - C_v) > Decimal("100"):
+        issues.append(ws(ISSUE_REVENUE_GAP))
+
+    if C_v > 0:
+        total_r = (E + F_v + G + H) / C_v
+        fee_r   = (F_v + G + H) / C_v
+        cost_r  = E / C_v
+        if A in TRADE_INDUSTRIES and total_r >= Decimal("0.70"):
+            issues.append(ws(ISSUE_TRADE_RATIO))
+            if cost_r > Decimal("0.50"): issues.append(ws(ISSUE_COST_HIGH))
+            if fee_r  >= Decimal("0.50"): issues.append(ws(ISSUE_FEE_HIGH))
+        if A in SERVICE_INDUSTRIES and total_r >= Decimal("0.60"):
+            issues.append(ws(ISSUE_SERVICE_RATIO))
+            if cost_r > Decimal("0.50"): issues.append(ws(ISSUE_COST_HIGH))
+            if fee_r  >= Decimal("0.50"): issues.append(ws(ISSUE_FEE_HIGH))
+
+    if (E + F_v + G + H - I - K - M) > Decimal("20000"):
+        issues.append(ws(ISSUE_VOUCHER))
+
+    if I >= Decimal("500000") and (I - J) >= Decimal("100000"):
+        issues.append(ws(ISSUE_WAGE))
+
+    base = C_v + E + F_v + G - I
+    if base >= Decimal("1000000") and N < base:
+        issues.append(ws(ISSUE_STAMP))
+
+    cands = [D, C_v, L]
+    ts = max(cands) if any(x > 0 for x in cands) else _ZERO
+    if Q > 0 and ts > 0:
+        exp = (Q * (O / ts)).quantize(_CENT, rounding=ROUND_HALF_UP)
+        if R + _CENT < exp:
+            issues.append(ws(ISSUE_INPUT_VAT))
+
+    return issues
+
+
+def replicate(data, copies):
+    """``copies`` renamed copies of a rule table, predicates rewritten to match."""
+    out = copy.deepcopy(data)
+    out["rules"] = []
+    ids = [r["id"] for r in data["rules"]]
+    for c in range(copies):
+        for r in data["rules"]:
+            r = copy.deepcopy(r)
+            for rid in ids:
+                r["predicate"] = re.sub(rf"\b{rid}\b", f"{rid}_{c}", r["predicate"])
+            r["id"] = f"{r['id']}_{c}"
+            r["message"] = f"{r['message']} #{c}"
+            out["rules"].append(r)
+    return out
+
+
+def unshared(ruleset):
+    # the compiled rule set keeps its unshared variant as the fallback
+    return ruleset._ns["fallback"]
+
+
+def per_record_us(fn, records):
+    t0 = time.perf_counter()
+    for r in records:
+        fn(r)
+    return (time.perf_counter() - t0) / len(records) * 1e6
+
+
+def main(argv):
+    n = int(argv[1]) if len(argv) > 1 else 50_000
+    copies = int(argv[2]) if len(argv) > 2 else 6
+    records = [normalize_record(r) for r in to_records(make_columns(n), range(n))]
+
+    rs = compile_ruleset(DEFAULT_RULESET, cache=False)
+    mismatches = sum(1 for r in records if inline_evaluate(r) != rs.evaluate_normalized(r))
+
+    print(f"records           {n:,}")
+    print(f"default table     {rs.stats['rules']} rules, {rs.stats['nodes']} DAG nodes, "
+          f"{rs.stats['shared']} shared terms")
+    print(f"inline            {per_record_us(inline_evaluate, records):6.2f} us/record")
+    print(f"unshared          {per_record_us(unshared(rs), records):6.2f} us/record")
+    print(f"compiled          {per_record_us(rs.evaluate_normalized, records):6.2f} us/record")
+
+    big = compile_ruleset(replicate(DEFAULT_RULESET, copies), cache=False)
+    print(f"x{copies} table        {big.stats['rules']} rules, {big.stats['nodes']} DAG nodes, "
+          f"{big.stats['shared']} shared terms")
+    print(f"unshared          {per_record_us(unshared(big), records):6.2f} us/record")
+    print(f"compiled          {per_record_us(big.evaluate_normalized, records):6.2f} us/record")
+    print(f"mismatches vs inline {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Speed and size of credit-code validation and the ``CodeIndex``.
+
+    python benchmarks/bench_credit_code.py [codes]
+
+Generates ``codes`` valid codes (default 1,000,000) plus 0.1% repeats and
+0.05% wrong check characters, then times ``validate_many``, building the
+index in 100k batches, ``lookup_many`` and single ``get`` calls, and
+compares the index size with a plain dict of the same codes.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from credit_code import CHARSET, CodeIndex, check_char, validate_many
+
+BATCH = 100_000
+
+
+def make_codes(n, seed=5):
+    rng = random.Random(seed)
+    codes = []
+    for _ in range(n):
+        body = (rng.choice("159Y") + rng.choice("123") + f"{rng.randrange(10 ** 6):06d}"
+                + "".join(rng.choice(CHARSET) for _ in range(9)))
+        codes.append(body + check_char(body))
+    codes += codes[:n // 1000]
+    codes += [c[:17] + ("1" if c[17] == "0" else "0") for c in codes[:n // 2000]]
+    return codes
+
+
+def main(argv):
+    n = int(argv[1]) if len(argv) > 1 else 1_000_000
+    codes = make_codes(n)
+
+    t0 = time.perf_counter()
+    valid = validate_many(codes)
+    validate_s = time.perf_counter() - t0
+
+    index = CodeIndex()
+    invalid = dups = 0
+    t0 = time.perf_counter()
+    for i in range(0, len(codes), BATCH):
+        bad, rep = index.add_many(codes[i:i + BATCH])
+        invalid += len(bad)
+        dups += len(rep)
+    build_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    index.lookup_many(codes)
+    lookup_s = time.perf_counter() - t0
+    sample = codes[:100_000]
+    t0 = time.perf_counter()
+    for c in sample:
+        index.get(c)
+    get_us = (time.perf_counter() - t0) / len(sample) * 1e6
+
+    plain = {c: i for i, c in enumerate(codes)}
+    dict_mb = (sys.getsizeof(plain) + sum(sys.getsizeof(c) for c in plain)) / 2 ** 20
+
+    print(f"codes             {len(codes):,}  ({int(valid.sum()):,} valid)")
+    print(f"validate_many     {validate_s:.2f} s   {len(codes) / validate_s:,.0f} codes/s")
+    print(f"index build       {build_s:.2f} s   {invalid:,} invalid, {dups:,} duplicates")
+    print(f"lookup_many       {lookup_s:.2f} s")
+    print(f"get               {get_us:.1f} us/code")
+    print(f"index size        {index.nbytes / 2 ** 20:.1f} MB  (dict of str: {dict_mb:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Pre-fill throughput of ``field_fetch`` against the local stand-in server.
+
+    python benchmarks/bench_fetch.py [codes] [concurrency] [latency] [fail rate]
+
+Starts ``fetch_standin`` in-process with a per-request ``latency`` (default
+50 ms) and a share of 503s (default 2%), fetches ``codes`` credit codes
+(default 10,000) twice through one ``TTLCache`` and checks every value
+against the stand-in's data. The second pass should be all cache hits.
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from field_fetch import Fetcher, HttpFieldSource, TTLCache
+from fetch_standin import standin_fields, start
+
+
+async def run(n, concurrency, latency, fail_rate):
+    server, stand_in, url = await start(latency=latency, fail_rate=fail_rate)
+    codes = [f"91{i:016d}" for i in range(n)]
+    source = HttpFieldSource(url, pool_size=concurrency)
+    cache = TTLCache()
+    try:
+        fetcher = Fetcher(source, concurrency, retries=5, backoff=0.05, cache=cache)
+        t0 = time.perf_counter()
+        results = await fetcher.fetch_many(codes)
+        cold = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        again = await fetcher.fetch_many(codes)
+        warm = time.perf_counter() - t0
+    finally:
+        await source.close()
+        server.close()
+        await server.wait_closed()
+
+    wrong = sum(1 for r in results
+                if r.error or any(r.record[k] != v for k, v in standin_fields(r.credit_code).items()))
+    print(f"codes             {n:,}  (latency {latency * 1e3:.0f} ms, {fail_rate:.0%} 503s)")
+    print(f"cold fetch        {cold:.2f} s   {n / cold:,.0f} codes/s   "
+          f"concurrency {concurrency}")
+    print(f"connections       {source.pool.opened} opened, {stand_in.requests:,} requests")
+    print(f"retries           {fetcher.retried:,}   failed {fetcher.failed:,}")
+    print(f"cached fetch      {warm * 1e3:.1f} ms  ({sum(r.error is None for r in again):,} hits)")
+    print(f"wrong values      {wrong}")
+    return 1 if wrong else 0
+
+
+def main(argv):
+    n = int(argv[1]) if len(argv) > 1 else 10_000
+    concurrency = int(argv[2]) if len(argv) > 2 else 64
+    latency = float(argv[3]) if len(argv) > 3 else 0.05
+    fail_rate = float(argv[4]) if len(argv) > 4 else 0.02
+    return asyncio.run(run(n, concurrency, latency, fail_rate))
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""End-to-end benchmark suite over ``synth`` data, with a JSON record per run.
+
+    python benchmarks/bench_suite.py [--sizes 10k,1m,10m] [--file-rows 50000]
+                                     [--only screen,import_xlsx] [--seed 0]
+                                     [--out bench.json] [--compare old.json] [--quick]
+
+Cases (each keyed ``name/rows`` in the output):
+
+* ``scalar``       - ``rule_engine.evaluate`` per record;
+* ``columns``      - ``evaluate_columns`` on ready fen columns, per size;
+* ``screen``       - ``batch_import.screen_records`` on text records in
+                     ``CHUNK_SIZE`` chunks (the batch path), per size; the
+                     hits are checked against the generator's intent;
+* ``import_csv`` / ``import_xlsx`` - ``iter_chunks`` over a written file;
+* ``columns_build`` / ``columns_open`` - ``column_cache`` first import of the
+                     xlsx file, then a re-open of the mapped cache;
+* ``result_cache`` - ``screen_parallel`` (one process) without a result
+                     cache, into an empty one, and again with every row a
+                     hit (``result_cache_off`` / ``_cold`` / ``_warm``; the
+                     warm entry carries the speedup over ``_off``);
+* ``export_csv`` / ``export_jsonl`` / ``export_xlsx`` - ``ResultsSink``;
+* ``gui_build``    - ``TaxBenefitApp`` construction (skipped without a display).
+
+Only the measured call is timed, never the data generation. The JSON file
+has sorted keys and one entry per case, so two runs diff line by line and
+``--compare`` prints the change in rows/s (seconds for ``gui_build``).
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_import import CHUNK_SIZE, iter_chunks, rows_from_results, screen_records
+from batch_parallel import screen_parallel
+from column_cache import ColumnTable, build
+from result_cache import ResultCache
+from results_sink import ResultsSink
+from rule_columns import evaluate_columns
+from rule_engine import evaluate
+from rule_table import active_ruleset
+from synth import block_records, iter_blocks, write_table
+
+FORMAT = 1
+CASES = ("scalar", "columns", "screen", "import_csv", "import_xlsx", "columns_build", "columns_open",
+         "result_cache", "export_csv", "export_jsonl", "export_xlsx", "gui_build")
+SCALAR_ROWS = 20000
+REPEAT = 3
+
+
+def parse_size(text):
+    text = text.strip().lower().replace("_", "")
+    mult = {"k": 1000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * mult)
+
+
+def _entry(rows, seconds, **extra):
+    out = {"rows": rows, "seconds": round(seconds, 6),
+           "rows_per_s": round(rows / seconds, 1) if seconds else None}
+    out.update(extra)
+    return out
+
+
+def bench_scalar(seed):
+    records = next(_record_blocks(SCALAR_ROWS, seed))[1]
+    best = None
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        for rec in records:
+            evaluate(rec)
+        s = time.perf_counter() - t0
+        best = s if best is None else min(best, s)
+    return {f"scalar/{len(records)}": _entry(len(records), best,
+                                             us_per_row=round(best / len(records) * 1e6, 3))}
+
+
+def bench_columns(rows, seed):
+    rs = active_ruleset()
+    spent = 0.0
+    mismatches = 0
+    for _, cols, intent in iter_blocks(rows, seed):
+        t0 = time.perf_counter()
+        masks = evaluate_columns(cols, rs)
+        spent += time.perf_counter() - t0
+        mismatches += sum(int((masks[r.message] != intent[r.id]).sum()) for r in rs.rules)
+    return {f"columns/{rows}": _entry(rows, spent, mismatches=mismatches)}
+
+
+def bench_screen(rows, seed):
+    rs = active_ruleset()
+    spent = 0.0
+    got, want = Counter(), Counter()
+    for intent, records in _record_blocks(rows, seed):
+        for r in rs.rules:
+            want[r.message] += int(intent[r.id].sum())
+        for i in range(0, len(records), CHUNK_SIZE):
+            chunk = records[i:i + CHUNK_SIZE]
+            t0 = time.perf_counter()
+            results, _ = screen_records(chunk)
+            spent += time.perf_counter() - t0
+            got.update(msg for issues in results if issues for msg, _ in issues)
+    mismatches = sum(abs(got[m] - want[m]) for m in set(got) | set(want))
+    return {f"screen/{rows}": _entry(rows, spent, hits=sum(got.values()), mismatches=mismatches)}
+
+
+def _record_blocks(rows, seed):
+    for start, cols, intent in iter_blocks(rows, seed):
+        yield intent, block_records(start, cols)
+
+
+def bench_import(kind, rows, seed, tmpdir):
+    path = write_table(os.path.join(tmpdir, f"synth-{rows}.{kind}"), rows, seed)
+    t0 = time.perf_counter()
+    n = sum(len(chunk) for chunk in iter_chunks(path))
+    s = time.perf_counter() - t0
+    return {f"import_{kind}/{rows}": _entry(n, s, bytes=os.path.getsize(path))}
+
+
+def bench_column_cache(kinds, rows, seed, tmpdir):
+    src = os.path.join(tmpdir, f"synth-{rows}.xlsx")
+    if not os.path.exists(src):
+        write_table(src, rows, seed)
+    path = os.path.join(tmpdir, f"synth-{rows}.cols")
+    t0 = time.perf_counter()
+    build(src, path)
+    out = {}
+    if "columns_build" in kinds:
+        out[f"columns_build/{rows}"] = _entry(rows, time.perf_counter() - t0,
+                                              bytes=os.path.getsize(path))
+    if "columns_open" in kinds:
+        best = None
+        for _ in range(REPEAT):
+            t0 = time.perf_counter()
+            with ColumnTable(path) as table:
+                n = len(table)
+            s = time.perf_counter() - t0
+            best = s if best is None else min(best, s)
+        out[f"columns_open/{rows}"] = _entry(n, best)
+    return out
+
+
+def bench_result_cache(rows, seed, tmpdir):
+    records = [rec for _, block in _record_blocks(rows, seed) for rec in block]
+    numbered = list(enumerate(records, start=2))
+    chunks = [numbered[i:i + CHUNK_SIZE] for i in range(0, rows, CHUNK_SIZE)]
+    path = os.path.join(tmpdir, f"results-{rows}.db")
+    rs = active_ruleset()
+
+    def run(path):
+        cache = None if path is None else ResultCache(rs, path)
+        t0 = time.perf_counter()
+        issues = [sr.issues for sr in screen_parallel(chunks, workers=1, cache=cache)]
+        if cache is not None:
+            cache.close()
+        return time.perf_counter() - t0, issues
+
+    # off and warm are best of REPEAT; cold can only run once per database
+    off, want = min(run(None) for _ in range(REPEAT))
+    cold, got = run(path)
+    cold_bad = sum(a != b for a, b in zip(got, want))
+    warm, got = min(run(path) for _ in range(REPEAT))
+    return {
+        f"result_cache_off/{rows}": _entry(rows, off),
+        f"result_cache_cold/{rows}": _entry(rows, cold, mismatches=cold_bad),
+        f"result_cache_warm/{rows}": _entry(rows, warm, mismatches=sum(a != b for a, b in zip(got, want)),
+                                            speedup=round(off / warm, 2)),
+    }
+
+
+def bench_export(kinds, rows, seed, tmpdir):
+    records = [rec for _, block in _record_blocks(rows, seed) for rec in block]
+    chunk = list(enumerate(records, start=2))
+    screened = rows_from_results(chunk, *screen_records(records))
+    out = {}
+    for kind in kinds:
+        path = os.path.join(tmpdir, f"results-{rows}.{kind}")
+        t0 = time.perf_counter()
+        with ResultsSink(path) as sink:
+            for sr in screened:
+                sink.add_screened(sr)
+        s = time.perf_counter() - t0
+        out[f"export_{kind}/{rows}"] = _entry(rows, s, bytes=os.path.getsize(path))
+    return out
+
+
+def bench_gui():
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as ex:   # no display, no Tk
+        return {"gui_build/1": {"skipped": str(ex).splitlines()[0]}}
+    from tax_benefit_app import TaxBenefitApp
+    best = None
+    try:
+        for _ in range(REPEAT):
+            for w in root.winfo_children():
+                w.destroy()
+            t0 = time.perf_counter()
+            TaxBenefitApp(root)
+            root.update_idletasks()
+            s = time.perf_counter() - t0
+            best = s if best is None else min(best, s)
+    finally:
+        root.destroy()
+    return {"gui_build/1": _entry(1, best)}
+
+
+def _git_head():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def _line(name, res):
+    if "skipped" in res:
+        return f"{name:<24} skipped: {res['skipped']}"
+    text = f"{name:<24} {res['seconds']:>10.3f} s  {res['rows_per_s'] or 0:>14,.0f} rows/s"
+    if "mismatches" in res:
+        text += f"   mismatches {res['mismatches']}"
+    return text
+
+
+def compare(old, new):
+    print(f"\n{'case':<24} {'old':>14} {'new':>14}   change")
+    for name in sorted(set(old["results"]) & set(new["results"])):
+        a, b = old["results"][name], new["results"][name]
+        if "skipped" in a or "skipped" in b:
+            continue
+        if name.startswith("gui_build"):
+            print(f"{name:<24} {a['seconds']:>12.3f} s {b['seconds']:>12.3f} s   "
+                  f"{(b['seconds'] / a['seconds'] - 1) * 100:+.1f}% time")
+        else:
+            print(f"{name:<24} {a['rows_per_s']:>14,.0f} {b['rows_per_s']:>14,.0f}   "
+                  f"{(b['rows_per_s'] / a['rows_per_s'] - 1) * 100:+.1f}% rows/s")
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(prog="bench_suite.py")
+    ap.add_argument("--sizes", default="10k,1m,10m", help="row counts for columns/screen")
+    ap.add_argument("--file-rows", default="50k", help="rows for the import/export cases")
+    ap.add_argument("--only", help="comma-separated case names (default: all)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="bench_suite.json")
+    ap.add_argument("--compare", metavar="JSON", help="an earlier --out file")
+    ap.add_argument("--quick", action="store_true", help="10k rows everywhere")
+    args = ap.parse_args(argv[1:])
+
+    sizes = [parse_size(s) for s in args.sizes.split(",")] if not args.quick else [10_000]
+    file_rows = parse_size(args.file_rows) if not args.quick else 10_000
+    only = set(args.only.split(",")) if args.only else set(CASES)
+    unknown = only - set(CASES)
+    if unknown:
+        ap.error(f"unknown case: {', '.join(sorted(unknown))}")
+
+    doc = {
+        "format": FORMAT,
+        "started": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git": _git_head(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "ruleset": active_ruleset().version,
+        "seed": args.seed,
+        "results": {},
+    }
+    results = doc["results"]
+
+    def record(found):
+        for name, res in found.items():
+            results[name] = res
+            print(_line(name, res), flush=True)
+
+    with tempfile.TemporaryDirectory(prefix="taxapp-bench-") as tmpdir:
+        if "scalar" in only:
+            record(bench_scalar(args.seed))
+        for n in sizes:
+            if "columns" in only:
+                record(bench_columns(n, args.seed))
+            if "screen" in only:
+                record(bench_screen(n, args.seed))
+        for kind in ("csv", "xlsx"):
+            if f"import_{kind}" in only:
+                record(bench_import(kind, file_rows, args.seed, tmpdir))
+        kinds = [k for k in ("columns_build", "columns_open") if k in only]
+        if kinds:
+            record(bench_column_cache(kinds, file_rows, args.seed, tmpdir))
+        if "result_cache" in only:
+            record(bench_result_cache(file_rows, args.seed, tmpdir))
+        kinds = [k for k in ("csv", "jsonl", "xlsx") if f"export_{k}" in only]
+        if kinds:
+            record(bench_export(kinds, file_rows, args.seed, tmpdir))
+    if "gui_build" in only:
+        record(bench_gui())
+
+    with open(args.out, "w", encoding="utf-8") as fh:
+        json.dump(doc, fh, indent=1, sort_keys=True)
+        fh.write("\n")
+    print(f"\nwrote {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            compare(json.load(fh), doc)
+    bad = sum(r.get("mismatches", 0) for r in results.values())
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
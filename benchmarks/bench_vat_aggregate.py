@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Ingest speed and memory of the monthly VAT aggregator.
+
+    python benchmarks/bench_vat_aggregate.py [taxpayers] [months]
+
+Feeds ``taxpayers * months`` synthetic return rows (default 100,000 x 12)
+month by month into a fresh ``VatStore``, as a new return file would arrive
+each month, then re-files one month to time the delta path. Peak RSS should
+stay flat as the row count grows.
+"""
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vat_aggregate import LINES, VatStore
+
+
+def month_rows(taxpayers, month, seed):
+    rng = random.Random(seed)
+    yield ["\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801", "\u6240\u5c5e\u671f"] + [f"\u7b2c{n}\u680f" for n in LINES]
+    for i in range(taxpayers):
+        yield [f"91{i:016d}", month] + [f"{rng.randrange(0, 10**9) / 100:.2f}" for _ in LINES]
+
+
+def main(argv):
+    taxpayers = int(argv[1]) if len(argv) > 1 else 100_000
+    months = int(argv[2]) if len(argv) > 2 else 12
+    with tempfile.TemporaryDirectory() as tmp, VatStore(os.path.join(tmp, "vat.db")) as vs:
+        t0 = time.perf_counter()
+        rows = 0
+        for m in range(1, months + 1):
+            rows += vs.ingest_rows(month_rows(taxpayers, f"2024-{m:02d}", m)).rows
+        ingest_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        vs.ingest_rows(month_rows(taxpayers, "2024-01", 99))
+        amend_s = time.perf_counter() - t0
+        totals = vs.conn.execute("SELECT count(*) FROM vat_totals").fetchone()[0]
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"rows              {rows:,} ({taxpayers:,} taxpayers x {months} months)")
+    print(f"ingest            {ingest_s:.2f} s   {rows / ingest_s:,.0f} rows/s")
+    print(f"re-file 1 month   {amend_s:.2f} s   {taxpayers / amend_s:,.0f} rows/s")
+    print(f"period totals     {totals:,}")
+    print(f"peak RSS          {peak:.0f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""Seeded synthetic taxpayers for the benchmarks.
+
+    python benchmarks/synth.py rows out.csv|out.xlsx [--seed 0] [--rate voucher=0.3 ...]
+
+Every A-R field is built from the default rule set's thresholds so that each
+rule flags the share of its in-scope rows given in ``rates`` (``DEFAULT_RATES``
+for the rest): ``trade_ratio`` / ``service_ratio`` count among \u6279\u53d1\u96f6\u552e+\u5236\u9020 /
+\u751f\u6d3b\u670d\u52a1+\u4ea4\u901a\u8fd0\u8f93 rows, ``cost_high`` / ``fee_high`` among rows one of those
+flagged, ``stamp`` among rows whose base reaches ``base_min``, the others
+among all rows. A handful of rows cannot take a wanted hit (e.g. wages
+larger than the costs they would have to leave room in); ``intent`` has
+those cleared, so it always equals what ``evaluate_columns`` finds.
+
+Rows are made in blocks of ``BLOCK`` with their own seed, so a given
+``(seed, rows)`` is the same data whether it is read as columns or records.
+"""
+import argparse
+import csv
+import os
+import sys
+from decimal import Decimal
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rule_engine import (FIELD_KEYS, INDUSTRY_CHOICES, INDUSTRY_KEY, NUMERIC_FIELDS, PERIOD_KEY,
+                         SERVICE_INDUSTRIES, TRADE_INDUSTRIES)
+from rule_table import DEFAULT_RULESET
+from credit_code import CHARSET, check_char
+from batch_import import COMPANY_NAME_KEY, CREDIT_CODE_KEY
+
+RULE_IDS = tuple(r["id"] for r in DEFAULT_RULESET["rules"])
+DEFAULT_RATES = {
+    "revenue_gap": 0.05, "trade_ratio": 0.20, "service_ratio": 0.20,
+    "cost_high": 0.30, "fee_high": 0.30, "voucher": 0.10,
+    "wage": 0.08, "stamp": 0.15, "input_vat": 0.05,
+}
+# 批发零售, 制造, 建筑安装, 交通运输, 生活服务, 其他
+INDUSTRY_WEIGHTS = (0.30, 0.20, 0.10, 0.08, 0.22, 0.10)
+PERIOD = "2024"
+BLOCK = 100_000
+HEADER = [CREDIT_CODE_KEY, COMPANY_NAME_KEY] + list(FIELD_KEYS)
+
+# 营业收入 is log-uniform between these (yuan)
+REVENUE_MIN, REVENUE_MAX = 2e6, 5e7
+_REGIONS = ("110105", "310115", "440300", "330106", "320505", "510107", "420111", "370212")
+
+_TH = {r["id"]: {k: Decimal(v) for k, v in r.get("thresholds", {}).items()}
+       for r in DEFAULT_RULESET["rules"]}
+
+
+def _fen(rid, name):
+    return int(_TH[rid][name] * 100)
+
+
+def _block(rng, n, rates):
+    ind = rng.choice(len(INDUSTRY_CHOICES), n, p=INDUSTRY_WEIGHTS).astype(np.int8)
+    trade = np.isin(ind, [INDUSTRY_CHOICES.index(x) for x in TRADE_INDUSTRIES])
+    service = np.isin(ind, [INDUSTRY_CHOICES.index(x) for x in SERVICE_INDUSTRIES])
+
+    def want(rid, scope):
+        return scope & (rng.random(n) < rates[rid])
+
+    def u(lo, hi):
+        return rng.uniform(lo, hi, n)
+
+    C = np.round(np.exp(u(np.log(REVENUE_MIN), np.log(REVENUE_MAX))) * 100).astype(np.int64)
+
+    # revenue_gap: |D - C| > gap
+    gap = _fen("revenue_gap", "gap")
+    rev_hit = want("revenue_gap", True)
+    off = np.where(rev_hit, gap + 1 + (C * u(0, 0.05)).astype(np.int64),
+                   rng.integers(0, gap + 1, n))
+    D = C + np.where(rng.random(n) < 0.5, off, -off)
+
+    # trade/service ratio, then cost_high / fee_high among the flagged: pick
+    # E/C and (F+G+H)/C with a 0.01 margin on the side each flag asks for
+    thr = np.where(trade, float(_TH["trade_ratio"]["ratio"]), float(_TH["service_ratio"]["ratio"]))
+    scoped = trade | service
+    ratio_hit = want("trade_ratio", trade) | want("service_ratio", service)
+    cost_hit = want("cost_high", ratio_hit)
+    fee_hit = want("fee_high", ratio_hit)
+    e = np.select([cost_hit, ratio_hit, scoped],
+                  [u(0.51, 0.80), u(0.25, 0.49), u(0.10, 1.0) * (thr - 0.25) + 0.10],
+                  u(0.20, 0.70))
+    lo = np.maximum(thr + 0.02 - e, 0.01)
+    f = np.select([fee_hit, ratio_hit, scoped],
+                  [u(0.51, 0.70), lo + u(0, 1.0) * (0.47 - lo),
+                   0.02 + u(0, 1.0) * (thr - e - 0.04)],
+                  u(0.05, 0.30))
+    E = (e * C).astype(np.int64)
+    fee = (f * C).astype(np.int64)
+    F = (fee * u(0.2, 0.5)).astype(np.int64)
+    G = ((fee - F) * u(0.3, 0.7)).astype(np.int64)
+    H = fee - F - G
+    total = E + fee
+
+    # wage: I >= wage_min and I - J >= gap
+    wage_min, wage_gap = _fen("wage", "wage_min"), _fen("wage", "gap")
+    wage_hit = want("wage", True)
+    I = np.where(wage_hit, wage_min + (total * u(0, 0.2)).astype(np.int64),
+                 (total * u(0.05, 0.3)).astype(np.int64))
+    short = (u(0, 1.0) * np.minimum(I, wage_gap - 1)).astype(np.int64)
+    J = np.where(wage_hit, I - wage_gap - ((I - wage_gap) * u(0, 0.2)).astype(np.int64), I - short)
+
+    # voucher: E + F + G + H - I - K - M > gap, with K + M as the slack
+    room = total - I - _fen("voucher", "gap")
+    voucher_hit = want("voucher", room > 0)
+    KM = np.where(voucher_hit, (room * u(0, 0.9)).astype(np.int64),
+                  np.maximum(room, 0) + (total * u(0, 0.1)).astype(np.int64))
+    K = (KM * u(0.1, 0.5)).astype(np.int64)
+    M = KM - K
+
+    # stamp: base >= base_min and N < base
+    base = C + E + F + G - I
+    stamp_hit = want("stamp", base >= _fen("stamp", "base_min"))
+    N = np.where(stamp_hit, (base * u(0.3, 0.99)).astype(np.int64),
+                 np.maximum(base, 0) + (np.abs(base) * u(0, 0.05)).astype(np.int64))
+
+    # input_vat: R + tolerance < round2(Q * O / max(D, C, L)); exact in fen,
+    # hits keep one more fen of margin for the Decimal division
+    L = (C * u(0.8, 1.1)).astype(np.int64)
+    P = (C * u(0, 0.1)).astype(np.int64)
+    Q = (C * u(0.02, 0.1)).astype(np.int64)
+    vat_want = want("input_vat", True)
+    O = np.where(vat_want | (rng.random(n) < 0.3), (C * u(0.05, 0.3)).astype(np.int64), 0)
+    ts = np.maximum(np.maximum(D, C), L)
+    expected = (2 * Q * O + ts) // (2 * ts)
+    tol = _fen("input_vat", "tolerance")
+    vat_hit = vat_want & (expected >= tol + 2)
+    R = np.where(vat_hit, np.minimum((expected * u(0, 0.9)).astype(np.int64), expected - tol - 2),
+                 np.maximum(expected - tol + 1, 0) + rng.integers(0, 10000, n))
+
+    cols = dict(zip(NUMERIC_FIELDS, (C, D, E, F, G, H, I, J, K, L, M, N, O, P, Q, R)))
+    cols[INDUSTRY_KEY] = ind
+    intent = {"revenue_gap": rev_hit, "trade_ratio": ratio_hit & trade,
+              "service_ratio": ratio_hit & service, "cost_high": cost_hit, "fee_high": fee_hit,
+              "voucher": voucher_hit, "wage": wage_hit, "stamp": stamp_hit, "input_vat": vat_hit}
+    return cols, intent
+
+
+def iter_blocks(rows, seed=0, rates=None):
+    """Yield ``(start, cols, intent)`` for consecutive blocks of ``BLOCK`` rows.
+
+    ``cols`` is shaped like ``rule_columns.to_columns`` output; ``intent`` maps
+    each rule id to the bool array of rows it should flag.
+    """
+    rates = {**DEFAULT_RATES, **(rates or {})}
+    for b, start in enumerate(range(0, rows, BLOCK)):
+        rng = np.random.default_rng([seed, b])
+        yield (start,) + _block(rng, min(BLOCK, rows - start), rates)
+
+
+def synth_columns(rows, seed=0, rates=None):
+    """All ``rows`` as one ``(cols, intent)`` pair."""
+    parts = list(iter_blocks(rows, seed, rates))
+    if not parts:
+        parts = [(0,) + _block(np.random.default_rng(seed), 0, {**DEFAULT_RATES, **(rates or {})})]
+    cols = {k: np.concatenate([p[1][k] for p in parts]) for k in parts[0][1]}
+    intent = {k: np.concatenate([p[2][k] for p in parts]) for k in parts[0][2]}
+    return cols, intent
+
+
+def credit_code(i):
+    """A valid, unique GB 32100 code for row ``i``."""
+    region = _REGIONS[i % len(_REGIONS)]
+    digits = []
+    for _ in range(9):
+        i, d = divmod(i, 31)
+        digits.append(CHARSET[d])
+    body = "91" + region + "".join(reversed(digits))
+    return body + check_char(body)
+
+
+def fen_texts(column):
+    return [f"{v // 100}.{v % 100:02d}" for v in column.tolist()]
+
+
+def block_records(start, cols):
+    """Text records (credit code, name, A-R) for one block, as an export has them."""
+    texts = [fen_texts(cols[key]) for key in NUMERIC_FIELDS]
+    industry = [INDUSTRY_CHOICES[c] for c in cols[INDUSTRY_KEY].tolist()]
+    out = []
+    for j, name in enumerate(industry):
+        rec = {CREDIT_CODE_KEY: credit_code(start + j),
+               COMPANY_NAME_KEY: f"\u5408\u6210\u4f01\u4e1a{start + j:08d}",
+               INDUSTRY_KEY: name, PERIOD_KEY: PERIOD}
+        for key, col in zip(NUMERIC_FIELDS, texts):
+            rec[key] = col[j]
+        out.append(rec)
+    return out
+
+
+def iter_records(rows, seed=0, rates=None):
+    for start, cols, _ in iter_blocks(rows, seed, rates):
+        yield from block_records(start, cols)
+
+
+def write_table(path, rows, seed=0, rates=None):
+    """Write ``rows`` records to ``path`` (.csv or .xlsx); return ``path``."""
+    records = iter_records(rows, seed, rates)
+    if path.lower().endswith(".xlsx"):
+        from openpyxl import Workbook
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("data")
+        ws.append(HEADER)
+        for rec in records:
+            ws.append([rec.get(k, "") for k in HEADER])
+        wb.save(path)
+    else:
+        with open(path, "w", newline="", encoding="utf-8-sig") as fh:
+            w = csv.writer(fh)
+            w.writerow(HEADER)
+            for rec in records:
+                w.writerow([rec.get(k, "") for k in HEADER])
+    return path
+
+
+def parse_rates(items):
+    rates = {}
+    for item in items or ():
+        rid, _, value = item.partition("=")
+        if rid not in RULE_IDS:
+            raise ValueError(f"unknown rule id: {rid}")
+        rates[rid] = float(value)
+    return rates
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(prog="synth.py", description="synthetic A-R records")
+    ap.add_argument("rows", type=int)
+    ap.add_argument("output", help=".csv or .xlsx")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--rate", action="append", metavar="RULE=SHARE",
+                    help="share of in-scope rows a rule flags, e.g. voucher=0.3")
+    args = ap.parse_args(argv[1:])
+    write_table(args.output, args.rows, args.seed, parse_rates(args.rate))
+    print(f"wrote {args.rows:,} rows to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
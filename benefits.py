@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""Headless \u672a\u4eab\u4f18\u60e0 computation shared by the GUI and the CLI.
+
+\u672a\u4eab\u4f18\u60e0 = max(0, \u5e94\u4eab\u4f18\u60e0 \u2212 \u5df2\u4eab\u4f18\u60e0), computed in Decimal so large yuan
+amounts do not drift the way float sums do.
+"""
+import heapq
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+TAX_ITEMS = [
+    "\u5236\u9020\u4e1a\u7f13\u7a0e",
+    "\u4ea4\u901a\u8fd0\u8f93\u51cf\u514d",
+    "\u5c0f\u5fae\u4f01\u4e1a\u51cf\u514d",
+    "\u9ad8\u65b0\u6280\u672f\u4f01\u4e1a\u51cf\u514d",
+    "\u73af\u4fdd\u8bbe\u5907\u51cf\u514d",
+    "\u7814\u53d1\u8d39\u7528\u52a0\u8ba1\u6263\u9664",
+]
+
+SHOULD_SUFFIX = "\u5e94\u4eab\u4f18\u60e0"
+ENJOYED_SUFFIX = "\u5df2\u4eab\u4f18\u60e0"
+
+_ZERO = Decimal("0")
+_CENT = Decimal("0.01")
+
+
+def should_key(item):
+    return f"{item}_{SHOULD_SUFFIX}"
+
+
+def enjoyed_key(item):
+    return f"{item}_{ENJOYED_SUFFIX}"
+
+
+BENEFIT_KEYS = tuple(k for item in TAX_ITEMS for k in (should_key(item), enjoyed_key(item)))
+_ITEM_KEYS = tuple((item, should_key(item), enjoyed_key(item)) for item in TAX_ITEMS)
+
+
+def parse_amount(value, label=""):
+    """Blank is 0; anything else must be a non-negative decimal amount."""
+    if value is None:
+        return _ZERO
+    txt = str(value).strip()
+    if not txt:
+        return _ZERO
+    try:
+        amt = Decimal(txt)
+    except InvalidOperation:
+        raise ValueError(f"\u300c{label or txt}\u300d \u91d1\u989d\u683c\u5f0f\u4e0d\u6b63\u786e") from None
+    if not amt.is_finite() or amt < 0:
+        raise ValueError(f"\u300c{label or txt}\u300d \u91d1\u989d\u683c\u5f0f\u4e0d\u6b63\u786e")
+    return amt
+
+
+def unclaimed(should, enjoyed):
+    return max(_ZERO, should - enjoyed).quantize(_CENT, rounding=ROUND_HALF_UP)
+
+
+def calculate_benefits(record):
+    """Return ``({item: \u672a\u4eab\u4f18\u60e0}, total)`` for one enterprise.
+
+    ``record`` holds ``should_key(item)`` / ``enjoyed_key(item)`` amounts;
+    missing items count as 0.
+    """
+    diffs = {}
+    for item in TAX_ITEMS:
+        s = parse_amount(record.get(should_key(item)), should_key(item))
+        j = parse_amount(record.get(enjoyed_key(item)), enjoyed_key(item))
+        diffs[item] = unclaimed(s, j)
+    return diffs, sum(diffs.values(), _ZERO)
+
+
+def has_benefit_data(record):
+    return any(str(record.get(k) or "").strip() for k in BENEFIT_KEYS)
+
+
+# ====================== Portfolio roll-ups ======================
+def parse_fen(value, label=""):
+    """Like ``parse_amount`` but in integer fen; None when the text has more
+    than two decimals and must go through Decimal rounding instead."""
+    if value is None:
+        return 0
+    txt = str(value).strip()
+    if not txt:
+        return 0
+    whole, dot, cents = txt.partition(".")
+    if whole.isdigit() and whole.isascii() and len(cents) <= 2 and (cents.isdigit() or not dot):
+        return int(whole) * 100 + int(cents.ljust(2, "0"))
+    amt = parse_amount(txt, label)   # raises on bad text
+    fen = amt * 100
+    return int(fen) if fen == fen.to_integral_value() else None
+
+
+def unclaimed_fen(record):
+    """``calculate_benefits`` in integer fen: a tuple in ``TAX_ITEMS`` order."""
+    get = record.get
+    out = []
+    for item, sk, ek in _ITEM_KEYS:
+        # inline of parse_fen's plain-amount path; it runs 12 times per row
+        s, j = get(sk), get(ek)
+        fen = []
+        for v in (s, j):
+            txt = str(v).strip() if v is not None else ""
+            whole, dot, cents = txt.partition(".")
+            if whole.isdigit() and whole.isascii() and len(cents) <= 2 and (cents.isdigit() or not dot):
+                fen.append(int(whole) * 100 + int(cents.ljust(2, "0")) if cents else int(whole) * 100)
+            elif not txt:
+                fen.append(0)
+            else:
+                break
+        if len(fen) == 2:
+            out.append(fen[0] - fen[1] if fen[0] > fen[1] else 0)
+        else:
+            sf, jf = parse_fen(s, sk), parse_fen(j, ek)
+            if sf is None or jf is None:
+                out.append(int(unclaimed(parse_amount(s, sk), parse_amount(j, ek)) * 100))
+            else:
+                out.append(sf - jf if sf > jf else 0)
+    return tuple(out)
+
+
+def fen_to_yuan(fen):
+    return Decimal(fen).scaleb(-2)
+
+
+class BenefitRollup:
+    """\u672a\u4eab\u4f18\u60e0 over many enterprises: totals by tax item and by industry, and
+    the ``top_n`` largest unclaimed totals kept in a bounded min-heap.
+
+    Everything is summed in integer fen, so a million rows add up exactly.
+    Roll-ups built in separate processes combine with ``merge``.
+    """
+
+    def __init__(self, top_n=100):
+        self.top_n = top_n
+        self.rows = 0
+        self.errors = 0
+        self.item_fen = [0] * len(TAX_ITEMS)
+        self.item_count = [0] * len(TAX_ITEMS)   # enterprises with something unclaimed
+        self.industries = {}                     # industry -> [count, fen per item..., total]
+        self._heap = []                          # (total fen, seq, code, company)
+        self._seq = 0
+
+    def add(self, credit_code, record, industry="", company=""):
+        """Add one enterprise; return its fen tuple. Raises ValueError on bad amounts."""
+        try:
+            diffs = unclaimed_fen(record)
+        except ValueError:
+            self.errors += 1
+            raise
+        self.rows += 1
+        acc = self.industries.get(industry)
+        if acc is None:
+            acc = self.industries[industry] = [0] * (len(TAX_ITEMS) + 2)
+        acc[0] += 1
+        total = 0
+        item_fen, item_count = self.item_fen, self.item_count
+        for i, fen in enumerate(diffs):
+            if fen:
+                item_fen[i] += fen
+                item_count[i] += 1
+                acc[i + 1] += fen
+                total += fen
+        acc[-1] += total
+        if total and self.top_n:
+            self._push((total, self._seq, credit_code, company))
+            self._seq += 1
+        return diffs
+
+    def _push(self, entry):
+        # a min-heap of the best top_n: only a new total above the smallest enters
+        if len(self._heap) < self.top_n:
+            heapq.heappush(self._heap, entry)
+        elif entry[0] > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.errors += other.errors
+        for i in range(len(TAX_ITEMS)):
+            self.item_fen[i] += other.item_fen[i]
+            self.item_count[i] += other.item_count[i]
+        for industry, theirs in other.industries.items():
+            acc = self.industries.setdefault(industry, [0] * len(theirs))
+            for i, v in enumerate(theirs):
+                acc[i] += v
+        for total, _, code, company in other._heap:
+            self._push((total, self._seq, code, company))
+            self._seq += 1
+        return self
+
+    # --------------------------------------------------
+    @property
+    def total_fen(self):
+        return sum(self.item_fen)
+
+    def by_item(self):
+        """``[(item, enterprises, Decimal yuan)]`` in ``TAX_ITEMS`` order."""
+        return [(item, self.item_count[i], fen_to_yuan(self.item_fen[i]))
+                for i, item in enumerate(TAX_ITEMS)]
+
+    def by_industry(self):
+        """``[(industry, enterprises, {item: yuan}, total yuan)]``, largest total first."""
+        rows = sorted(self.industries.items(), key=lambda kv: (-kv[1][-1], kv[0]))
+        return [(industry, acc[0],
+                 {item: fen_to_yuan(acc[i + 1]) for i, item in enumerate(TAX_ITEMS)},
+                 fen_to_yuan(acc[-1]))
+                for industry, acc in rows]
+
+    def top(self):
+        """``[(credit_code, company, total yuan)]``, largest first (ties by arrival)."""
+        return [(code, company, fen_to_yuan(total))
+                for total, _, code, company in sorted(self._heap, key=lambda e: (-e[0], e[1]))]
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""Local SQLite store of reviewed cases, one row per (\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801, B_\u671f\u95f4).
+
+A case is everything on screen for one enterprise and period: the company
+card, the A-R text as typed, the six ``TAX_ITEMS`` rows and the issue list.
+The A-R values (keyed by field letter), benefit rows and issues are kept as
+compact JSON so a case is one indexed row read. The database runs in WAL mode; ``save_many`` writes
+in batched transactions for bulk loads.
+"""
+import datetime
+import json
+import os
+import sqlite3
+from collections import namedtuple
+
+from rule_engine import FIELD_KEYS, INDUSTRY_KEY, PERIOD_KEY
+
+BATCH_ROWS = 10000
+
+# Field letter <-> record key, for the compact ``record`` column
+_LETTER = {key: key.split("_", 1)[0] for key in FIELD_KEYS}
+_KEY = {letter: key for key, letter in _LETTER.items()}
+
+Case = namedtuple("Case", "credit_code period company record benefits issues ruleset updated_at",
+                  defaults=("", "", None, None, (), "", ""))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cases (
+    credit_code TEXT NOT NULL,
+    period      TEXT NOT NULL,
+    company     TEXT NOT NULL,
+    industry    TEXT NOT NULL,
+    record      TEXT NOT NULL,
+    benefits    TEXT NOT NULL,
+    issues      TEXT NOT NULL,
+    ruleset     TEXT NOT NULL,
+    updated_at  TEXT NOT NULL,
+    PRIMARY KEY (credit_code, period)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cases_period ON cases (period);
+"""
+
+_UPSERT = """
+INSERT INTO cases (credit_code, period, company, industry, record, benefits,
+                   issues, ruleset, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (credit_code, period) DO UPDATE SET
+    company = excluded.company, industry = excluded.industry,
+    record = excluded.record, benefits = excluded.benefits,
+    issues = excluded.issues, ruleset = excluded.ruleset,
+    updated_at = excluded.updated_at
+"""
+
+_COLUMNS = "credit_code, period, company, record, benefits, issues, ruleset, updated_at"
+
+
+def default_path():
+    return os.environ.get("TAXAPP_DB") or os.path.join(
+        os.path.expanduser("~"), ".taxapp", "cases.db")
+
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def _row(case, now):
+    record = case.record or {}
+    # only the A-R fields are kept; blanks are dropped to keep rows small
+    fields = {}
+    for key, letter in _LETTER.items():
+        value = record.get(key)
+        if value is not None and value != "":
+            fields[letter] = str(value)
+    period = str(case.period or record.get(PERIOD_KEY) or "").strip()
+    return (str(case.credit_code).strip(), period, case.company or "",
+            str(record.get(INDUSTRY_KEY) or ""), _dumps(fields),
+            _dumps(case.benefits) if case.benefits else "{}",
+            _dumps(case.issues) if case.issues else "[]",
+            case.ruleset or "", case.updated_at or now)
+
+
+def _case(row):
+    code, period, company, record, benefits, issues, ruleset, updated = row
+    record = {_KEY[k]: v for k, v in json.loads(record).items() if k in _KEY}
+    return Case(code, period, company, record, json.loads(benefits),
+                [tuple(i) for i in json.loads(issues)], ruleset, updated)
+
+
+class CaseStore:
+    """Open (creating if needed) the case database at ``path``."""
+
+    def __init__(self, path=None):
+        self.path = path or default_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    # --------------------------------------------------
+    def save(self, case):
+        """Insert or replace one case (keyed by credit code and period)."""
+        if not str(case.credit_code).strip():
+            raise ValueError("\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801\u4e0d\u80fd\u4e3a\u7a7a")
+        self.conn.execute(_UPSERT, _row(case, _now()))
+
+    def save_many(self, cases, batch_rows=BATCH_ROWS, progress=None):
+        """Upsert an iterable of cases in transactions of ``batch_rows``; return the count.
+
+        Cases with an empty credit code are skipped. ``progress`` is called
+        with the running count after every batch.
+        """
+        now = _now()
+        done = 0
+        batch = []
+        cur = self.conn.cursor()
+        for case in cases:
+            row = _row(case, now)
+            if not row[0]:
+                continue
+            batch.append(row)
+            if len(batch) >= batch_rows:
+                done += self._write(cur, batch)
+                if progress:
+                    progress(done)
+        if batch:
+            done += self._write(cur, batch)
+            if progress:
+                progress(done)
+        return done
+
+    def _write(self, cur, batch):
+        cur.execute("BEGIN")
+        try:
+            cur.executemany(_UPSERT, batch)
+        except BaseException:
+            cur.execute("ROLLBACK")
+            raise
+        cur.execute("COMMIT")
+        n = len(batch)
+        batch.clear()
+        return n
+
+    # --------------------------------------------------
+    def load(self, credit_code, period=None):
+        """The case for ``period``, or the latest period on file; None if absent."""
+        code = str(credit_code).strip()
+        if period:
+            row = self.conn.execute(
+                f"SELECT {_COLUMNS} FROM cases WHERE credit_code = ? AND period = ?",
+                (code, str(period).strip())).fetchone()
+        else:
+            row = self.conn.execute(
+                f"SELECT {_COLUMNS} FROM cases WHERE credit_code = ? "
+                "ORDER BY period DESC LIMIT 1", (code,)).fetchone()
+        return _case(row) if row else None
+
+    def periods(self, credit_code):
+        """Periods on file for one enterprise, newest first."""
+        return [p for (p,) in self.conn.execute(
+            "SELECT period FROM cases WHERE credit_code = ? ORDER BY period DESC",
+            (str(credit_code).strip(),))]
+
+    def in_period(self, period):
+        """Yield every case of one period in credit-code order."""
+        for row in self.conn.execute(
+                f"SELECT {_COLUMNS} FROM cases WHERE period = ? ORDER BY credit_code",
+                (str(period).strip(),)):
+            yield _case(row)
+
+    def count(self):
+        return self.conn.execute("SELECT count(*) FROM cases").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec="seconds")
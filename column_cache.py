@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""Memory-mapped columnar copy of an imported portfolio.
+
+The first ``open_columns(path)`` streams the workbook or CSV once through
+``iter_chunks`` and writes one ``.cols`` file; later calls map that file and
+are ready in milliseconds, and every process that maps it shares the same
+page-cache pages. Layout (all little-endian, arrays 64-byte aligned)::
+
+    b"TAXCOLS1" | uint32 header length | JSON header | arrays...
+
+* ``row``         int32 Excel row number of each record;
+* ``C_...``-``R_...`` one int64 fen column per A-R amount (``NUMERIC_FIELDS``);
+* ``industry``    uint16 index into the header's ``industries`` dictionary;
+* ``code_offsets`` / ``code_bytes`` and ``name_offsets`` / ``name_bytes``
+  the credit codes and company names as UTF-8, record ``i`` spanning
+  ``bytes[offsets[i]:offsets[i + 1]]``.
+
+Rows whose amounts do not parse keep their message in the header's
+``errors`` (and zeros in the arrays); rows with an amount of ``MAX_FEN`` or
+more keep their original text in ``fallback``, as ``to_columns`` does.
+The header records the source's size and modification time plus the sheet
+and encoding it was read with; any difference, or a new ``FORMAT``, makes
+``open_columns`` rebuild the file.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from batch_import import CHUNK_SIZE, COMPANY_NAME_KEY, CREDIT_CODE_KEY, iter_chunks
+from rule_columns import MAX_FEN, industry_code
+from rule_engine import INDUSTRY_KEY, NUMERIC_FIELDS, parse_fen
+
+MAGIC = b"TAXCOLS1"
+FORMAT = 1
+ALIGN = 64
+
+
+def default_dir():
+    return os.environ.get("TAXAPP_COLUMNS") or os.path.join(
+        os.path.expanduser("~"), ".taxapp", "columns")
+
+
+def cache_path(source, sheet=None, encoding="utf-8-sig", directory=None):
+    key = f"{os.path.abspath(source)}\0{sheet or ''}\0{encoding}"
+    name = hashlib.sha256(key.encode("utf-8")).hexdigest()[:20]
+    return os.path.join(directory or default_dir(), f"{name}.cols")
+
+
+def _stamp(source, sheet, encoding):
+    st = os.stat(source)
+    return {"source": os.path.abspath(source), "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns, "sheet": sheet or "", "encoding": encoding}
+
+
+class ColumnTable:
+    """A mapped ``.cols`` file; arrays are read-only views into the mapping."""
+
+    def __init__(self, path):
+        self.path = path
+        self._map = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(self._map[:8]) != MAGIC:
+            raise ValueError(f"{path}: \u4e0d\u662f\u5217\u5f0f\u7f13\u5b58\u6587\u4ef6")
+        size = int(np.frombuffer(self._map[8:12], dtype="<u4")[0])
+        self.header = json.loads(bytes(self._map[12:12 + size]).decode("utf-8"))
+        self.rows = self.header["rows"]
+        self.arrays = {}
+        for name, (dtype, offset, count) in self.header["arrays"].items():
+            self.arrays[name] = np.frombuffer(self._map, dtype=dtype, count=count, offset=offset)
+        self.errors = {int(i): msg for i, msg in self.header["errors"].items()}
+        self.fallback = {int(i): rec for i, rec in self.header["fallback"].items()}
+        self.industries = self.header["industries"]
+        self.row = self.arrays["row"]
+        # dictionary entry -> rule_columns industry code, expanded once per open
+        lookup = np.array([industry_code(name) for name in self.industries] or [0], dtype=np.int8)
+        self.industry = lookup[self.arrays["industry"]]
+
+    def matches(self, source, sheet=None, encoding="utf-8-sig"):
+        try:
+            stamp = _stamp(source, sheet, encoding)
+        except OSError:
+            return False
+        return all(self.header.get(k) == v for k, v in stamp.items())
+
+    def __len__(self):
+        return self.rows
+
+    # --------------------------------------------------
+    def _text(self, kind, i):
+        off = self.arrays[f"{kind}_offsets"]
+        return bytes(self.arrays[f"{kind}_bytes"][off[i]:off[i + 1]]).decode("utf-8")
+
+    def credit_code(self, i):
+        return self._text("code", i)
+
+    def company(self, i):
+        return self._text("name", i)
+
+    def industry_name(self, i):
+        return self.industries[int(self.arrays["industry"][i])]
+
+    def columns(self, start=0, stop=None):
+        """Rows ``start:stop`` in the shape ``rule_columns.to_columns`` returns
+        (the arrays are views; ``_fallback`` is re-based to ``start``)."""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        cols = {key: self.arrays[key][start:stop] for key in NUMERIC_FIELDS}
+        cols[INDUSTRY_KEY] = self.industry[start:stop]
+        cols["_fallback"] = {i - start: rec for i, rec in self.fallback.items() if start <= i < stop}
+        return cols
+
+    def valid(self, start=0, stop=None):
+        """True for rows whose amounts parsed and fit the int64 kernels."""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        keep = np.ones(stop - start, dtype=bool)
+        for i in list(self.errors) + list(self.fallback):
+            if start <= i < stop:
+                keep[i - start] = False
+        return keep
+
+    def iter_columns(self, chunk_size=CHUNK_SIZE * 20):
+        """Yield ``(start, cols, valid)`` slices of ``chunk_size`` rows."""
+        for start in range(0, self.rows, chunk_size):
+            yield start, self.columns(start, start + chunk_size), self.valid(start, start + chunk_size)
+
+    def close(self):
+        self.arrays = {}
+        self.industry = self.row = None
+        mm = getattr(self._map, "_mmap", None)
+        self._map = None
+        if mm is not None:
+            try:
+                mm.close()
+            except BufferError:
+                pass   # a caller still holds a view; the map goes with it
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ====================== Build ======================
+class _Spool:
+    """Per-array temporary files, appended chunk by chunk and joined at the end."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}
+        self.dtypes = {}
+        self.counts = {}
+
+    def write(self, name, array):
+        fh = self.files.get(name)
+        if fh is None:
+            fh = self.files[name] = open(os.path.join(self.directory, name), "wb")
+            self.dtypes[name] = array.dtype.str
+            self.counts[name] = 0
+        fh.write(np.ascontiguousarray(array).tobytes())
+        self.counts[name] += len(array)
+
+
+def _offsets(texts, base):
+    blob = [t.encode("utf-8") for t in texts]
+    lengths = np.fromiter((len(b) for b in blob), dtype=np.int64, count=len(blob))
+    return base + np.cumsum(lengths), b"".join(blob)
+
+
+def build(source, path=None, sheet=None, encoding="utf-8-sig", chunk_size=CHUNK_SIZE, progress=None):
+    """Import ``source`` and write its ``.cols`` file; returns the path.
+
+    ``progress(rows)`` is called after every chunk (it may raise to abort).
+    """
+    path = path or cache_path(source, sheet, encoding)
+    stamp = _stamp(source, sheet, encoding)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    industries, errors, fallback = {}, {}, {}
+    rows = 0
+    code_end = name_end = 0
+    with tempfile.TemporaryDirectory(dir=directory, prefix=".cols-") as tmp:
+        spool = _Spool(tmp)
+        spool.write("code_offsets", np.zeros(1, dtype="<i8"))
+        spool.write("name_offsets", np.zeros(1, dtype="<i8"))
+        try:
+            for chunk in iter_chunks(source, chunk_size, sheet, encoding):
+                n = len(chunk)
+                fen = np.zeros((len(NUMERIC_FIELDS), n), dtype="<i8")
+                dict_codes = np.empty(n, dtype="<u2")
+                for j, (_, record) in enumerate(chunk):
+                    name = str(record.get(INDUSTRY_KEY) or "").strip()
+                    code = industries.get(name)
+                    if code is None:
+                        if len(industries) >= 0xFFFF:
+                            raise ValueError("\u884c\u4e1a\u540d\u79f0\u8fc7\u591a\uff0c\u65e0\u6cd5\u5efa\u7acb\u5217\u5f0f\u7f13\u5b58")
+                        code = industries[name] = len(industries)
+                    dict_codes[j] = code
+                    try:
+                        row = [parse_fen(key, record.get(key)) for key in NUMERIC_FIELDS]
+                    except ValueError as ex:
+                        errors[str(rows + j)] = str(ex)
+                        continue
+                    if max(row) >= MAX_FEN:
+                        fallback[str(rows + j)] = {k: record.get(k, "") for k in (INDUSTRY_KEY,) + NUMERIC_FIELDS}
+                        continue
+                    fen[:, j] = row
+                spool.write("row", np.array([r for r, _ in chunk], dtype="<i4"))
+                for key, col in zip(NUMERIC_FIELDS, fen):
+                    spool.write(key, col)
+                spool.write("industry", dict_codes)
+                offs, blob = _offsets([rec.get(CREDIT_CODE_KEY, "") for _, rec in chunk], code_end)
+                spool.write("code_offsets", offs)
+                spool.write("code_bytes", np.frombuffer(blob, dtype=np.uint8))
+                code_end = int(offs[-1])
+                offs, blob = _offsets([rec.get(COMPANY_NAME_KEY, "") for _, rec in chunk], name_end)
+                spool.write("name_offsets", offs)
+                spool.write("name_bytes", np.frombuffer(blob, dtype=np.uint8))
+                name_end = int(offs[-1])
+                rows += n
+                if progress is not None:
+                    progress(rows)
+        finally:
+            for fh in spool.files.values():
+                fh.close()
+
+        order = ["row"] + list(NUMERIC_FIELDS) + ["industry", "code_offsets", "code_bytes",
+                                                  "name_offsets", "name_bytes"]
+        empty = {"row": "<i4", "industry": "<u2", "code_bytes": "|u1", "name_bytes": "|u1"}
+        header = dict(stamp, format=FORMAT, rows=rows, errors=errors, fallback=fallback,
+                      industries=sorted(industries, key=industries.get), arrays={})
+        # offsets depend on the header length, which depends on the offsets' digits:
+        # size the header with a generous pad, then lay the arrays out after it
+        sizes = {name: (spool.dtypes.get(name) or empty.get(name, "<i8"),
+                        spool.counts.get(name, 0)) for name in order}
+        blob = b""
+        for _ in range(3):
+            offset = _align(12 + len(blob) + 256)
+            header["arrays"] = {}
+            for name in order:
+                dtype, count = sizes[name]
+                header["arrays"][name] = [dtype, offset, count]
+                offset = _align(offset + np.dtype(dtype).itemsize * count)
+            blob = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            if 12 + len(blob) <= header["arrays"]["row"][1]:
+                break
+
+        out = path + f".{os.getpid()}.tmp"
+        with open(out, "wb") as fh:
+            fh.write(MAGIC)
+            fh.write(np.array([len(blob)], dtype="<u4").tobytes())
+            fh.write(blob)
+            for name in order:
+                _, offset, _ = header["arrays"][name]
+                fh.write(b"\0" * (offset - fh.tell()))
+                src = os.path.join(tmp, name)
+                if os.path.exists(src):
+                    with open(src, "rb") as part:
+                        shutil.copyfileobj(part, fh, 1 << 20)
+            fh.write(b"\0" * (_align(fh.tell()) - fh.tell()))
+        os.replace(out, path)
+    return path
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def open_columns(source, sheet=None, encoding="utf-8-sig", directory=None, progress=None):
+    """The mapped columns of ``source``, (re)built first when missing or stale."""
+    path = cache_path(source, sheet, encoding, directory)
+    if os.path.exists(path):
+        try:
+            table = ColumnTable(path)
+        except (OSError, ValueError, KeyError):
+            table = None
+        if table is not None:
+            if table.header.get("format") == FORMAT and table.matches(source, sheet, encoding):
+                return table
+            table.close()
+    build(source, path, sheet, encoding, progress=progress)
+    return ColumnTable(path)
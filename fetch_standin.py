@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Local stand-in for the field lookup service that ``field_fetch`` talks to.
+
+    python fetch_standin.py [--port 8765] [--latency 0.05] [--fail-rate 0.02]
+
+Answers ``GET /taxpayers/<code>`` with ``{"credit_code", "\u4f01\u4e1a\u540d\u79f0", "fields"}``
+where the A-R values are derived from a hash of the code, so every run sees
+the same data. ``--latency`` delays each answer like a slow back end and
+``--fail-rate`` returns that share of 503s to exercise retries. Codes that
+start with ``0000`` are unknown (404).
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+from urllib.parse import unquote
+
+from rule_engine import FIELD_KEYS, INDUSTRY_CHOICES, INDUSTRY_KEY, PERIOD_KEY
+from batch_import import COMPANY_NAME_KEY
+
+_STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 503: "Service Unavailable"}
+
+
+def standin_fields(code):
+    """Deterministic A-R text values for ``code``."""
+    seed = int.from_bytes(hashlib.blake2b(code.encode("utf-8"), digest_size=8).digest(), "big")
+    rng = random.Random(seed)
+    fields = {}
+    for key in FIELD_KEYS:
+        if key == INDUSTRY_KEY:
+            fields[key] = rng.choice(INDUSTRY_CHOICES)
+        elif key == PERIOD_KEY:
+            fields[key] = "2024"
+        else:
+            fields[key] = f"{rng.randrange(0, 300_000_000) / 100:.2f}"
+    return fields
+
+
+class StandinServer:
+    def __init__(self, latency=0.0, fail_rate=0.0, seed=0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.connections = 0
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    request = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                self.requests += 1
+                line = request.split(b"\r\n", 1)[0].decode("latin-1")
+                keep = b"connection: close" not in request.lower()
+                status, body = await self.answer(line)
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                writer.write((f"HTTP/1.1 {status} {_STATUS[status]}\r\n"
+                              "Content-Type: application/json; charset=utf-8\r\n"
+                              f"Content-Length: {len(payload)}\r\n"
+                              + ("Retry-After: 0.05\r\n" if status == 503 else "")
+                              + ("" if keep else "Connection: close\r\n")
+                              + "\r\n").encode("latin-1") + payload)
+                await writer.drain()
+                if not keep:
+                    return
+        finally:
+            writer.close()
+
+    async def answer(self, line):
+        parts = line.split()
+        if len(parts) < 2 or parts[0] != "GET" or not parts[1].startswith("/taxpayers/"):
+            return 400, {"error": "bad request"}
+        code = unquote(parts[1][len("/taxpayers/"):])
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.fail_rate and self.rng.random() < self.fail_rate:
+            return 503, {"error": "busy"}
+        if not code or code.startswith("0000"):
+            return 404, {"error": "unknown taxpayer"}
+        return 200, {"credit_code": code, COMPANY_NAME_KEY: f"\u4f01\u4e1a{code[-6:]}",
+                     "fields": standin_fields(code)}
+
+
+async def start(host="127.0.0.1", port=0, **kw):
+    """Start a stand-in server; return ``(server, StandinServer, base_url)``."""
+    handler = StandinServer(**kw)
+    server = await asyncio.start_server(handler.handle, host, port, limit=2 ** 16)
+    port = server.sockets[0].getsockname()[1]
+    return server, handler, f"http://{host}:{port}"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="field_fetch \u672c\u5730\u66ff\u8eab\u670d\u52a1")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.05, help="\u6bcf\u6b21\u5e94\u7b54\u5ef6\u8fdf\uff08\u79d2\uff09")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="\u8fd4\u56de 503 \u7684\u6bd4\u4f8b")
+    args = ap.parse_args(argv)
+
+    async def run():
+        server, _, url = await start(args.host, args.port, latency=args.latency,
+                                     fail_rate=args.fail_rate)
+        print(f"stand-in listening on {url}", flush=True)
+        async with server:
+            await server.serve_forever()
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
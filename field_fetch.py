@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""Fetch A-R field values for many credit codes from an HTTP service.
+
+``FIELD_SOURCE_MAP`` describes each field as a manual lookup in \u91d1\u7a0e\u4e09\u671f or
+\u81ea\u7136\u4eba\u7535\u5b50\u7a0e\u52a1\u5c40. Where those lookups are exposed as an internal HTTP/JSON
+service, ``Fetcher`` pre-fills records for thousands of enterprises at once:
+
+* ``HttpFieldSource`` - GET ``{base_url}{path}`` per code over a pool of
+  keep-alive connections (stdlib asyncio, no extra dependency);
+* ``Fetcher``         - a bounded number of requests in flight, retries with
+  exponential backoff and jitter on connection errors, 429 and 5xx, and a
+  ``TTLCache`` in front of the source.
+
+Any object with an ``async fetch(code) -> dict`` method can stand in for
+``HttpFieldSource``. The JSON body is either ``{"fields": {...}}`` or a flat
+object; keys may be field keys, letters or titles, as in batch import.
+``fetch_standin.py`` is a local server that answers the same way.
+"""
+import asyncio
+import json
+import random
+import ssl
+import time
+from collections import OrderedDict, namedtuple
+from urllib.parse import quote, urlsplit
+
+from rule_engine import FIELD_KEYS
+from batch_import import COMPANY_NAME_KEY, CREDIT_CODE_KEY, HEADER_ALIASES, _cell_text
+
+CONCURRENCY = 32
+RETRIES = 3
+BACKOFF = 0.2
+MAX_BACKOFF = 10.0
+TIMEOUT = 10.0
+CACHE_TTL = 3600.0
+PATH_TEMPLATE = "/taxpayers/{code}"
+
+FetchResult = namedtuple("FetchResult", "credit_code record error")
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """A lookup failed; ``retryable`` tells the fetcher whether to try again."""
+
+    def __init__(self, message, retryable=False, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class _Dropped(FetchError):
+    pass
+
+
+def record_from_json(data):
+    """Map a JSON object to ``{field key: text}``; unknown keys are dropped."""
+    if isinstance(data, dict) and isinstance(data.get("fields"), dict):
+        fields = dict(data["fields"])
+        for key in (COMPANY_NAME_KEY, "company"):
+            if data.get(key) and COMPANY_NAME_KEY not in fields:
+                fields[COMPANY_NAME_KEY] = data[key]
+        data = fields
+    if not isinstance(data, dict):
+        raise FetchError("\u8fd4\u56de\u5185\u5bb9\u4e0d\u662f JSON \u5bf9\u8c61")
+    record = {}
+    for name, value in data.items():
+        key = HEADER_ALIASES.get(str(name).strip())
+        if key in FIELD_KEYS or key == COMPANY_NAME_KEY:
+            record[key] = _cell_text(value)
+    return record
+
+
+# ====================== Cache ======================
+class TTLCache:
+    """In-memory ``code -> record`` memo; entries expire after ``ttl`` seconds
+    and the least recently used go first past ``max_entries``."""
+
+    def __init__(self, ttl=CACHE_TTL, max_entries=100_000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._data = OrderedDict()
+
+    def get(self, code):
+        item = self._data.get(code)
+        if item is None:
+            return None
+        expires, record = item
+        if expires < self.clock():
+            del self._data[code]
+            return None
+        self._data.move_to_end(code)
+        return record
+
+    def put(self, code, record):
+        self._data[code] = (self.clock() + self.ttl, record)
+        self._data.move_to_end(code)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ====================== HTTP ======================
+class _Pool:
+    """Keep-alive HTTP/1.1 connections to one host, at most ``size`` open."""
+
+    def __init__(self, host, port, tls, size, timeout):
+        self.host, self.port, self.tls = host, port, tls
+        self.timeout = timeout
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+        self.opened = 0
+
+    async def request(self, target, headers):
+        async with self._slots:
+            reused = bool(self._idle)
+            conn = self._idle.pop() if reused else await self._open()
+            try:
+                status, head, body = await self._exchange(conn, target, headers)
+            except _Dropped:
+                if not reused:
+                    raise
+                # the server dropped an idle connection; try once on a new one
+                conn = await self._open()
+                status, head, body = await self._exchange(conn, target, headers)
+            if head.get("connection", "").lower() == "close":
+                conn[1].close()
+            else:
+                self._idle.append(conn)
+            return status, head, body
+
+    async def _open(self):
+        ctx = ssl.create_default_context() if self.tls else None
+        try:
+            conn = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, ssl=ctx), self.timeout)
+        except (OSError, asyncio.TimeoutError) as ex:
+            raise FetchError(f"\u65e0\u6cd5\u8fde\u63a5 {self.host}:{self.port}\uff1a{ex}", retryable=True) from None
+        self.opened += 1
+        return conn
+
+    async def _exchange(self, conn, target, headers):
+        reader, writer = conn
+        lines = [f"GET {target} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                 "Accept: application/json", "Connection: keep-alive"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        try:
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+            await writer.drain()
+            return await asyncio.wait_for(self._read_response(reader), self.timeout)
+        except asyncio.TimeoutError:
+            writer.close()
+            raise FetchError(f"\u8bf7\u6c42\u8d85\u65f6\uff08{self.timeout:g} \u79d2\uff09", retryable=True) from None
+        except (OSError, asyncio.IncompleteReadError) as ex:
+            writer.close()
+            raise _Dropped(f"\u8fde\u63a5\u4e2d\u65ad\uff1a{ex!r}", retryable=True) from None
+        except BaseException:
+            writer.close()
+            raise
+
+    async def _read_response(self, reader):
+        status_line = await reader.readuntil(b"\r\n")
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise FetchError(f"\u65e0\u6548\u7684 HTTP \u54cd\u5e94\uff1a{status_line[:40]!r}") from None
+        head = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            head[name.strip().lower()] = value.strip()
+        if head.get("transfer-encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    while await reader.readuntil(b"\r\n") != b"\r\n":
+                        pass   # trailers
+                    break
+                body += await reader.readexactly(size)
+                await reader.readexactly(2)
+            return status, head, bytes(body)
+        length = int(head.get("content-length", 0))
+        return status, head, await reader.readexactly(length)
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+        for _, writer in idle:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+
+def _seconds(value):
+    # only the delta-seconds form of Retry-After; an HTTP date falls back to backoff
+    try:
+        return min(MAX_BACKOFF, max(0.0, float(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpFieldSource:
+    """GET ``base_url`` + ``path`` (``{code}`` is replaced) and parse the JSON."""
+
+    def __init__(self, base_url, path=PATH_TEMPLATE, pool_size=CONCURRENCY,
+                 timeout=TIMEOUT, headers=None):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"\u65e0\u6548\u7684\u670d\u52a1\u5730\u5740\uff1a{base_url}")
+        tls = parts.scheme == "https"
+        self.prefix = parts.path.rstrip("/")
+        self.path = path
+        self.headers = dict(headers or {})
+        self.pool = _Pool(parts.hostname, parts.port or (443 if tls else 80), tls,
+                          pool_size, timeout)
+
+    async def fetch(self, code):
+        target = self.prefix + self.path.format(code=quote(code, safe=""))
+        status, head, body = await self.pool.request(target, self.headers)
+        if status != 200:
+            raise FetchError(f"HTTP {status}", retryable=status in _RETRY_STATUS,
+                             retry_after=_seconds(head.get("retry-after")))
+        try:
+            data = json.loads(body.decode("utf-8"))
+        except (UnicodeDecodeError, ValueError):
+            raise FetchError("\u8fd4\u56de\u5185\u5bb9\u4e0d\u662f\u6709\u6548\u7684 JSON") from None
+        return record_from_json(data)
+
+    async def close(self):
+        await self.pool.close()
+
+
+# ====================== Fetcher ======================
+class Fetcher:
+    """Fetch many codes through ``source`` with a concurrency limit and retries."""
+
+    def __init__(self, source, concurrency=CONCURRENCY, retries=RETRIES,
+                 backoff=BACKOFF, cache=None):
+        self.source = source
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache
+        self.requests = self.retried = self.cache_hits = self.failed = 0
+
+    async def fetch_one(self, code):
+        if self.cache is not None:
+            record = self.cache.get(code)
+            if record is not None:
+                self.cache_hits += 1
+                return FetchResult(code, dict(record), None)
+        attempt = 0
+        while True:
+            self.requests += 1
+            try:
+                record = await self.source.fetch(code)
+            except FetchError as ex:
+                if not ex.retryable or attempt >= self.retries:
+                    self.failed += 1
+                    return FetchResult(code, None, str(ex))
+                delay = ex.retry_after
+                if delay is None:
+                    delay = min(MAX_BACKOFF, self.backoff * 2 ** attempt) * (0.5 + random.random())
+                attempt += 1
+                self.retried += 1
+                await asyncio.sleep(delay)
+                continue
+            if self.cache is not None:
+                self.cache.put(code, record)
+            return FetchResult(code, record, None)
+
+    async def fetch_many(self, codes, progress=None):
+        """Return one ``FetchResult`` per code, in input order.
+
+        At most ``concurrency`` lookups are in flight; ``progress`` is called
+        with ``(done, total)`` as results come in.
+        """
+        codes = list(codes)
+        results = [None] * len(codes)
+        todo = iter(enumerate(codes))
+        done = 0
+
+        async def worker():
+            nonlocal done
+            for i, code in todo:
+                results[i] = await self.fetch_one(code)
+                done += 1
+                if progress:
+                    progress(done, len(codes))
+
+        await asyncio.gather(*(worker() for _ in range(max(1, min(self.concurrency, len(codes))))))
+        return results
+
+    def summary(self):
+        return (f"\u8bf7\u6c42 {self.requests:,} \u6b21\uff0c\u91cd\u8bd5 {self.retried:,} \u6b21\uff0c"
+                f"\u7f13\u5b58\u547d\u4e2d {self.cache_hits:,}\uff0c\u5931\u8d25 {self.failed:,}")
+
+
+def fetch_records(codes, base_url, path=PATH_TEMPLATE, concurrency=CONCURRENCY,
+                  retries=RETRIES, timeout=TIMEOUT, cache=None, progress=None):
+    """Blocking helper: return ``(results, fetcher)`` for ``codes``."""
+    async def run():
+        source = HttpFieldSource(base_url, path, concurrency, timeout)
+        fetcher = Fetcher(source, concurrency, retries, cache=cache)
+        try:
+            return await fetcher.fetch_many(codes, progress), fetcher
+        finally:
+            await source.close()
+    return asyncio.run(run())
+
+
+def codes_from_rows(rows):
+    """Credit codes from raw rows (header first) with a \u793e\u4f1a\u4fe1\u7528\u4ee3\u7801 column."""
+    rows = iter(rows)
+    header = next(rows, None) or []
+    keys = [HEADER_ALIASES.get(str(h).strip()) if h is not None else None for h in header]
+    if CREDIT_CODE_KEY not in keys:
+        raise ValueError("\u672a\u8bc6\u522b\u5230\u300c\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801\u300d\u5217")
+    ci = keys.index(CREDIT_CODE_KEY)
+    seen = set()
+    for row in rows:
+        code = _cell_text(row[ci]) if ci < len(row) else ""
+        if code and code not in seen:
+            seen.add(code)
+            yield code
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""Counters and latency histograms for the screening phases and each rule.
+
+Recording is off unless ``TAXAPP_METRICS`` is set or ``METRICS.enable()`` is
+called. Call sites test ``METRICS.enabled`` before reading the clock, and
+``METRICS.phase(name)`` hands back a shared no-op context manager while it is
+off, so a disabled run pays one attribute lookup per chunk or rule.
+
+Series are keyed by ``(family, label)``; ``FAMILIES`` lists what each family
+means. Histograms use the fixed ``BUCKETS`` (seconds) so snapshots from worker
+processes can simply be added up with ``merge``. ``to_json`` and
+``to_prometheus`` (text exposition format 0.0.4) render the same data.
+"""
+import datetime
+import json
+import os
+from bisect import bisect_left
+from time import perf_counter
+
+PREFIX = "taxapp_"
+
+# family -> (type, label name, help)
+FAMILIES = {
+    "phase_seconds":    ("histogram", "phase", "Wall time per screening phase call"),
+    "rule_seconds":     ("histogram", "rule", "Time spent evaluating one rule per call (row or chunk)"),
+    "rule_rows_total":  ("counter", "rule", "Rows a rule was evaluated on"),
+    "rule_hits_total":  ("counter", "rule", "Rows a rule flagged"),
+}
+
+BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+           1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile (0 when empty)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class _Timer:
+    __slots__ = ("registry", "family", "label", "start")
+
+    def __init__(self, registry, family, label):
+        self.registry = registry
+        self.family = family
+        self.label = label
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.family, self.label, perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullTimer()
+
+
+class Registry:
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+    def enable(self, on=True):
+        self.enabled = bool(on)
+
+    def reset(self):
+        self.counters = {}     # (family, label) -> int
+        self.histograms = {}   # (family, label) -> Histogram
+
+    # --------------------------------------------------
+    def inc(self, family, label, n=1):
+        key = (family, label)
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def observe(self, family, label, seconds):
+        h = self.histograms.get((family, label))
+        if h is None:
+            h = self.histograms[(family, label)] = Histogram()
+        h.observe(seconds)
+
+    def timer(self, family, label):
+        return _Timer(self, family, label) if self.enabled else _NULL
+
+    def phase(self, name):
+        """``with METRICS.phase("render"): ...`` records into ``phase_seconds``."""
+        return self.timer("phase_seconds", name)
+
+    # --------------------------------------------------
+    def snapshot(self):
+        """Plain, picklable copy of every series (for ``merge`` in another process)."""
+        return {"counters": dict(self.counters),
+                "histograms": {k: (list(h.counts), h.sum, h.count)
+                               for k, h in self.histograms.items()}}
+
+    def merge(self, snap):
+        for key, n in snap["counters"].items():
+            self.counters[key] = self.counters.get(key, 0) + n
+        for key, (counts, total, count) in snap["histograms"].items():
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = Histogram()
+            h.counts = [a + b for a, b in zip(h.counts, counts)]
+            h.sum += total
+            h.count += count
+
+    def rule_table(self):
+        """``(rule, calls, rows, hits, seconds, p95)`` per rule, slowest first."""
+        out = []
+        for (family, label), h in self.histograms.items():
+            if family == "rule_seconds":
+                out.append((label, h.count,
+                            self.counters.get(("rule_rows_total", label), 0),
+                            self.counters.get(("rule_hits_total", label), 0),
+                            h.sum, h.quantile(0.95)))
+        out.sort(key=lambda r: -r[4])
+        return out
+
+    def phase_table(self):
+        """``(phase, calls, seconds, p50, p95)``, slowest first."""
+        out = [(label, h.count, h.sum, h.quantile(0.5), h.quantile(0.95))
+               for (family, label), h in self.histograms.items() if family == "phase_seconds"]
+        out.sort(key=lambda r: -r[2])
+        return out
+
+    # --------------------------------------------------
+    def to_json(self):
+        doc = {"generated": datetime.datetime.now().isoformat(timespec="seconds"),
+               "buckets": list(BUCKETS), "metrics": {}}
+        for family, (kind, label_name, text) in FAMILIES.items():
+            series = {}
+            if kind == "histogram":
+                for (fam, label), h in sorted(self.histograms.items()):
+                    if fam == family:
+                        series[label] = {"count": h.count, "sum": h.sum,
+                                         "p50": h.quantile(0.5), "p95": h.quantile(0.95),
+                                         "buckets": list(h.counts)}
+            else:
+                for (fam, label), n in sorted(self.counters.items()):
+                    if fam == family:
+                        series[label] = n
+            if series:
+                doc["metrics"][PREFIX + family] = {"type": kind, "label": label_name,
+                                                   "help": text, "series": series}
+        return doc
+
+    def to_prometheus(self):
+        lines = []
+        for family, (kind, label_name, text) in FAMILIES.items():
+            name = PREFIX + family
+            if kind == "histogram":
+                series = sorted((label, h) for (fam, label), h in self.histograms.items()
+                                if fam == family)
+            else:
+                series = sorted((label, n) for (fam, label), n in self.counters.items()
+                                if fam == family)
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for label, value in series:
+                lab = f'{label_name}="{_escape(label)}"'
+                if kind == "counter":
+                    lines.append(f"{name}{{{lab}}} {value}")
+                    continue
+                seen = 0
+                for bound, n in zip(BUCKETS, value.counts):
+                    seen += n
+                    lines.append(f'{name}_bucket{{{lab},le="{bound:g}"}} {seen}')
+                lines.append(f'{name}_bucket{{{lab},le="+Inf"}} {value.count}')
+                lines.append(f"{name}_sum{{{lab}}} {value.sum!r}")
+                lines.append(f"{name}_count{{{lab}}} {value.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write ``.prom`` / ``.txt`` as Prometheus text, anything else as JSON."""
+        if os.path.splitext(path)[1].lower() in (".prom", ".txt"):
+            text = self.to_prometheus()
+        else:
+            text = json.dumps(self.to_json(), ensure_ascii=False, indent=1)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+METRICS = Registry(enabled=bool(os.environ.get("TAXAPP_METRICS")))
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""Per-industry peer percentiles for the ratios the fixed rules cut off.
+
+The guides ask to compare an enterprise with the industry average
+(\u4e0e\u540c\u884c\u4e1a\u5e73\u5747\u6c34\u5e73\u5bf9\u6bd4); the rules only apply fixed thresholds. ``PeerIndex``
+keeps, for every ``A_\u4e3b\u8425\u884c\u4e1a`` (plus one group for unknown industries), a
+quantile sketch of four metrics:
+
+* ``cost_ratio``  E / C
+* ``fee_ratio``   (F + G + H) / C
+* ``wage_gap``    I - J (yuan)
+* ``stamp_gap``   C + E + F + G - I - N (yuan), the \u5370\u82b1\u7a0e base not declared
+
+The sketches are DDSketch-style log buckets: a value lands in bucket
+``ceil(log_gamma |x|)`` with ``gamma = (1 + ALPHA) / (1 - ALPHA)``, so a
+quantile comes back within about ``ALPHA`` relative error. Buckets are plain counts, which
+makes an index built in one streaming pass, updated row by row (``update``
+takes an amended record out and puts the new one in) or merged from several
+files (``merge``) exactly the same. A percentile lookup is one cumulative
+count, cached until the next change.
+"""
+import os
+
+import numpy as np
+
+from rule_engine import INDUSTRY_CHOICES, INDUSTRY_KEY, parse_fen
+from rule_columns import MAX_FEN, industry_code
+
+METRICS = ("cost_ratio", "fee_ratio", "wage_gap", "stamp_gap")
+METRIC_TITLES = {
+    "cost_ratio": "\u6210\u672c\u7387",
+    "fee_ratio":  "\u8d39\u7528\u7387",
+    "wage_gap":   "\u5de5\u8d44\u4e0e\u4e2a\u7a0e\u5dee\u989d",
+    "stamp_gap":  "\u5370\u82b1\u7a0e\u8ba1\u7a0e\u4f9d\u636e\u5dee\u989d",
+}
+GROUPS = tuple(INDUSTRY_CHOICES) + ("",)
+ALPHA = 0.01
+MIN_PEERS = 30
+
+_C, _E, _F, _G, _H, _I, _J, _N = (
+    "C_\u8425\u4e1a\u6536\u5165", "E_\u6210\u672c", "F_\u9500\u552e\u8d39\u7528", "G_\u7ba1\u7406\u8d39\u7528",
+    "H_\u8d22\u52a1\u8d39\u7528", "I_\u5de5\u8d44\u85aa\u91d1", "J_\u4e2a\u7a0e\u6263\u7f34\u5de5\u8d44\u603b\u989d", "N_\u5370\u82b1\u7a0e\u8ba1\u7a0e\u4f9d\u636e",
+)
+_KEYS = (_C, _E, _F, _G, _H, _I, _J, _N)
+_FORMAT = 1
+
+
+def default_path():
+    return os.environ.get("TAXAPP_PEERS") or os.path.join(
+        os.path.expanduser("~"), ".taxapp", "peers.npz")
+
+
+def metric_values(cols):
+    """``{metric: (float array, valid mask)}`` from fen columns.
+
+    Ratios need ``C > 0``; the gaps are always defined.
+    """
+    C = cols[_C]
+    has_c = C > 0
+    safe_c = np.where(has_c, C, 1).astype(np.float64)
+    fee = cols[_F] + cols[_G] + cols[_H]
+    always = np.ones(len(C), dtype=bool)
+    base = C + cols[_E] + cols[_F] + cols[_G] - cols[_I]
+    return {
+        "cost_ratio": (cols[_E] / safe_c, has_c),
+        "fee_ratio":  (fee / safe_c, has_c),
+        "wage_gap":   ((cols[_I] - cols[_J]) / 100.0, always),
+        "stamp_gap":  ((base - cols[_N]) / 100.0, always),
+    }
+
+
+def _fen_row(record):
+    """The record's fen amounts for the metric fields, or None when one is
+    ``MAX_FEN`` or more; raises ValueError on a malformed amount."""
+    row = [parse_fen(k, record.get(k)) for k in _KEYS]
+    return None if max(row) >= MAX_FEN else row
+
+
+def parse_records(records):
+    """Fen columns for the fields the metrics read plus group codes; rows
+    with a malformed amount or one of ``MAX_FEN`` or more are dropped and
+    counted. Returns ``(cols, skipped)``."""
+    vals = {k: [] for k in _KEYS}
+    groups = []
+    skipped = 0
+    for record in records:
+        try:
+            row = _fen_row(record)
+        except ValueError:
+            row = None
+        if row is None:
+            skipped += 1
+            continue
+        for k, v in zip(_KEYS, row):
+            vals[k].append(v)
+        groups.append(industry_code(record.get(INDUSTRY_KEY)))
+    cols = {k: np.array(v, dtype=np.int64) for k, v in vals.items()}
+    cols[INDUSTRY_KEY] = np.array(groups, dtype=np.int64)
+    return cols, skipped
+
+
+class PeerIndex:
+    """Per-industry, per-metric quantile sketches (see module docstring)."""
+
+    def __init__(self, alpha=ALPHA):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = np.log(self.gamma)
+        # smallest / largest magnitudes kept apart: below is zero, above clips
+        self.kmin = int(np.floor(np.log(1e-9) / self._log_gamma))
+        self.kmax = int(np.ceil(np.log(1e18) / self._log_gamma))
+        nb = self.kmax - self.kmin + 1
+        shape = (len(GROUPS), len(METRICS))
+        self.pos = np.zeros(shape + (nb,), dtype=np.int64)
+        self.neg = np.zeros(shape + (nb,), dtype=np.int64)
+        self.zero = np.zeros(shape, dtype=np.int64)
+        self.skipped = 0
+        self._cum = {}
+
+    # --------------------------------------------------
+    def _bucket(self, mag):
+        k = np.ceil(np.log(mag) / self._log_gamma).astype(np.int64)
+        return np.clip(k, self.kmin, self.kmax) - self.kmin
+
+    def add_columns(self, cols, weight=1, keep=None):
+        """Add (``weight=-1``: remove) every row of fen columns, or the rows
+        ``keep`` marks."""
+        if keep is not None:
+            cols = {k: np.asarray(cols[k])[keep] for k in _KEYS + (INDUSTRY_KEY,)}
+        groups = np.asarray(cols[INDUSTRY_KEY], dtype=np.int64)
+        groups = np.where(groups < 0, len(GROUPS) - 1, groups)
+        nb = self.pos.shape[2]
+        size = self.pos.size
+        values = metric_values(cols)
+        for m, metric in enumerate(METRICS):
+            v, ok = values[metric]
+            g = groups[ok]
+            v = v[ok]
+            tiny = np.abs(v) < 1e-9
+            np.add.at(self.zero[:, m], g[tiny], weight)
+            for arr, sel in ((self.pos, v >= 1e-9), (self.neg, v <= -1e-9)):
+                if not sel.any():
+                    continue
+                flat = (g[sel] * len(METRICS) + m) * nb + self._bucket(np.abs(v[sel]))
+                arr += (np.bincount(flat, minlength=size) * weight).reshape(arr.shape)
+        self._cum.clear()
+
+    def add_records(self, records, weight=1):
+        cols, skipped = parse_records(records)
+        self.skipped += skipped
+        if len(cols[INDUSTRY_KEY]):
+            self.add_columns(cols, weight)
+
+    def update(self, old, new):
+        """Replace one enterprise's ``old`` record by ``new`` (either may be None)."""
+        if old is not None:
+            self.add_records([old], -1)
+        if new is not None:
+            self.add_records([new])
+
+    def merge(self, other):
+        if other.alpha != self.alpha:
+            raise ValueError("\u5206\u4f4d\u6570\u8349\u56fe\u7cbe\u5ea6\u4e0d\u540c\uff0c\u65e0\u6cd5\u5408\u5e76")
+        self.pos += other.pos
+        self.neg += other.neg
+        self.zero += other.zero
+        self.skipped += other.skipped
+        self._cum.clear()
+
+    # --------------------------------------------------
+    def _group(self, industry):
+        code = industry_code(industry)
+        return code if code >= 0 else len(GROUPS) - 1
+
+    def _counts(self, g, m):
+        got = self._cum.get((g, m))
+        if got is None:
+            # value order: large negatives .. small negatives, zero, small .. large positives
+            counts = np.concatenate([self.neg[g, m, ::-1], [self.zero[g, m]], self.pos[g, m]])
+            got = self._cum[(g, m)] = (counts, np.cumsum(counts))
+        return got
+
+    def _position(self, value):
+        nb = self.pos.shape[2]
+        if abs(value) < 1e-9:
+            return nb
+        k = int(self._bucket(np.array([abs(value)]))[0])
+        return nb + 1 + k if value > 0 else nb - 1 - k
+
+    def count(self, industry, metric="stamp_gap"):
+        counts, cum = self._counts(self._group(industry), METRICS.index(metric))
+        return int(cum[-1])
+
+    def percentile(self, industry, metric, value):
+        """Share (0-100) of the industry below ``value``, half of its own bucket
+        counted; None when fewer than ``MIN_PEERS`` peers have the metric."""
+        counts, cum = self._counts(self._group(industry), METRICS.index(metric))
+        n = int(cum[-1])
+        if n < MIN_PEERS:
+            return None
+        i = self._position(value)
+        below = int(cum[i - 1]) if i else 0
+        return 100.0 * (below + 0.5 * int(counts[i])) / n
+
+    def quantile(self, industry, metric, q):
+        counts, cum = self._counts(self._group(industry), METRICS.index(metric))
+        n = int(cum[-1])
+        if not n:
+            return None
+        i = int(np.searchsorted(cum, q * n, side="left"))
+        i = min(i, len(counts) - 1)
+        nb = self.pos.shape[2]
+        if i == nb:
+            return 0.0
+        k = (i - nb - 1 if i > nb else nb - 1 - i) + self.kmin
+        mag = 2 * self.gamma ** k / (self.gamma + 1)
+        return float(mag if i > nb else -mag)
+
+    def compare(self, record):
+        """``{metric: (value, percentile)}`` for one record against its industry.
+
+        Metrics the record does not define (ratios without \u8425\u4e1a\u6536\u5165) are left
+        out, and a record with an amount of ``MAX_FEN`` or more gets ``{}``;
+        raises ValueError on a malformed amount.
+        """
+        try:
+            row = _fen_row(record)
+        except ValueError:
+            raise ValueError("\u91d1\u989d\u683c\u5f0f\u4e0d\u6b63\u786e") from None
+        if row is None:
+            return {}
+        cols, _ = parse_records([record])
+        industry = str(record.get(INDUSTRY_KEY) or "").strip()
+        out = {}
+        for metric, (v, ok) in metric_values(cols).items():
+            if ok[0]:
+                value = float(v[0])
+                out[metric] = (value, self.percentile(industry, metric, value))
+        return out
+
+    # --------------------------------------------------
+    def save(self, path=None):
+        path = path or default_path()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(tmp, format=_FORMAT, alpha=self.alpha, groups=np.array(GROUPS),
+                            pos=self.pos, neg=self.neg, zero=self.zero, skipped=self.skipped)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path=None):
+        """The saved index at ``path``, or None if there is none (or it is stale)."""
+        path = path or default_path()
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if int(data["format"]) != _FORMAT or tuple(data["groups"]) != GROUPS:
+                return None
+            index = cls(float(data["alpha"]))
+            if data["pos"].shape != index.pos.shape:
+                return None
+            index.pos[:] = data["pos"]
+            index.neg[:] = data["neg"]
+            index.zero[:] = data["zero"]
+            index.skipped = int(data["skipped"])
+        return index
+
+
+def build_index(chunks, index=None):
+    """Stream ``batch_import.iter_chunks`` output into ``index`` (a new one by default)."""
+    index = index or PeerIndex()
+    for chunk in chunks:
+        index.add_records(record for _, record in chunk)
+    return index
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""On-disk memo of screening results for unchanged records.
+
+The key is a hash of the rule set's fingerprint and the stripped text of
+every amount field plus A/B when its rules read them (B_\u671f\u95f4 is not read,
+so a new quarter with the same figures is a hit). Amounts no rule reads are
+still keyed: rows that fail validation are never cached, so a hit means the
+whole record validated before. The text is not canonicalized: parsing every amount
+would cost as much as the column pass the cache saves, and an amount
+written differently ("100" vs "100.00") is only a miss. The value is a bit
+mask of the rules that fired. Entries live in a SQLite table with an
+LRU generation counter: every run bumps the generation, hits are touched
+with it, and the oldest generations are evicted past ``max_entries``. There
+is deliberately no index on the generation: eviction is rare and may scan,
+while touching every hit on every run must stay cheap.
+"""
+import hashlib
+import os
+import sqlite3
+
+from rule_engine import FIELD_KEYS, NUMERIC_FIELDS
+
+MAX_ENTRIES = 2_000_000
+_IN_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key  BLOB PRIMARY KEY,
+    mask INTEGER NOT NULL,
+    used INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+def default_path():
+    return os.environ.get("TAXAPP_RESULT_CACHE") or os.path.join(
+        os.path.expanduser("~"), ".taxapp", "results.db")
+
+
+class ResultCache:
+    """Memo of ``(msg, severity)`` lists for one rule set, stored at ``path``."""
+
+    def __init__(self, ruleset, path=None, max_entries=MAX_ENTRIES):
+        self.ruleset = ruleset
+        self.path = path or default_path()
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()
+        self.generation = (row[0] if row else 0) + 1
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('generation', ?)", (self.generation,))
+        self._count = self.conn.execute("SELECT count(*) FROM results").fetchone()[0]
+
+        self._prefix = ruleset.fingerprint.encode("ascii")[:64]
+        self._keys = tuple(k for k in FIELD_KEYS if k in NUMERIC_FIELDS or k in ruleset.keys)
+        self._bit = {r.message: 1 << i for i, r in enumerate(ruleset.rules)}
+        self._issues = [(r.message, r.severity) for r in ruleset.rules]
+        self._by_mask = {}
+        self._touched = []
+
+    # --------------------------------------------------
+    def key(self, record):
+        get = record.get
+        text = "\x1f".join([str(get(k) or "").strip() for k in self._keys])
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16, key=self._prefix).digest()
+
+    def mask(self, issues):
+        m = 0
+        for msg, _ in issues:
+            m |= self._bit[msg]
+        return m
+
+    def issues(self, mask):
+        found = self._by_mask.get(mask)
+        if found is None:
+            found = self._by_mask[mask] = [issue for i, issue in enumerate(self._issues) if mask >> i & 1]
+        return list(found)
+
+    def lookup(self, records):
+        """Return ``(keys, cached)``: cached is the issue list, or None on a miss."""
+        keys = [self.key(r) for r in records]
+        found = {}
+        stale = []
+        for i in range(0, len(keys), _IN_CHUNK):
+            part = keys[i:i + _IN_CHUNK]
+            marks = ",".join("?" * len(part))
+            for key, mask, used in self.conn.execute(
+                    f"SELECT key, mask, used FROM results WHERE key IN ({marks})", part):
+                found[key] = mask
+                if used < self.generation:
+                    stale.append(key)
+        issues = self.issues
+        cached = [None if m is None else issues(m) for m in map(found.get, keys)]
+        # hits are touched together with the next ``store`` transaction
+        self._touched.extend(stale)
+        miss = cached.count(None)
+        self.hits += len(keys) - miss
+        self.misses += miss
+        return keys, cached
+
+    def store(self, items):
+        """Remember ``(key, issues)`` pairs from freshly screened rows."""
+        rows = [(key, self.mask(issues), self.generation) for key, issues in items]
+        touched, self._touched = self._touched, []
+        if not rows and not touched:
+            return
+        self.conn.execute("BEGIN")
+        self.conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", rows)
+        self.conn.executemany("UPDATE results SET used = ? WHERE key = ?",
+                              [(self.generation, k) for k in touched])
+        self.conn.execute("COMMIT")
+        self._count += len(rows)
+        if self._count > self.max_entries * 1.1:
+            self.evict()
+
+    def evict(self):
+        """Drop least recently used entries down to ``max_entries``."""
+        excess = self._count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY used LIMIT ?)", (excess,))
+        self._count = self.conn.execute("SELECT count(*) FROM results").fetchone()[0]
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = self.hits * 100 / total if total else 0
+        return f"\u7ed3\u679c\u7f13\u5b58 \u2014 \u547d\u4e2d {self.hits:,}\uff0c\u672a\u547d\u4e2d {self.misses:,}\uff08\u547d\u4e2d\u7387 {rate:.1f}%\uff09"
+
+    def close(self):
+        self.store(())
+        if self._count > self.max_entries:
+            self.evict()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
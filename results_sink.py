@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""Incremental writer for batch screening results.
+
+One output row per (credit code, rule, severity), written to CSV, JSONL or
+XLSX as results arrive. Only a bounded buffer of rows and the per-rule /
+per-industry counters are kept in memory; the counters become the summary
+sheet (XLSX) or a ``.summary`` sidecar file (CSV/JSONL) on close.
+"""
+import csv
+import json
+import os
+from collections import Counter
+
+from rule_engine import INDUSTRY_KEY
+from batch_import import COMPANY_NAME_KEY
+
+COLUMNS = ["\u884c\u53f7", "\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801", "\u4f01\u4e1a\u540d\u79f0", "\u4e3b\u8425\u884c\u4e1a", "\u89c4\u5219", "\u98ce\u9669\u7b49\u7ea7"]
+SUMMARY_COLUMNS = ["\u7c7b\u522b", "\u9879\u76ee", "\u9ad8\u98ce\u9669", "\u9700\u6838\u5b9e", "\u6570\u636e\u9519\u8bef", "\u4f01\u4e1a\u6570", "\u6709\u7591\u70b9\u4f01\u4e1a\u6570"]
+SEVERITY_LABEL = {"red": "\u9ad8\u98ce\u9669", "yellow": "\u9700\u6838\u5b9e", "error": "\u6570\u636e\u9519\u8bef"}
+
+BUFFER_ROWS = 1000
+
+
+class ResultsSink:
+    """Stream screening results to ``path``; format follows the extension.
+
+    Use as a context manager, or call ``close()`` to flush the buffer and
+    write the summary.
+    """
+
+    def __init__(self, path, buffer_rows=BUFFER_ROWS, encoding="utf-8-sig"):
+        self.path = path
+        self.fmt = os.path.splitext(path)[1].lower().lstrip(".")
+        if self.fmt not in ("csv", "jsonl", "xlsx"):
+            raise ValueError(f"\u4e0d\u652f\u6301\u7684\u8f93\u51fa\u683c\u5f0f\uff1a{self.fmt}")
+        self.buffer_rows = buffer_rows
+        self.encoding = encoding
+        self._buf = []
+        self.by_rule = Counter()       # (rule, severity) -> issues
+        self.by_industry = Counter()   # (industry, severity) -> issues
+        self.screened = Counter()      # industry -> enterprises
+        self.flagged = Counter()       # industry -> enterprises with issues
+        self._open()
+
+    # --------------------------------------------------
+    def _open(self):
+        if self.fmt == "xlsx":
+            from openpyxl import Workbook
+            self._wb = Workbook(write_only=True)
+            self._ws = self._wb.create_sheet("\u68c0\u67e5\u7ed3\u679c")
+            self._ws.append(COLUMNS)
+            return
+        self._fh = open(self.path, "w", newline="",
+                        encoding=self.encoding if self.fmt == "csv" else "utf-8")
+        if self.fmt == "csv":
+            self._csv = csv.writer(self._fh)
+            self._csv.writerow(COLUMNS)
+
+    def _flush(self):
+        if not self._buf:
+            return
+        if self.fmt == "xlsx":
+            for row in self._buf:
+                self._ws.append(row)
+        elif self.fmt == "csv":
+            self._csv.writerows(self._buf)
+        else:
+            self._fh.writelines(
+                json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n"
+                for row in self._buf)
+        self._buf.clear()
+
+    # --------------------------------------------------
+    def add(self, credit_code, issues, industry="", company="", row=None):
+        """Record one enterprise's ``(msg, severity)`` list."""
+        industry = industry or "\u672a\u586b\u5199"
+        self.screened[industry] += 1
+        if issues:
+            self.flagged[industry] += 1
+        for msg, sev in issues:
+            self.by_rule[(msg, sev)] += 1
+            self.by_industry[(industry, sev)] += 1
+            self._buf.append([row, credit_code, company, industry, msg,
+                              SEVERITY_LABEL.get(sev, sev)])
+        if len(self._buf) >= self.buffer_rows:
+            self._flush()
+
+    def add_error(self, credit_code, error, company="", row=None):
+        self.by_rule[("\u6570\u636e\u9519\u8bef", "error")] += 1
+        self._buf.append([row, credit_code, company, "", error, SEVERITY_LABEL["error"]])
+        if len(self._buf) >= self.buffer_rows:
+            self._flush()
+
+    def add_screened(self, screened):
+        """Record a ``batch_import.ScreenedRow``."""
+        company = screened.record.get(COMPANY_NAME_KEY, "")
+        if screened.error:
+            self.add_error(screened.credit_code, screened.error, company, screened.row)
+        else:
+            self.add(screened.credit_code, screened.issues,
+                     screened.record.get(INDUSTRY_KEY, ""), company, screened.row)
+
+    # --------------------------------------------------
+    def summary_rows(self):
+        """Return the summary sheet rows, one per rule then one per industry."""
+        rows = []
+        for msg in sorted({m for m, _ in self.by_rule}):
+            rows.append(["\u89c4\u5219", msg, self.by_rule[(msg, "red")],
+                         self.by_rule[(msg, "yellow")], self.by_rule[(msg, "error")],
+                         "", ""])
+        for ind in sorted(self.screened):
+            rows.append(["\u884c\u4e1a", ind, self.by_industry[(ind, "red")],
+                         self.by_industry[(ind, "yellow")], "",
+                         self.screened[ind], self.flagged[ind]])
+        return rows
+
+    def _write_summary(self):
+        rows = self.summary_rows()
+        if self.fmt == "xlsx":
+            ws = self._wb.create_sheet("\u6c47\u603b")
+            ws.append(SUMMARY_COLUMNS)
+            for row in rows:
+                ws.append(row)
+            return
+        stem = os.path.splitext(self.path)[0]
+        if self.fmt == "csv":
+            with open(stem + ".summary.csv", "w", newline="", encoding=self.encoding) as fh:
+                w = csv.writer(fh)
+                w.writerow(SUMMARY_COLUMNS)
+                w.writerows(rows)
+        else:
+            with open(stem + ".summary.json", "w", encoding="utf-8") as fh:
+                json.dump([dict(zip(SUMMARY_COLUMNS, r)) for r in rows],
+                          fh, ensure_ascii=False, indent=2)
+
+    def close(self):
+        self._flush()
+        self._write_summary()
+        if self.fmt == "xlsx":
+            self._wb.save(self.path)
+        else:
+            self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""Risk scores for screened enterprises and a bounded top-K inspection queue.
+
+An enterprise's score adds, for every rule it hits,
+
+    SEVERITY_WEIGHTS[severity] * (1 + min(excess, EXCESS_CAP))
+
+where ``excess`` is how far past the threshold the record is, relative to a
+scale that fits the rule (ratio rules: share above the ratio; amount rules:
+the overshoot as a share of revenue, wages or the taxable base). Rules
+without an ``_EXCESS`` entry (custom rule tables) count their weight only.
+On top comes ``BENEFIT_WEIGHT * log10(1 + \u672a\u4eab\u4f18\u60e0 / BENEFIT_UNIT)``, so a
+large unclaimed amount lifts an enterprise without swamping the rules.
+
+``RiskQueue`` keeps the ``k`` highest scores in a min-heap while results
+stream past (``O(n log k)``, ``k`` entries in memory); queues from separate
+runs or processes combine with ``merge``.
+"""
+import csv
+import heapq
+import math
+
+from batch_import import COMPANY_NAME_KEY, CREDIT_CODE_KEY
+from benefits import fen_to_yuan, has_benefit_data, unclaimed_fen
+from rule_engine import NUMERIC_FIELDS, parse_fen
+from rule_table import LETTERS, active_ruleset
+
+SEVERITY_WEIGHTS = {"red": 3.0, "yellow": 1.0}
+EXCESS_CAP = 4.0
+BENEFIT_WEIGHT = 1.0
+BENEFIT_UNIT = 10000.0   # yuan
+DEFAULT_TOP = 200
+
+_AMOUNT_LETTERS = frozenset(key.split("_", 1)[0] for key in NUMERIC_FIELDS)
+
+
+def _ratio_over(part, C, limit):
+    return (part / C - limit) / limit if C > 0 and limit > 0 else 0.0
+
+
+def _input_vat(v, th):
+    ts = max(v["D"], v["C"], v["L"])
+    if v["Q"] <= 0 or ts <= 0:
+        return 0.0
+    return (v["Q"] * v["O"] / ts - v["R"] - th["tolerance"]) / v["Q"]
+
+
+# rule id -> excess(values in yuan by letter, thresholds as float)
+_EXCESS = {
+    "revenue_gap":   lambda v, th: (abs(v["D"] - v["C"]) - th["gap"]) / max(v["C"], v["D"], th["gap"], 1.0),
+    "trade_ratio":   lambda v, th: _ratio_over(v["E"] + v["F"] + v["G"] + v["H"], v["C"], th["ratio"]),
+    "service_ratio": lambda v, th: _ratio_over(v["E"] + v["F"] + v["G"] + v["H"], v["C"], th["ratio"]),
+    "cost_high":     lambda v, th: _ratio_over(v["E"], v["C"], th["ratio"]),
+    "fee_high":      lambda v, th: _ratio_over(v["F"] + v["G"] + v["H"], v["C"], th["ratio"]),
+    "voucher":       lambda v, th: ((v["E"] + v["F"] + v["G"] + v["H"] - v["I"] - v["K"] - v["M"] - th["gap"])
+                                    / max(v["C"], th["gap"], 1.0)),
+    "wage":          lambda v, th: (v["I"] - v["J"] - th["gap"]) / max(v["I"], 1.0),
+    "stamp":         lambda v, th: ((v["C"] + v["E"] + v["F"] + v["G"] - v["I"] - v["N"])
+                                    / max(v["C"] + v["E"] + v["F"] + v["G"] - v["I"], 1.0)),
+    "input_vat":     _input_vat,
+}
+
+
+class RiskScorer:
+    """Scores one record from its ``(msg, severity)`` issues under ``ruleset``."""
+
+    def __init__(self, ruleset=None, severity_weights=None, benefit_weight=BENEFIT_WEIGHT):
+        rs = ruleset or active_ruleset()
+        self.severity_weights = dict(SEVERITY_WEIGHTS, **(severity_weights or {}))
+        self.benefit_weight = benefit_weight
+        self._rules = {}   # msg -> (excess fn or None, field letters, thresholds)
+        for r in rs.rules:
+            th = {k: float(v) for k, v in r.thresholds.items()}
+            self._rules[r.message] = (_EXCESS.get(r.id), r.fields, th)
+
+    def excess(self, msg, values):
+        fn, _, th = self._rules.get(msg, (None, (), {}))
+        if fn is None:
+            return 0.0
+        try:
+            return min(max(fn(values, th), 0.0), EXCESS_CAP)
+        except (KeyError, ZeroDivisionError):
+            return 0.0
+
+    def score(self, record, issues):
+        """``(score, unclaimed fen, [(msg, severity, excess)])``.
+
+        ``record`` must already have passed screening (amounts are valid);
+        benefit columns that do not parse count as nothing unclaimed.
+        """
+        parts = []
+        total = 0.0
+        if issues:
+            letters = set()
+            for msg, _ in issues:
+                letters.update(self._rules.get(msg, (None, ()))[1])
+            values = {f: parse_fen(LETTERS[f], record.get(LETTERS[f])) / 100.0
+                      for f in letters & _AMOUNT_LETTERS}
+            for msg, sev in issues:
+                ex = self.excess(msg, values)
+                total += self.severity_weights.get(sev, 1.0) * (1.0 + ex)
+                parts.append((msg, sev, ex))
+        fen = 0
+        if has_benefit_data(record):
+            try:
+                fen = sum(unclaimed_fen(record))
+            except ValueError:
+                fen = 0
+        if fen:
+            total += self.benefit_weight * math.log10(1.0 + fen / 100.0 / BENEFIT_UNIT)
+        return total, fen, parts
+
+
+class RiskQueue:
+    """The ``k`` highest-scoring enterprises seen so far, kept in a min-heap."""
+
+    def __init__(self, k=DEFAULT_TOP, scorer=None):
+        self.k = k
+        self.scorer = scorer
+        self.rows = 0
+        self.scored = 0           # enterprises with a score above zero
+        self._heap = []           # (score, -seq, entry)
+        self._seq = 0
+
+    def add_screened(self, sr):
+        """Score a ``batch_import.ScreenedRow`` and offer it to the queue."""
+        self.rows += 1
+        if sr.error is not None:
+            return None
+        if self.scorer is None:
+            self.scorer = RiskScorer()
+        score, fen, parts = self.scorer.score(sr.record, sr.issues)
+        if score <= 0:
+            return score
+        self.push(score, {"row": sr.row, "credit_code": sr.credit_code,
+                          "company": sr.record.get(COMPANY_NAME_KEY) or "",
+                          "industry": sr.record.get(LETTERS["A"]) or "",
+                          "unclaimed_fen": fen, "issues": parts})
+        return score
+
+    def push(self, score, entry):
+        self.scored += 1
+        # ties keep the earlier arrival: a smaller -seq sorts as lower priority
+        item = (score, -self._seq, entry)
+        self._seq += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+
+    def merge(self, other):
+        self.rows += other.rows
+        scored = self.scored + other.scored
+        for score, _, entry in sorted(other._heap, key=lambda e: (-e[0], -e[1])):
+            self.push(score, entry)
+        self.scored = scored
+        return self
+
+    def __len__(self):
+        return len(self._heap)
+
+    def ranked(self):
+        """``[(rank, score, entry)]``, highest score first."""
+        items = sorted(self._heap, key=lambda e: (-e[0], -e[1]))
+        return [(i, score, entry) for i, (score, _, entry) in enumerate(items, start=1)]
+
+
+QUEUE_HEADER = ["\u6392\u540d", "\u98ce\u9669\u5206", "\u884c\u53f7", CREDIT_CODE_KEY, COMPANY_NAME_KEY,
+                "\u4e3b\u8425\u884c\u4e1a", "\u672a\u4eab\u4f18\u60e0", "\u7591\u70b9"]
+
+
+def issue_text(parts):
+    """Issues worst first, each with how far past its threshold (+120%)."""
+    ordered = sorted(parts, key=lambda p: (p[1] != "red", -p[2]))
+    return "\uff1b".join(f"{msg}\uff08+{ex:.0%}\uff09" if ex else msg for msg, _, ex in ordered)
+
+
+def queue_rows(queue):
+    for rank, score, e in queue.ranked():
+        yield [rank, f"{score:.2f}", e["row"], e["credit_code"], e["company"], e["industry"],
+               f"{fen_to_yuan(e['unclaimed_fen']):.2f}", issue_text(e["issues"])]
+
+
+def write_queue(path, queue):
+    with open(path, "w", newline="", encoding="utf-8-sig") as fh:
+        w = csv.writer(fh)
+        w.writerow(QUEUE_HEADER)
+        w.writerows(queue_rows(queue))
+    return len(queue)
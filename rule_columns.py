@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""Columnar evaluation of the A-R risk rules over whole portfolios.
+
+Each numeric field is one int64 column in fen (\u5206), so every rule becomes a
+handful of integer array passes and matches the scalar Decimal path in
+``rule_engine.evaluate`` exactly. Ratios are compared cross-multiplied
+(``10*total >= 7*C`` instead of ``total/C >= 0.70``), which is the guarded
+division for ``C_v > 0``. Rows whose amounts are too large for exact int64
+products, or whose \u8fdb\u9879\u8f6c\u51fa check lands too close to call in float64, are
+re-run through the scalar engine so the result is identical to the cent.
+
+Thresholds and industry sets come from the ``rule_table`` rule set. A rule
+whose predicate differs from the built-in one, or an industry set naming an
+industry outside ``INDUSTRY_CHOICES``, has no column kernel, so such a rule
+set is evaluated row by row through the scalar engine on the original
+records ``to_columns`` keeps under ``"_records"``.
+"""
+import ast
+from decimal import Decimal
+from fractions import Fraction
+from time import perf_counter
+
+import numpy as np
+
+from rule_engine import (
+    INDUSTRY_KEY, NUMERIC_FIELDS, INDUSTRY_CHOICES, parse_fen, normalize_record,
+)
+from rule_table import DEFAULT_RULESET, active_ruleset
+from metrics import METRICS
+
+# 1e15 yuan per field keeps every sum and ratio product below 2**63.
+MAX_FEN = 10 ** 17
+UNKNOWN_INDUSTRY = -1
+
+_FEN = Decimal(100)
+_INT64_MAX = 2 ** 63 - 1
+
+
+def _shape(predicate):
+    return ast.dump(ast.parse(predicate, mode="eval"))
+
+
+# Rule id -> (predicate shape, threshold names) that has a column kernel
+_KERNELS = {r["id"]: (_shape(r["predicate"]), frozenset(r.get("thresholds", {})))
+            for r in DEFAULT_RULESET["rules"]}
+
+
+def industry_code(name):
+    try:
+        return INDUSTRY_CHOICES.index(str(name or "").strip())
+    except ValueError:
+        return UNKNOWN_INDUSTRY
+
+
+def to_columns(records, errors=None):
+    """Parse records into ``{field: int64 fen array}`` plus an int8 industry column.
+
+    Uses the same validation as ``parse_dec``. A malformed amount raises
+    ValueError, unless an ``errors`` list is given: then the message is stored
+    at that row's index (None for good rows) and the row is zero-filled.
+    Rows with an amount of ``MAX_FEN`` or more are zeroed in the arrays and
+    kept verbatim under ``"_fallback"`` for the scalar engine; the records
+    themselves are kept under ``"_records"``.
+    """
+    if not isinstance(records, (list, tuple)):
+        records = list(records)
+    industry = []
+    values = {key: [] for key in NUMERIC_FIELDS}
+    fallback = {}
+    zero = [0] * len(NUMERIC_FIELDS)
+    for i, record in enumerate(records):
+        industry.append(industry_code(record.get(INDUSTRY_KEY)))
+        try:
+            row = [parse_fen(key, record.get(key)) for key in NUMERIC_FIELDS]
+        except ValueError as ex:
+            if errors is None:
+                raise
+            errors.append(str(ex))
+            row = zero
+        else:
+            if errors is not None:
+                errors.append(None)
+        if max(row) >= MAX_FEN:
+            fallback[i] = record
+            row = zero
+        for key, fen in zip(NUMERIC_FIELDS, row):
+            values[key].append(fen)
+    cols = {key: np.array(values[key], dtype=np.int64) for key in NUMERIC_FIELDS}
+    cols[INDUSTRY_KEY] = np.array(industry, dtype=np.int8)
+    cols["_fallback"] = fallback
+    cols["_records"] = records
+    return cols
+
+
+def supports(ruleset):
+    """True when every rule in ``ruleset`` has a column kernel."""
+    for name in ("trade", "service"):
+        if not ruleset.sets.get(name, frozenset()) <= set(INDUSTRY_CHOICES):
+            return False
+    return all(r.id in _KERNELS and _KERNELS[r.id] == (_shape(r.predicate), frozenset(r.thresholds))
+               for r in ruleset.rules)
+
+
+def _codes(ruleset, name):
+    return [INDUSTRY_CHOICES.index(a) for a in ruleset.sets.get(name, ())]
+
+
+def _frac(value, scale=1):
+    f = Fraction(value) * scale
+    return f.numerator, f.denominator
+
+
+def evaluate_columns(cols, ruleset=None):
+    """Evaluate every rule over the columns and return ``{msg: bool array}``.
+
+    ``cols`` is the output of ``to_columns`` (or any dict of equal-length
+    int64 fen arrays keyed by ``NUMERIC_FIELDS`` plus an industry code array
+    under ``INDUSTRY_KEY``). A rule set without column kernels needs the
+    original records under ``"_records"``; rows whose amounts do not parse
+    are left unflagged.
+    """
+    rs = ruleset or active_ruleset()
+    n = len(cols[INDUSTRY_KEY])
+    if not supports(rs):
+        if cols.get("_records") is None:
+            raise ValueError("\u81ea\u5b9a\u4e49\u89c4\u5219\u9700\u8981\u539f\u59cb\u8bb0\u5f55\u9010\u884c\u8bc4\u4f30")
+        masks = {r.message: np.zeros(n, dtype=bool) for r in rs.rules}
+        fallback = cols.get("_fallback") or {}
+        for i in range(n):
+            _rescalar(cols, masks, i, rs, fallback.get(i))
+        return masks
+
+    C_v = cols["C_\u8425\u4e1a\u6536\u5165"]
+    D   = cols["D_\u9500\u552e\u6536\u5165"]
+    E   = cols["E_\u6210\u672c"]
+    F_v = cols["F_\u9500\u552e\u8d39\u7528"]
+    G   = cols["G_\u7ba1\u7406\u8d39\u7528"]
+    H   = cols["H_\u8d22\u52a1\u8d39\u7528"]
+    I   = cols["I_\u5de5\u8d44\u85aa\u91d1"]
+    J   = cols["J_\u4e2a\u7a0e\u6263\u7f34\u5de5\u8d44\u603b\u989d"]
+    K   = cols["K_\u8ba1\u63d0\u6298\u65f7"]
+    L   = cols["L_\u5f53\u671f\u5f00\u7968\u989d\u5ea6"]
+    M   = cols["M_\u5f53\u671f\u53d7\u7968\u989d\u5ea6"]
+    N   = cols["N_\u5370\u82b1\u7a0e\u8ba1\u7a0e\u4f9d\u636e"]
+    O   = cols["O_\u7b80\u6613\u8ba1\u7a0e\u9500\u552e\u989d"]
+    Q   = cols["Q_\u8fdb\u9879\u7a0e\u989d"]
+    R   = cols["R_\u8fdb\u9879\u7a0e\u989d\u8f6c\u51fa"]
+    ind = cols[INDUSTRY_KEY]
+
+    trade   = np.isin(ind, _codes(rs, "trade"))
+    service = np.isin(ind, _codes(rs, "service"))
+    fee   = F_v + G + H
+    total = E + fee
+    has_c = C_v > 0
+
+    # Ratios are cross-multiplied (total/C >= p/q  <=>  q*total >= p*C) and fen
+    # thresholds scaled the same way; ``scale`` tracks the largest multiplier
+    # so rows that could overflow int64 go to the scalar engine.
+    scale = 10
+    hits = {}
+    timed = METRICS.enabled
+    for r in rs.rules:
+        if timed:
+            t0 = perf_counter()
+        th = r.thresholds
+        if r.id == "revenue_gap":
+            p, q = _frac(th["gap"], 100)
+            hit = q * np.abs(D - C_v) > p
+            scale = max(scale, q)
+        elif r.id in ("trade_ratio", "service_ratio"):
+            p, q = _frac(th["ratio"])
+            hit = has_c & (trade if r.id == "trade_ratio" else service) & (q * total >= p * C_v)
+            scale = max(scale, p, q)
+        elif r.id in ("cost_high", "fee_high"):
+            p, q = _frac(th["ratio"])
+            ratio_hit = hits["trade_ratio"] | hits["service_ratio"]
+            if r.id == "cost_high":
+                hit = ratio_hit & (q * E > p * C_v)
+            else:
+                hit = ratio_hit & (q * fee >= p * C_v)
+            scale = max(scale, p, q)
+        elif r.id == "voucher":
+            p, q = _frac(th["gap"], 100)
+            hit = q * (total - I - K - M) > p
+            scale = max(scale, q)
+        elif r.id == "wage":
+            p, q = _frac(th["wage_min"], 100)
+            p2, q2 = _frac(th["gap"], 100)
+            hit = (q * I >= p) & (q2 * (I - J) >= p2)
+            scale = max(scale, q, q2)
+        elif r.id == "stamp":
+            p, q = _frac(th["base_min"], 100)
+            base = C_v + E + F_v + G - I
+            hit = (q * base >= p) & (N < base)
+            scale = max(scale, q)
+        else:  # input_vat
+            # R + tol < round_half_up(Q * O / ts)  <=>  ts * (2R + 2t + 1) <= 2 * Q * O
+            # with t = floor(tol) (all in fen). The products can exceed int64,
+            # so decide in float64 and hand near-ties back to the Decimal path.
+            p, q = _frac(th["tolerance"], 100)
+            t = 2.0 * (p // q) + 1.0
+            ts = np.maximum(np.maximum(D, C_v), L)
+            live = (Q > 0) & (ts > 0)
+            lhs = ts.astype(np.float64) * (2.0 * R.astype(np.float64) + t)
+            rhs = 2.0 * Q.astype(np.float64) * O.astype(np.float64)
+            close = live & (np.abs(lhs - rhs) <= 1e-9 * np.maximum(lhs, rhs))
+            hits["_close"] = close
+            hit = live & (lhs <= rhs) & ~close
+        hits[r.id] = hit
+        if timed:
+            METRICS.observe("rule_seconds", r.id, perf_counter() - t0)
+    masks = {r.message: hits[r.id] for r in rs.rules}
+
+    fallback = cols.get("_fallback") or {}
+    redo = set(fallback)
+    if "_close" in hits:
+        redo.update(np.flatnonzero(hits["_close"]).tolist())
+    limit = _INT64_MAX // (4 * scale)
+    if limit < MAX_FEN:
+        big = np.zeros(n, dtype=bool)
+        for key in NUMERIC_FIELDS:
+            big |= cols[key] >= limit
+        redo.update(np.flatnonzero(big).tolist())
+    for i in sorted(redo):
+        _rescalar(cols, masks, i, rs, fallback.get(i))
+    if timed:
+        for r in rs.rules:
+            METRICS.inc("rule_rows_total", r.id, n)
+            METRICS.inc("rule_hits_total", r.id, int(masks[r.message].sum()))
+    return masks
+
+
+def _rescalar(cols, masks, i, ruleset, record=None):
+    records = cols.get("_records")
+    if records is not None:
+        record = records[i]
+    elif record is None:
+        # only the amounts and a known industry: enough for the built-in kernels
+        record = {key: str(Decimal(int(cols[key][i])) / _FEN) for key in NUMERIC_FIELDS}
+        code = int(cols[INDUSTRY_KEY][i])
+        record[INDUSTRY_KEY] = INDUSTRY_CHOICES[code] if code >= 0 else ""
+    try:
+        hit = {msg for msg, _ in ruleset.evaluate_normalized(normalize_record(record))}
+    except ValueError:
+        return   # malformed amount; to_columns already reported the row
+    for msg in masks:
+        masks[msg][i] = msg in hit
+
+
+def issues_from_masks(masks, ruleset=None):
+    """Yield the per-row ``(msg, severity)`` list, in ``evaluate`` order."""
+    rs = ruleset or active_ruleset()
+    order = [(masks[r.message], (r.message, r.severity)) for r in rs.rules]
+    n = len(next(iter(masks.values()))) if masks else 0
+    any_hit = np.zeros(n, dtype=bool)
+    for mask, _ in order:
+        any_hit |= mask
+    for i in range(n):
+        if not any_hit[i]:
+            yield []
+            continue
+        yield [issue for mask, issue in order if mask[i]]
+
+
+def hit_counts(masks):
+    return {msg: int(mask.sum()) for msg, mask in masks.items()}
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""Compile a rule table into one evaluation function.
+
+Every predicate is folded into a single expression DAG: structurally equal
+sub-expressions across all rules (the total cost ``E + F + G + H``, the
+``max(D, C, L)`` base, ...) become one node. A node used more than once whose
+evaluation cannot fail (no division, no ``round2``) is computed once into a
+local; everything else stays inline, so ``C > 0 and E / C > ratio`` still
+guards its division. The rule set becomes one generated ``evaluate(rec)``
+function compiled once, instead of one ``eval`` per rule per record.
+"""
+import ast
+import copy
+
+# Bump when the generated code changes shape, so cached builds are not reused.
+CODEGEN_VERSION = 1
+
+# Calls that never raise on Decimal operands, so their result may be hoisted.
+SAFE_CALLS = frozenset({"abs", "max", "min"})
+_SAFE_NODES = (
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.UnaryOp, ast.USub, ast.Not,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+    ast.In, ast.NotIn, ast.Name, ast.Load, ast.Constant,
+)
+_HOISTABLE = (ast.BinOp, ast.UnaryOp, ast.Call, ast.Compare)
+
+
+class _Rename(ast.NodeTransformer):
+    """Give every name in one predicate its slot in the shared namespace.
+
+    Field letters stay as locals, earlier rules become ``r_<id>``, thresholds
+    ``k<rule index>_<name>``, sets ``s_<name>``; numeric literals are interned by
+    value as ``_c<n>`` so equal constants in different rules share a node.
+    """
+
+    def __init__(self, index, rule, letters, sets, rule_ids, literals):
+        self.index = index
+        self.rule = rule
+        self.letters = letters
+        self.sets = sets
+        self.rule_ids = rule_ids
+        self.literals = literals
+
+    def visit_Name(self, node):
+        n = node.id
+        if n in self.letters:
+            new = n
+        elif n in self.rule.thresholds:
+            new = f"k{self.index}_{n}"
+        elif n in self.sets:
+            new = f"s_{n}"
+        elif n in self.rule_ids:
+            new = f"r_{n}"
+        else:
+            new = n   # function name
+        return ast.copy_location(ast.Name(id=new, ctx=ast.Load()), node)
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            return node
+        text = repr(node.value)
+        name = self.literals.setdefault(text, f"_c{len(self.literals)}")
+        return ast.copy_location(ast.Name(id=name, ctx=ast.Load()), node)
+
+
+def _safe(node):
+    for sub in ast.walk(node):
+        if isinstance(sub, ast.Call):
+            if not (isinstance(sub.func, ast.Name) and sub.func.id in SAFE_CALLS):
+                return False
+        elif not isinstance(sub, _SAFE_NODES):
+            return False
+    return True
+
+
+class Dag:
+    """Hash-consed view of all predicates: ``ast.dump`` key -> use count."""
+
+    def __init__(self):
+        self.uses = {}
+        self.order = []   # keys in post-order of first appearance
+        self.trees = {}
+
+    def add(self, tree):
+        for child in ast.iter_child_nodes(tree):
+            self.add(child)
+        if isinstance(tree, _HOISTABLE):
+            key = ast.dump(tree)
+            if key not in self.uses:
+                self.uses[key] = 0
+                self.order.append(key)
+                self.trees[key] = tree
+            self.uses[key] += 1
+
+    def shared(self, roots):
+        """Keys worth computing once, children before parents.
+
+        A node is only kept while it is still referenced twice once its
+        kept parents are computed once: ``E + F`` inside a shared
+        ``E + F + G + H`` does not need a local of its own.
+        """
+        keep = {k for k in self.order if self.uses[k] > 1 and _safe(self.trees[k])}
+        while True:
+            refs = dict.fromkeys(keep, 0)
+
+            def walk(node):
+                for child in ast.iter_child_nodes(node):
+                    key = ast.dump(child) if isinstance(child, _HOISTABLE) else None
+                    if key in refs:
+                        refs[key] += 1
+                        if refs[key] > 1:
+                            continue
+                    walk(child)
+
+            for root in roots:
+                walk(ast.Expression(body=root))
+            drop = {k for k, n in refs.items() if n < 2}
+            if not drop:
+                return [k for k in self.order if k in keep]
+            keep -= drop
+
+
+class _Substitute(ast.NodeTransformer):
+    def __init__(self, temps):
+        self.temps = temps
+
+    def visit(self, node):
+        if isinstance(node, _HOISTABLE):
+            name = self.temps.get(ast.dump(node))
+            if name is not None:
+                return ast.copy_location(ast.Name(id=name, ctx=ast.Load()), node)
+        return self.generic_visit(node)
+
+
+def _rename_all(rules, trees, letters, sets, literals):
+    seen = set()
+    exprs = []
+    for index, (rule, tree) in enumerate(zip(rules, trees)):
+        exprs.append(_Rename(index, rule, letters, sets, seen, literals).visit(
+            copy.deepcopy(tree.body)))
+        seen.add(rule.id)
+    return exprs
+
+
+def _names(tree):
+    return {n.id for n in ast.walk(tree) if isinstance(n, ast.Name)}
+
+
+def build_source(rules, trees, letters, sets, share=True, literals=None):
+    """Return ``(source, literals, stats)`` for the generated ``evaluate``.
+
+    ``rules`` are ``rule_table.Rule`` objects with their parsed ``trees``;
+    ``letters`` maps field letters to record keys. The returned ``literals``
+    maps each interned ``_c<n>`` name to the literal's text; pass a previous
+    build's (inverted) map as ``literals`` to keep the same names.
+    """
+    literals = {} if literals is None else literals
+    exprs = _rename_all(rules, trees, letters, sets, literals)
+
+    dag = Dag()
+    for body in exprs:
+        dag.add(body)
+    temps = {}
+    hoisted = []
+    if share:
+        for key in dag.shared(exprs):
+            # the node itself is not yet in ``temps``; only its children are
+            tree = _Substitute(temps).generic_visit(copy.deepcopy(dag.trees[key]))
+            temps[key] = name = f"_t{len(temps)}"
+            hoisted.append((name, tree))
+        exprs = [_Substitute(temps).visit(body) for body in exprs]
+
+    used = set()
+    for body in exprs + [tree for _, tree in hoisted]:
+        used.update(_names(body))
+    lines = ["def evaluate(rec):"]
+    lines += [f"    {l} = rec[{letters[l]!r}]" for l in letters if l in used]
+    if hoisted:
+        lines.append("    try:")
+        lines += [f"        {name} = {ast.unparse(tree)}" for name, tree in hoisted]
+        lines.append("    except ArithmeticError:")
+        lines.append("        return fallback(rec)")
+    lines.append("    issues = []")
+    for rule, body in zip(rules, exprs):
+        rid = f"r_{rule.id}"
+        lines.append("    try:")
+        lines.append(f"        {rid} = {ast.unparse(body)}")
+        lines.append("    except ArithmeticError:")
+        lines.append(f"        {rid} = False")
+        lines.append(f"    if {rid}:")
+        lines.append(f"        issues.append(i_{rule.id})")
+    lines.append("    return issues")
+
+    stats = {
+        "rules": len(rules),
+        "nodes": len(dag.uses),
+        "node_uses": sum(dag.uses.values()),
+        "shared": len(hoisted),
+    }
+    return "\n".join(lines) + "\n", {v: k for k, v in literals.items()}, stats
+
+
+def build_rule_source(rules, trees, letters, sets, literals):
+    """Source defining ``rule_<i>(rec, hits)`` for every rule, for incremental use.
+
+    Each function reads only its own fields from ``rec`` and the results of
+    the earlier rules it names from ``hits`` (rule id -> result), and returns
+    the predicate's value; the caller handles ArithmeticError.
+    """
+    lines = []
+    for i, body in enumerate(_rename_all(rules, trees, letters, sets, literals)):
+        names = _names(body)
+        lines.append(f"def rule_{i}(rec, hits):")
+        lines += [f"    {l} = rec[{letters[l]!r}]" for l in letters if l in names]
+        lines += [f"    {n} = hits[{n[2:]!r}]" for n in sorted(names) if n.startswith("r_")]
+        lines.append(f"    return {ast.unparse(body)}")
+    return "\n".join(lines) + "\n"
+
+
+def compile_source(source, version=""):
+    return compile(source, f"<rules {version}>", "exec")
+
+
+def bind(code, namespace):
+    """Execute a compiled module and return its global scope."""
+    scope = dict(namespace)
+    scope["__builtins__"] = {"ArithmeticError": ArithmeticError}
+    exec(code, scope)
+    return scope
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""Headless rule engine for the A-R risk checks.
+
+No tkinter here: the GUI, batch screening and CLI all call ``evaluate`` so
+every path produces the same ``(msg, severity)`` list.
+"""
+import re
+from decimal import Decimal, ROUND_HALF_UP
+
+# ====================== Data ======================
+ISSUE_GUIDE_MAP = {
+    "\u540c\u671f\u7533\u62a5\u7684\u589e\u503c\u7a0e\u6536\u5165\u4e0e\u4f01\u4e1a\u6240\u5f97\u7a0e\u6536\u5165\u6709\u5dee\u5f02": [
+        "1. \u662f\u5426\u7531\u4e8e\u4e24\u7a0e\u786e\u8ba4\u6536\u5165\u65f6\u95f4\u4e0d\u4e00\u81f4\u3002",
+        "2. \u662f\u5426\u7531\u4e8e\u4e24\u7a0e\u786e\u8ba4\u6536\u5165\u53e3\u5f84\u4e0d\u4e00\u81f4\u5bfc\u81f4\u3002",
+        "3. \u7ed3\u5408\u5408\u540c\u7b7e\u8ba2\u60c5\u51b5\u3001\u9879\u76ee\u8fdb\u5ea6\u3001\u9280\u884c\u6d41\u6c34\u65f6\u95f4\u8fdb\u884c\u7efc\u5408\u5224\u65ad\u3002",
+    ],
+    "\u5de5\u5546\u4e1a\u7eb3\u7a0e\u4eba\u6210\u672c\u8d39\u7528\u5360\u6bd4\u5f02\u5e38": [
+        "1. \u68c0\u67e5\u4ee3\u53d1\u4eba\u5458\u5de5\u8d44\u662f\u5426\u771f\u5b9e\u5230\u8d26\uff08\u9280\u884c\u6d41\u6c34\uff09\u3002",
+        "2. \u5b9e\u5730\u6838\u67e5\u5e93\u5b58\uff0c\u56fa\u5b9a\u8d44\u4ea7\u8fdb\u884c\u81ea\u67e5\u6e05\u70b9\u3002",
+        "3. \u6838\u67e5\u8fd0\u8f93\u53d1\u7968\u3001\u51fa\u8d27\u6e05\u5355\u7b49\u8f85\u52a9\u6750\u6599\u3002",
+    ],
+    "\u8d39\u7528\u504f\u9ad8": [
+        "1. \u6838\u5b9e\u8d39\u7528\u662f\u5426\u771f\u5b9e\u53d1\u751f\u3002",
+        "2. \u68c0\u67e5\u8d39\u7528\u5bf9\u5e94\u7684\u5408\u540c\u3001\u53d1\u7968\u53ca\u9280\u884c\u6d41\u6c34\u3002",
+        "3. \u5224\u65ad\u662f\u5426\u5b58\u5728\u4e2a\u4eba\u6d88\u8d39\u6216\u865a\u5217\u8d39\u7528\u60c5\u5f62\u3002",
+    ],
+    "\u6210\u672c\u504f\u9ad8": [
+        "1. \u6838\u5b9e\u6210\u672c\u662f\u5426\u771f\u5b9e\u53d1\u751f\u3002",
+        "2. \u6838\u67e5\u5e93\u5b58\u3001\u51fa\u5165\u5e93\u8bb0\u5f55\u53ca\u5bf9\u5e94\u53d1\u7968\u3002",
+        "3. \u5224\u65ad\u662f\u5426\u5b58\u5728\u865a\u5217\u6210\u672c\u60c5\u5f62\u3002",
+    ],
+    "\u670d\u52a1\u4e1a\u7eb3\u7a0e\u4eba\u6210\u672c\u8d39\u7528\u5360\u6bd4\u5f02\u5e38": [
+        "1. \u68c0\u67e5\u4eba\u5de5\u6210\u672c\u662f\u5426\u771f\u5b9e\uff08\u9280\u884c\u6d41\u6c34\uff09\u3002",
+        "2. \u6838\u67e5\u5916\u5305\u5408\u540c\u53ca\u5bf9\u5e94\u53d1\u7968\u3002",
+        "3. \u4e0e\u540c\u884c\u4e1a\u5e73\u5747\u6c34\u5e73\u5bf9\u6bd4\u5206\u6790\u3002",
+    ],
+    "\u7591\u4f3c\u672a\u53d6\u5f97\u5408\u6cd5\u6709\u6548\u51ed\u8bc1\u5217\u652f": [
+        "1. \u662f\u5426\u5c5e\u4e8e\u4ee5\u4e0b\u516b\u7c7b\u53ef\u7a0e\u524d\u6263\u9664\u60c5\u5f62\uff1a",
+        "   \u2022 \u5883\u5916\u8d39\u7528\u5f62\u5f0f\u53d1\u7968",
+        "   \u2022 \u5dee\u65c5\u5305\u5e72\u5185\u90e8\u51ed\u8bc1",
+        "   \u2022 \u653f\u5e9c\u6536\u8d39\u8d22\u653f\u7968\u636e",
+        "   \u2022 \u653f\u5e9c\u5e94\u7a0e\u6536\u6b3e\u51ed\u8bc1",
+        "   \u2022 \u6c34\u7535\u8d39\u5206\u5272\u6263\u9664",
+        "   \u2022 \u4e0a\u5e74\u5e93\u5b58\u672c\u5e74\u7ed3\u8f6c",
+        "   \u2022 \u6682\u4f30\u5165\u5e93\u8de8\u671f\u7968\u636e",
+        "2. \u9664\u4e0a\u8ff0\u60c5\u5f62\u5916\uff0c\u76f8\u5173\u652f\u51fa\u4e0d\u5f97\u7a0e\u524d\u6263\u9664\u3002",
+        "3. \u901a\u8fc7\u9280\u884c\u6d41\u6c34\u3001\u5408\u540c\u3001\u7269\u6d41\u8d44\u6599\u8fdb\u884c\u4ea4\u53c9\u6838\u5b9e\u3002",
+    ],
+    "\u7591\u4f3c\u591a\u5217\u5de5\u8d44\u85aa\u91d1\u652f\u51fa\u6216\u5c11\u6263\u7f34\u4e2a\u4eba\u6240\u5f97\u7a0e": [
+        "1. \u662f\u5426\u5b58\u5728\u591a\u5217\u5de5\u8d44\u652f\u51fa\u3001\u5c11\u7f34\u4e2a\u4eba\u6240\u5f97\u7a0e\u60c5\u5f62\u3002",
+        "2. \u8981\u6c42\u63d0\u4f9b\u52b3\u52a8\u5408\u540c\u3001\u5de5\u8d44\u652f\u4ed8\u8bb0\u5f55\u3002",
+        "3. \u6838\u5bf9\u5458\u5de5\u82b1\u540d\u518c\uff0c\u5e76\u8fdb\u884c\u4eba\u5458\u8bbf\u8c08\u3002",
+    ],
+    "\u8fdb\u4e00\u6b65\u6838\u5b9e\u7eb3\u7a0e\u4eba\u662f\u5426\u5c11\u8ba1\u5370\u82b1\u7a0e\u8ba1\u7a0e\u4f9d\u636e": [
+        "1. \u5411\u4e0a\u6e38\u5355\u4f4d\u53d1\u51fd\uff0c\u5f00\u5c55\u5f02\u5730\u534f\u67e5\u3002",
+        "2. \u67e5\u9605\u5408\u540c\u3001\u53d1\u7968\u53ca\u9280\u884c\u6d41\u6c34\uff0c\u7ea6\u8c08\u4f01\u4e1a\u8fdb\u884c\u6838\u5b9e\u3002",
+    ],
+    "\u7591\u4f3c\u5c11\u8f6c\u51fa\u7528\u4e8e\u7b80\u6613\u8ba1\u7a0e\u7684\u8fdb\u9879\u7a0e\u989d": [
+        "1. \u67e5\u627e\u6297\u6263\u8fdb\u9879\u53d1\u7968\uff0c\u662f\u5426\u5b58\u5728\u201c\u623f\u5c4b\u51fa\u51fa\u79df\u201d\u201c\u7269\u4e1a\u670d\u52a1\u201d\u7b49\u540c\u65f6\u7528\u4e8e\u5e94\u7a0e/\u514d\u7a0e\u9879\u76ee\u3002",
+        "2. \u6838\u67e5\u662f\u5426\u5b58\u5728\u514d\u7a0e\u8d27\u7269\u9500\u552e\u4f46\u672a\u8f6c\u51fa\u8fdb\u9879\u7a0e\u989d\u60c5\u5f62\u3002",
+    ],
+}
+
+FIELD_SOURCE_MAP = {
+    "A_\u4e3b\u8425\u884c\u4e1a": {
+        "title": "\u4e3b\u8425\u884c\u4e1a",
+        "source": "\u91d1\u7a0e\u4e09\u671f\u7cfb\u7edf \u2014 \u7a0e\u52a1\u767b\u8bb0\u4fe1\u606f\u67e5\u8be2\u6a21\u5757\u4e0b\u300c\u884c\u4e1a\u300d\u67e5\u8be2\u7ed3\u679c\u9009\u62e9\u3002",
+    },
+    "B_\u671f\u95f4": {
+        "title": "\u671f\u95f4",
+        "source": "\u4e0d\u5c11\u4e8e\u4e00\u4e2a\u7eb3\u7a0e\u671f\uff0c\u5efa\u8bae\u5f55\u5165\u5b8c\u6574\u5e74\u5ea6\u3002",
+    },
+    "C_\u8425\u4e1a\u6536\u5165": {
+        "title": "\u8425\u4e1a\u6536\u5165",
+        "source": "\u300a\u4e2d\u534e\u4eba\u6c11\u5171\u548c\u56fd\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u8868\u300b\u300c\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u4e3b\u8868\u300d\u7b2c 1 \u680f\u300c\u4e00\u3001\u8425\u4e1a\u6536\u5165\u300d\u3002",
+    },
+    "D_\u9500\u552e\u6536\u5165": {
+        "title": "\u9500\u552e\u6536\u5165",
+        "source": "\u5404\u6708\u300a\u589e\u503c\u7a0e\u53ca\u9644\u52a0\u7a0e\u8d39\u7533\u62a5\u8868\uff08\u4e00\u822c\u7eb3\u7a0e\u4eba\u9002\u7528\uff09\u300b\u7b2c 1\u30015\u30017\u30018 \u680f\u4e4b\u548c\u3002\u540c\u4e00\u5e74\u5ea6\u8fde\u7eed\u5404\u6708\u53ef\u53c2\u8003\u6700\u540e\u4e00\u671f\u7d2f\u8ba1\u6570\u636e\u3002",
+    },
+    "E_\u6210\u672c": {
+        "title": "\u6210\u672c",
+        "source": "\u300a\u4e2d\u534e\u4eba\u6c11\u5171\u548c\u56fd\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u8868\u300b\u300c\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u4e3b\u8868\u300d\u7b2c 2 \u680f\u300c\u51cf\uff1a\u8425\u4e1a\u6210\u672c\u300d\u3002",
+    },
+    "F_\u9500\u552e\u8d39\u7528": {
+        "title": "\u9500\u552e\u8d39\u7528",
+        "source": "\u300a\u4e2d\u534e\u4eba\u6c11\u5171\u548c\u56fd\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u8868\u300b\u300c\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u4e3b\u8868\u300d\u7b2c 4 \u680f\u300c\u51cf\uff1a\u9500\u552e\u8d39\u7528\u300d\u3002",
+    },
+    "G_\u7ba1\u7406\u8d39\u7528": {
+        "title": "\u7ba1\u7406\u8d39\u7528",
+        "source": "\u300a\u4e2d\u534e\u4eba\u6c11\u5171\u548c\u56fd\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u8868\u300b\u300c\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u4e3b\u8868\u300d\u7b2c 5 \u680f\u300c\u51cf\uff1a\u7ba1\u7406\u8d39\u7528\u300d\u3002",
+    },
+    "H_\u8d22\u52a1\u8d39\u7528": {
+        "title": "\u8d22\u52a1\u8d39\u7528",
+        "source": "\u300a\u4e2d\u534e\u4eba\u6c11\u5171\u548c\u56fd\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u8868\u300b\u300c\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u4e3b\u8868\u300d\u7b2c 5 \u680f\u300c\u51cf\uff1a\u8d22\u52a1\u8d39\u7528\u300d\u3002",
+    },
+    "I_\u5de5\u8d44\u85aa\u91d1": {
+        "title": "\u5de5\u8d44\u85aa\u91d1",
+        "source": "\u300a\u4e2d\u534e\u4eba\u6c11\u5171\u548c\u56fd\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u8868\u300b A105050 \u804c\u5de5\u85aa\u916c\u652f\u51fa\u53ca\u7eb3\u7a0e\u8c03\u6574\u660e\u7ec6\u8868\u7b2c 1 \u680f\u300c\u4e00\u3001\u5de5\u8d44\u85aa\u91d1\u652f\u51fa\u2014\u5b9e\u9645\u53d1\u751f\u989d\u300d\u3002",
+    },
+    "J_\u4e2a\u7a0e\u6263\u7f34\u5de5\u8d44\u603b\u989d": {
+        "title": "\u4e2a\u7a0e\u6263\u7f34\u5de5\u8d44\u603b\u989d",
+        "source": "\u81ea\u7136\u4eba\u7535\u5b50\u7a0e\u52a1\u5c40 \u2014 \u6263\u7f34\u7533\u62a5\u5206\u6237\u6e05\u518c\u67e5\u8be2\uff08ITS\uff09\uff0c\u8f93\u5165\u7a0e\u53f7\uff0c\u67e5\u8be2\u4e2a\u4eba\u6240\u5f97\u7a0e\u4ee3\u6263\u4ee3\u7f34\u5de5\u8d44\u603b\u989d\u3002",
+    },
+    "K_\u8ba1\u63d0\u6298\u65f7": {
+        "title": "\u8ba1\u63d0\u6298\u65f7",
+        "source": "\u300a\u4e2d\u534e\u4eba\u6c11\u5171\u548c\u56fd\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u8868\u300b A105080 \u8d44\u4ea7\u6298\u65f7\u3001\u6478\u9500\u53ca\u7eb3\u7a0e\u8c03\u6574\u660e\u7ec6\u8868\u7b2c 30 \u680f\u300c\u672c\u5e74\u6298\u65f7\u3001\u6478\u9500\u989d\u2014\u5408\u8ba1\u300d\u3002",
+    },
+    "L_\u5f53\u671f\u5f00\u7968\u989d\u5ea6": {
+        "title": "\u5f53\u671f\u5f00\u7968\u989d\u5ea6",
+        "source": "\u91d1\u7a0e\u4e09\u671f\u7cfb\u7edf \u2014 \u98ce\u9669\u7ba1\u7406\u7cfb\u7edf\u9996\u9875 \u2014 \u7eb3\u7a0e\u4eba\u53d1\u7968\u7968\u79cd\u5206\u6790\u3002",
+    },
+    "M_\u5f53\u671f\u53d7\u7968\u989d\u5ea6": {
+        "title": "\u5f53\u671f\u53d7\u7968\u989d\u5ea6",
+        "source": "\u91d1\u7a0e\u4e09\u671f\u7cfb\u7edf \u2014 \u98ce\u9669\u7ba1\u7406\u7cfb\u7edf\u9996\u9875 \u2014 \u7eb3\u7a0e\u4eba\u53d1\u7968\u7968\u79cd\u5206\u6790\u3002",
+    },
+    "N_\u5370\u82b1\u7a0e\u8ba1\u7a0e\u4f9d\u636e": {
+        "title": "\u5370\u82b1\u7a0e\u8ba1\u7a0e\u4f9d\u636e",
+        "source": "\u91d1\u7a0e\u4e09\u671f\u7cfb\u7edf \u2014 \u7533\u62a5\u660e\u7ec6\u67e5\u8be2\uff0c\u9009\u62e9\u5bf9\u5e94\u5c5e\u671f\u3001\u5f55\u5165\u7eb3\u7a0e\u4eba\u8bc6\u522b\u53f7\uff0c\u300c\u5f81\u6536\u9879\u76ee\u300d\u9009\u62e9\u300c\u5370\u82b1\u7a0e\u300d\uff0c\u67e5\u8be2\u7ed3\u679c\u4e2d\u7684\u300c\u8ba1\u7a0e\u4f9d\u636e\u300d\u5408\u8ba1\u3002",
+    },
+    "O_\u7b80\u6613\u8ba1\u7a0e\u9500\u552e\u989d": {
+        "title": "\u7b80\u6613\u8ba1\u7a0e\u9500\u552e\u989d",
+        "source": "\u5404\u6708\u300a\u589e\u503c\u7a0e\u53ca\u9644\u52a0\u7a0e\u8d39\u7533\u62a5\u8868\uff08\u4e00\u822c\u7eb3\u7a0e\u4eba\u9002\u7528\uff09\u300b\u7b2c 5 \u680f\u300c\u6309\u7b80\u6613\u5f81\u6536\u529e\u6cd5\u8ba1\u7a0e\u9500\u552e\u989d\u300d\u4e4b\u548c\u3002",
+    },
+    "P_\u514d\u7a0e\u9500\u552e\u989d": {
+        "title": "\u514d\u7a0e\u9500\u552e\u989d",
+        "source": "\u5404\u6708\u300a\u589e\u503c\u7a0e\u53ca\u9644\u52a0\u7a0e\u8d39\u7533\u62a5\u8868\uff08\u4e00\u822c\u7eb3\u7a0e\u4eba\u9002\u7528\uff09\u300b\u7b2c 8 \u680f\u300c\u514d\u7a0e\u9500\u552e\u989d\u300d\u4e4b\u548c\u3002",
+    },
+    "Q_\u8fdb\u9879\u7a0e\u989d": {
+        "title": "\u8fdb\u9879\u7a0e\u989d",
+        "source": "\u5404\u6708\u300a\u589e\u503c\u7a0e\u53ca\u9644\u52a0\u7a0e\u8d39\u7533\u62a5\u8868\uff08\u4e00\u822c\u7eb3\u7a0e\u4eba\u9002\u7528\uff09\u300b\u7b2c 12 \u680f\u300c\u8fdb\u9879\u7a0e\u989d\u300d\u4e4b\u548c\u3002",
+    },
+    "R_\u8fdb\u9879\u7a0e\u989d\u8f6c\u51fa": {
+        "title": "\u8fdb\u9879\u7a0e\u989d\u8f6c\u51fa\u989d",
+        "source": "\u5404\u6708\u300a\u589e\u503c\u7a0e\u53ca\u9644\u52a0\u7a0e\u8d39\u7533\u62a5\u8868\uff08\u4e00\u822c\u7eb3\u7a0e\u4eba\u9002\u7528\uff09\u300b\u7b2c 13 \u680f\u300c\u8fdb\u9879\u7a0e\u989d\u8f6c\u51fa\u300d\u4e4b\u548c\u3002",
+    },
+}
+
+INDUSTRY_CHOICES = ["\u6279\u53d1\u96f6\u552e", "\u5236\u9020", "\u5efa\u7b51\u5b89\u88c5", "\u4ea4\u901a\u8fd0\u8f93", "\u751f\u6d3b\u670d\u52a1", "\u5176\u4ed6"]
+
+INDUSTRY_KEY = "A_\u4e3b\u8425\u884c\u4e1a"
+PERIOD_KEY = "B_\u671f\u95f4"
+NUMERIC_FIELDS = (
+    "C_\u8425\u4e1a\u6536\u5165", "D_\u9500\u552e\u6536\u5165", "E_\u6210\u672c", "F_\u9500\u552e\u8d39\u7528",
+    "G_\u7ba1\u7406\u8d39\u7528", "H_\u8d22\u52a1\u8d39\u7528", "I_\u5de5\u8d44\u85aa\u91d1", "J_\u4e2a\u7a0e\u6263\u7f34\u5de5\u8d44\u603b\u989d",
+    "K_\u8ba1\u63d0\u6298\u65f7", "L_\u5f53\u671f\u5f00\u7968\u989d\u5ea6", "M_\u5f53\u671f\u53d7\u7968\u989d\u5ea6", "N_\u5370\u82b1\u7a0e\u8ba1\u7a0e\u4f9d\u636e",
+    "O_\u7b80\u6613\u8ba1\u7a0e\u9500\u552e\u989d", "P_\u514d\u7a0e\u9500\u552e\u989d", "Q_\u8fdb\u9879\u7a0e\u989d", "R_\u8fdb\u9879\u7a0e\u989d\u8f6c\u51fa",
+)
+FIELD_KEYS = (INDUSTRY_KEY, PERIOD_KEY) + NUMERIC_FIELDS
+
+# ====================== Issues ======================
+ISSUE_REVENUE_GAP   = "\u540c\u671f\u7533\u62a5\u7684\u589e\u503c\u7a0e\u6536\u5165\u4e0e\u4f01\u4e1a\u6240\u5f97\u7a0e\u6536\u5165\u6709\u5dee\u5f02"
+ISSUE_TRADE_RATIO   = "\u5de5\u5546\u4e1a\u7eb3\u7a0e\u4eba\u6210\u672c\u8d39\u7528\u5360\u6bd4\u5f02\u5e38"
+ISSUE_FEE_HIGH      = "\u8d39\u7528\u504f\u9ad8"
+ISSUE_COST_HIGH     = "\u6210\u672c\u504f\u9ad8"
+ISSUE_SERVICE_RATIO = "\u670d\u52a1\u4e1a\u7eb3\u7a0e\u4eba\u6210\u672c\u8d39\u7528\u5360\u6bd4\u5f02\u5e38"
+ISSUE_VOUCHER       = "\u7591\u4f3c\u672a\u53d6\u5f97\u5408\u6cd5\u6709\u6548\u51ed\u8bc1\u5217\u652f"
+ISSUE_WAGE          = "\u7591\u4f3c\u591a\u5217\u5de5\u8d44\u85aa\u91d1\u652f\u51fa\u6216\u5c11\u6263\u7f34\u4e2a\u4eba\u6240\u5f97\u7a0e"
+ISSUE_STAMP         = "\u8fdb\u4e00\u6b65\u6838\u5b9e\u7eb3\u7a0e\u4eba\u662f\u5426\u5c11\u8ba1\u5370\u82b1\u7a0e\u8ba1\u7a0e\u4f9d\u636e"
+ISSUE_INPUT_VAT     = "\u7591\u4f3c\u5c11\u8f6c\u51fa\u7528\u4e8e\u7b80\u6613\u8ba1\u7a0e\u7684\u8fdb\u9879\u7a0e\u989d"
+
+TRADE_INDUSTRIES   = frozenset({"\u6279\u53d1\u96f6\u552e", "\u5236\u9020"})
+SERVICE_INDUSTRIES = frozenset({"\u751f\u6d3b\u670d\u52a1", "\u4ea4\u901a\u8fd0\u8f93"})
+
+_NUM_RE = re.compile(r'^\d+(\.\d{1,2})?$')
+_ZERO = Decimal("0")
+_CENT = Decimal("0.01")
+
+
+def severity_of(msg, ruleset=None):
+    return (ruleset or _active_ruleset()).severity.get(msg, "red")
+
+
+def _active_ruleset():
+    # rule_table imports this module, so it is resolved on first use
+    from rule_table import active_ruleset
+    return active_ruleset()
+
+
+def parse_dec(key, value) -> Decimal:
+    """Parse one amount the way the rules card does: blank is 0, at most 2 decimals."""
+    if value is None:
+        return _ZERO
+    txt = str(value).strip()
+    if not txt:
+        return _ZERO
+    if not _NUM_RE.match(txt):
+        raise ValueError(_format_error(key))
+    return Decimal(txt).quantize(_CENT, rounding=ROUND_HALF_UP)
+
+
+def parse_fen(key, value) -> int:
+    """Same validation as ``parse_dec`` but returns integer fen, skipping Decimal."""
+    if value is None:
+        return 0
+    txt = value.strip() if isinstance(value, str) else str(value).strip()
+    if not txt:
+        return 0
+    if not _NUM_RE.match(txt):
+        raise ValueError(_format_error(key))
+    whole, _, frac = txt.partition(".")
+    return int(whole) * 100 + int((frac + "00")[:2])
+
+
+def _format_error(key):
+    return f"\u300c{key}\u300d \u683c\u5f0f\u4e0d\u6b63\u786e\uff0c\u8bf7\u8f93\u5165\u6574\u6570\u6216\u4e24\u4f4d\u5c0f\u6570"
+
+
+def normalize_field(key, value):
+    """A/B as stripped text, C-R through ``parse_dec``."""
+    if key in (INDUSTRY_KEY, PERIOD_KEY):
+        return str(value or "").strip()
+    return parse_dec(key, value)
+
+
+def normalize_record(record):
+    """Return a dict with A/B as stripped text and C-R as Decimal."""
+    rec = {
+        INDUSTRY_KEY: str(record.get(INDUSTRY_KEY) or "").strip(),
+        PERIOD_KEY:   str(record.get(PERIOD_KEY) or "").strip(),
+    }
+    for key in NUMERIC_FIELDS:
+        rec[key] = parse_dec(key, record.get(key))
+    return rec
+
+
+# ====================== Rules ======================
+def evaluate(record, ruleset=None):
+    """Run every rule on one A-R record and return the ``(msg, severity)`` list.
+
+    ``record`` maps the ``FIELD_KEYS`` to raw text or numbers; missing
+    amounts count as 0. Raises ValueError on a malformed amount. The rules
+    come from ``ruleset`` or the active ``rule_table`` rule set.
+    """
+    return (ruleset or _active_ruleset()).evaluate_normalized(normalize_record(record))
+
+
+def evaluate_many(records, ruleset=None):
+    """Yield the issue list for each record in order.
+
+    Lazy so a caller can stream tens of thousands of enterprises without
+    holding every result; wrap in ``list()`` when all are needed at once.
+    """
+    rs = ruleset or _active_ruleset()
+    for record in records:
+        yield rs.evaluate_normalized(normalize_record(record))
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""Declarative risk-rule table.
+
+Each rule is data: an id, the A-R fields it reads, a predicate over those
+fields, named thresholds, a severity and a guide reference into
+``ISSUE_GUIDE_MAP``. ``DEFAULT_RULESET`` reproduces the original inline
+checks; a province can ship its own versioned JSON file with the same
+shape (``python rule_table.py --dump`` writes a template) and point
+``TAXAPP_RULES`` or ``load_ruleset(path)`` at it.
+
+Predicates are a small expression language checked with ``ast``: field
+letters ``A``-``R``, threshold and set names, ids of earlier rules (their
+bool result), numbers, ``+ - * /``, comparisons, ``and/or/not``, ``in`` and
+the functions ``abs``, ``max``, ``min`` and ``round2`` (quantize to the cent,
+half up). Amounts and thresholds are Decimal, exactly as in ``_get_dec``;
+a predicate that divides by zero counts as not hit.
+The whole table compiles to one function (see ``rule_compiler``), cached on
+disk keyed by the table's content hash.
+"""
+import ast
+import hashlib
+import json
+import marshal
+import os
+import sys
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+import rule_compiler
+from rule_engine import (
+    INDUSTRY_KEY, PERIOD_KEY, NUMERIC_FIELDS, ISSUE_GUIDE_MAP,
+    ISSUE_REVENUE_GAP, ISSUE_TRADE_RATIO, ISSUE_SERVICE_RATIO,
+    ISSUE_COST_HIGH, ISSUE_FEE_HIGH, ISSUE_VOUCHER, ISSUE_WAGE,
+    ISSUE_STAMP, ISSUE_INPUT_VAT, TRADE_INDUSTRIES, SERVICE_INDUSTRIES,
+)
+
+FORMAT = 1
+SEVERITIES = ("red", "yellow")
+
+# Field letter -> record key
+LETTERS = {key.split("_", 1)[0]: key for key in (INDUSTRY_KEY, PERIOD_KEY) + NUMERIC_FIELDS}
+
+DEFAULT_RULESET = {
+    "format": FORMAT,
+    "version": "2024.1-default",
+    "sets": {
+        "trade":   sorted(TRADE_INDUSTRIES),
+        "service": sorted(SERVICE_INDUSTRIES),
+    },
+    "rules": [
+        {"id": "revenue_gap", "message": ISSUE_REVENUE_GAP, "severity": "red",
+         "fields": ["C", "D"],
+         "predicate": "abs(D - C) > gap",
+         "thresholds": {"gap": "100"}},
+        {"id": "trade_ratio", "message": ISSUE_TRADE_RATIO, "severity": "yellow",
+         "fields": ["A", "C", "E", "F", "G", "H"],
+         "predicate": "A in trade and C > 0 and (E + F + G + H) / C >= ratio",
+         "thresholds": {"ratio": "0.70"}},
+        {"id": "service_ratio", "message": ISSUE_SERVICE_RATIO, "severity": "yellow",
+         "fields": ["A", "C", "E", "F", "G", "H"],
+         "predicate": "A in service and C > 0 and (E + F + G + H) / C >= ratio",
+         "thresholds": {"ratio": "0.60"}},
+        {"id": "cost_high", "message": ISSUE_COST_HIGH, "severity": "red",
+         "fields": ["C", "E"],
+         "predicate": "(trade_ratio or service_ratio) and E / C > ratio",
+         "thresholds": {"ratio": "0.50"}},
+        {"id": "fee_high", "message": ISSUE_FEE_HIGH, "severity": "red",
+         "fields": ["C", "F", "G", "H"],
+         "predicate": "(trade_ratio or service_ratio) and (F + G + H) / C >= ratio",
+         "thresholds": {"ratio": "0.50"}},
+        {"id": "voucher", "message": ISSUE_VOUCHER, "severity": "red",
+         "fields": ["E", "F", "G", "H", "I", "K", "M"],
+         "predicate": "E + F + G + H - I - K - M > gap",
+         "thresholds": {"gap": "20000"}},
+        {"id": "wage", "message": ISSUE_WAGE, "severity": "yellow",
+         "fields": ["I", "J"],
+         "predicate": "I >= wage_min and I - J >= gap",
+         "thresholds": {"wage_min": "500000", "gap": "100000"}},
+        {"id": "stamp", "message": ISSUE_STAMP, "severity": "yellow",
+         "fields": ["C", "E", "F", "G", "I", "N"],
+         "predicate": "C + E + F + G - I >= base_min and N < C + E + F + G - I",
+         "thresholds": {"base_min": "1000000"}},
+        {"id": "input_vat", "message": ISSUE_INPUT_VAT, "severity": "yellow",
+         "fields": ["C", "D", "L", "O", "Q", "R"],
+         "predicate": "Q > 0 and max(D, C, L) > 0 and R + tolerance < round2(Q * (O / max(D, C, L)))",
+         "thresholds": {"tolerance": "0.01"}},
+    ],
+}
+
+_CENT = Decimal("0.01")
+
+
+def _round2(x):
+    return x.quantize(_CENT, rounding=ROUND_HALF_UP)
+
+
+FUNCTIONS = {"abs": abs, "max": max, "min": min, "round2": _round2}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Compare, ast.Eq, ast.NotEq,
+    ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn, ast.Call, ast.Name,
+    ast.Load, ast.Constant,
+)
+
+
+class RuleError(ValueError):
+    """A rule table that cannot be compiled."""
+
+
+class Rule:
+    __slots__ = ("id", "message", "severity", "guide", "fields", "keys",
+                 "depends", "predicate", "thresholds")
+
+    def __repr__(self):
+        return f"Rule({self.id!r}, {self.severity!r})"
+
+
+class RuleSet:
+    """A compiled rule table; ``evaluate`` returns the ``(msg, severity)`` list."""
+
+    def __init__(self, data, rules, trees, fingerprint, built):
+        self.data = data
+        self.version = str(data.get("version", ""))
+        self.sets = {k: frozenset(v) for k, v in data.get("sets", {}).items()}
+        self.rules = rules
+        self.fingerprint = fingerprint
+        self.by_id = {r.id: r for r in rules}
+        self.severity = {r.message: r.severity for r in rules}
+        self.guides = {r.message: r.guide for r in rules}
+        self.keys = tuple(k for k in LETTERS.values()
+                          if any(k in r.keys for r in rules))
+        fast, slow, literals, self.stats = built
+        self._trees = trees
+        self._literals = literals
+        self._ns = ns = dict(FUNCTIONS)
+        ns.update({f"s_{k}": v for k, v in self.sets.items()})
+        ns.update({name: Decimal(text) for name, text in literals.items()})
+        for i, r in enumerate(rules):
+            ns.update({f"k{i}_{k}": v for k, v in r.thresholds.items()})
+            ns[f"i_{r.id}"] = (r.message, r.severity)
+        # the unshared variant takes over if a hoisted term ever raises
+        ns["fallback"] = rule_compiler.bind(slow, ns)["evaluate"]
+        # Evaluate a record already passed through ``normalize_record``.
+        self.evaluate_normalized = rule_compiler.bind(fast, ns)["evaluate"]
+        self._rule_fns = None
+
+    def rule_functions(self):
+        """Per-rule ``fn(rec, hits)`` for incremental evaluation, compiled on first use."""
+        if self._rule_fns is None:
+            lits = {text: name for name, text in self._literals.items()}
+            src = rule_compiler.build_rule_source(self.rules, self._trees, LETTERS,
+                                                  self.sets, lits)
+            ns = dict(self._ns)
+            ns.update({name: Decimal(text) for text, name in lits.items()})
+            scope = rule_compiler.bind(rule_compiler.compile_source(src, self.version), ns)
+            self._rule_fns = [scope[f"rule_{i}"] for i in range(len(self.rules))]
+        return self._rule_fns
+
+    def affected(self, keys):
+        """Indexes of the rules to re-run when fields ``keys`` change, in order."""
+        keys = set(keys)
+        changed = set()
+        out = []
+        for i, r in enumerate(self.rules):
+            if keys.intersection(r.keys) or changed.intersection(r.depends):
+                changed.add(r.id)
+                out.append(i)
+        return out
+
+
+# ====================== Compile ======================
+def _check_names(rule, tree, known):
+    names = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise RuleError(f"{rule['id']}: \u4e0d\u652f\u6301\u7684\u8868\u8fbe\u5f0f {type(node).__name__}")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+                raise RuleError(f"{rule['id']}: \u4e0d\u652f\u6301\u7684\u51fd\u6570\u8c03\u7528")
+        if isinstance(node, ast.Name):
+            names.add(node.id)
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, str)):
+            raise RuleError(f"{rule['id']}: \u4e0d\u652f\u6301\u7684\u5e38\u91cf {node.value!r}")
+    unknown = names - known - set(FUNCTIONS)
+    if unknown:
+        raise RuleError(f"{rule['id']}: \u672a\u77e5\u540d\u79f0 {', '.join(sorted(unknown))}")
+    return names
+
+
+def parse_rules(data):
+    """Validate a rule table and return ``(rules, trees)`` without compiling."""
+    if data.get("format", FORMAT) != FORMAT:
+        raise RuleError(f"\u4e0d\u652f\u6301\u7684\u89c4\u5219\u6587\u4ef6\u683c\u5f0f\uff1a{data.get('format')}")
+    sets = data.get("sets", {})
+    seen = set()
+    rules, trees = [], []
+    for raw in data.get("rules", []):
+        rid = raw.get("id")
+        if (not rid or not rid.isidentifier() or rid in seen or rid in LETTERS
+                or rid in sets or rid in FUNCTIONS):
+            raise RuleError(f"\u89c4\u5219 id \u65e0\u6548\u6216\u91cd\u590d\uff1a{rid!r}")
+        if raw.get("severity") not in SEVERITIES:
+            raise RuleError(f"{rid}: severity \u5fc5\u987b\u662f {'/'.join(SEVERITIES)}")
+        thresholds = {}
+        for name, value in raw.get("thresholds", {}).items():
+            try:
+                dec = Decimal(str(value))
+            except InvalidOperation:
+                dec = Decimal("NaN")
+            if not dec.is_finite():
+                raise RuleError(f"{rid}: \u9608\u503c {name} \u4e0d\u662f\u6709\u6548\u6570\u5b57\uff1a{value!r}")
+            thresholds[name] = dec
+        clash = set(thresholds) & (set(LETTERS) | set(sets) | seen | set(FUNCTIONS))
+        if clash:
+            raise RuleError(f"{rid}: \u9608\u503c\u540d\u79f0\u4e0e\u5b57\u6bb5/\u96c6\u5408/\u89c4\u5219\u91cd\u540d {sorted(clash)}")
+        known = set(LETTERS) | set(sets) | set(thresholds) | seen
+        try:
+            tree = ast.parse(raw["predicate"], mode="eval")
+        except (KeyError, SyntaxError) as ex:
+            raise RuleError(f"{rid}: predicate \u65e0\u6cd5\u89e3\u6790\uff08{ex}\uff09") from None
+        names = _check_names(raw, tree, known)
+        used = sorted(n for n in names if n in LETTERS)
+        declared = raw.get("fields")
+        if declared is not None and not set(used) <= set(declared):
+            raise RuleError(f"{rid}: predicate \u4f7f\u7528\u4e86\u672a\u58f0\u660e\u7684\u5b57\u6bb5 {sorted(set(used) - set(declared))}")
+
+        r = Rule()
+        r.id = rid
+        r.message = raw.get("message", rid)
+        r.severity = raw["severity"]
+        r.guide = raw.get("guide", r.message)
+        r.fields = tuple(declared if declared is not None else used)
+        r.keys = tuple(LETTERS[f] for f in r.fields)
+        r.depends = frozenset(names & seen)
+        r.predicate = raw["predicate"]
+        r.thresholds = thresholds
+        rules.append(r)
+        trees.append(tree)
+        seen.add(rid)
+    return rules, trees
+
+
+def fingerprint(data):
+    blob = json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def compile_ruleset(data, cache=True):
+    """Compile a rule table into a ``RuleSet``, reusing the on-disk cache."""
+    fp = fingerprint(data)
+    rules, trees = parse_rules(data)
+    sets = data.get("sets", {})
+    built = _load_cached(fp) if cache else None
+    if built is None:
+        fast, literals, stats = rule_compiler.build_source(rules, trees, LETTERS, sets)
+        slow, _, _ = rule_compiler.build_source(rules, trees, LETTERS, sets, share=False)
+        version = str(data.get("version", ""))
+        built = (rule_compiler.compile_source(fast, version),
+                 rule_compiler.compile_source(slow, version), literals, stats)
+        if cache:
+            _store_cached(fp, built)
+    return RuleSet(data, rules, trees, fp, built)
+
+
+# ====================== Cache ======================
+def cache_dir():
+    return os.environ.get("TAXAPP_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".taxapp", "cache")
+
+
+def _cache_path(fp):
+    tag = sys.implementation.cache_tag or "py"
+    return os.path.join(cache_dir(), f"rules-{fp[:16]}-g{rule_compiler.CODEGEN_VERSION}.{tag}.bin")
+
+
+def _load_cached(fp):
+    try:
+        with open(_cache_path(fp), "rb") as fh:
+            built = marshal.load(fh)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return built if isinstance(built, tuple) and len(built) == 4 else None
+
+
+def _store_cached(fp, built):
+    path = _cache_path(fp)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            marshal.dump(built, fh)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # cache is an optimisation only
+
+
+# ====================== Loading ======================
+def load_ruleset(path=None, cache=True):
+    """Load and compile ``path`` (JSON), or the built-in table when None."""
+    if path is None:
+        return compile_ruleset(DEFAULT_RULESET, cache)
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    return compile_ruleset(data, cache)
+
+
+_active = None
+
+
+def active_ruleset():
+    """The rule set used by ``rule_engine.evaluate``: ``TAXAPP_RULES`` or the default."""
+    global _active
+    if _active is None:
+        _active = load_ruleset(os.environ.get("TAXAPP_RULES") or None)
+    return _active
+
+
+def set_active_ruleset(ruleset):
+    global _active
+    _active = ruleset
+
+
+def guide_lines(msg, ruleset=None):
+    rs = ruleset or active_ruleset()
+    return ISSUE_GUIDE_MAP.get(rs.guides.get(msg, msg), [])
+
+
+if __name__ == "__main__":
+    if "--dump" in sys.argv:
+        json.dump(DEFAULT_RULESET, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    else:
+        rs = load_ruleset(sys.argv[1] if len(sys.argv) > 1 else None, cache=False)
+        print(f"{rs.version}: {len(rs.rules)} rules OK, {rs.stats['shared']} shared terms")
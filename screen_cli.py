@@ -0,0 +1,609 @@
+# -*- coding: utf-8 -*-
+"""Command-line batch screening, no tkinter required.
+
+    python tax_benefit_app.py screen --input x.xlsx --output y.csv [--workers N] [--metrics m.prom]
+                                     [--rank queue.csv --rank-top 200]
+    python tax_benefit_app.py vat --input 2024-01.xlsx [--input ...] --export vat.csv
+    python tax_benefit_app.py join --cit cit.xlsx --vat vat.csv [--its ...] --output records.csv
+    python tax_benefit_app.py fetch --codes codes.csv --url http://host:port --output records.csv
+    python tax_benefit_app.py benefits --input x.xlsx [--top 20] [--output summary.csv]
+    python tax_benefit_app.py codes --input x.xlsx [--output problems.csv]
+    python tax_benefit_app.py peers --input x.xlsx [--append] [--output percentiles.csv]
+    python tax_benefit_app.py sweep --input x.xlsx [--rule voucher --threshold gap --to 100000] [--by-industry]
+
+Runs the A-R rule checks (and \u672a\u4eab\u4f18\u60e0 when the input carries \u5e94\u4eab/\u5df2\u4eab
+columns) over every row and streams the results through ``ResultsSink``.
+The exit code reflects the highest severity found, see ``EXIT_*``.
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import time
+from decimal import Decimal
+
+from benefits import (BENEFIT_KEYS, TAX_ITEMS, BenefitRollup, calculate_benefits, fen_to_yuan,
+                      has_benefit_data, should_key, enjoyed_key)
+from batch_import import (CHUNK_SIZE, COMPANY_NAME_KEY, CREDIT_CODE_KEY, iter_chunks, iter_rows,
+                          map_header, _cell_text)
+from batch_parallel import screen_parallel
+from case_store import BATCH_ROWS, Case, CaseStore
+from column_cache import open_columns
+from credit_code import CodeIndex, validate as validate_code
+from field_fetch import (CONCURRENCY, PATH_TEMPLATE, RETRIES, TIMEOUT, codes_from_rows,
+                         fetch_records)
+from metrics import METRICS
+from peer_stats import METRICS as PEER_METRICS, METRIC_TITLES, PeerIndex, build_index
+from result_cache import ResultCache
+from risk_score import DEFAULT_TOP, RiskQueue, write_queue
+from results_sink import ResultsSink
+from rule_engine import FIELD_KEYS, INDUSTRY_CHOICES, INDUSTRY_KEY
+from rule_table import active_ruleset
+from threshold_sweep import GROUPS as SWEEP_GROUPS, SWEEPS, ThresholdSweep
+from source_join import RUN_ROWS, SOURCE_TITLES, SourceJoin, write_joined
+from vat_aggregate import GRANULARITIES, VatStore
+
+EXIT_OK = 0          # no issues
+EXIT_YELLOW = 1      # highest severity 需核实
+EXIT_RED = 2         # at least one 高风险
+EXIT_DATA_ERROR = 3  # some rows could not be parsed
+EXIT_FAILURE = 4     # input unreadable / run aborted
+EXIT_USAGE = 64
+
+_SEVERITY_EXIT = {"yellow": EXIT_YELLOW, "red": EXIT_RED}
+
+
+class _Parser(argparse.ArgumentParser):
+    def error(self, message):
+        self.print_usage(sys.stderr)
+        self.exit(EXIT_USAGE, f"{self.prog}: error: {message}\n")
+
+
+def build_parser():
+    parser = _Parser(prog="tax_benefit_app.py", description="\u751f\u4ea7\u7ecf\u8425\u5408\u89c4\u68c0\u6d4b\u5668 \u2014 \u6279\u91cf\u68c0\u67e5")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sc = sub.add_parser("screen", help="\u6279\u91cf\u8fd0\u884c\u7591\u70b9\u89c4\u5219\u68c0\u67e5")
+    sc.add_argument("--input", "-i", required=True, help=".xlsx / .csv \u8f93\u5165\u6587\u4ef6")
+    sc.add_argument("--output", "-o", required=True, help=".csv / .jsonl / .xlsx \u7ed3\u679c\u6587\u4ef6")
+    sc.add_argument("--workers", "-w", type=int, default=1, help="\u5e76\u884c\u8fdb\u7a0b\u6570\uff08\u9ed8\u8ba4 1\uff09")
+    sc.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    sc.add_argument("--sheet", help="\u5de5\u4f5c\u8868\u540d\u79f0\uff08\u9ed8\u8ba4\u6d3b\u52a8\u5de5\u4f5c\u8868\uff09")
+    sc.add_argument("--encoding", default="utf-8-sig", help="CSV \u7f16\u7801\uff0c\u91d1\u7a0e\u4e09\u671f\u5bfc\u51fa\u5e38\u4e3a gbk")
+    sc.add_argument("--benefits", help="\u672a\u4eab\u4f18\u60e0\u660e\u7ec6\u8f93\u51fa (.csv)")
+    sc.add_argument("--store", metavar="DB", help="\u540c\u65f6\u5199\u5165\u6848\u4f8b\u5e93 (SQLite)")
+    sc.add_argument("--cache", metavar="DB", nargs="?", const="",
+                    help="\u8df3\u8fc7\u6570\u636e\u672a\u53d8\u7684\u4f01\u4e1a\uff08\u9ed8\u8ba4 ~/.taxapp/results.db\uff09")
+    sc.add_argument("--metrics", metavar="FILE",
+                    help="\u8bb0\u5f55\u5404\u9636\u6bb5\u4e0e\u5404\u89c4\u5219\u8017\u65f6\uff0c\u5199\u5165 .json \u6216 .prom\uff08Prometheus \u6587\u672c\u683c\u5f0f\uff09")
+    sc.add_argument("--rank", metavar="CSV",
+                    help="\u6309\u98ce\u9669\u5206\u6392\u5e8f\u7684\u5f85\u6838\u67e5\u961f\u5217 (.csv)")
+    sc.add_argument("--rank-top", type=int, default=DEFAULT_TOP, metavar="N",
+                    help=f"\u961f\u5217\u4fdd\u7559\u98ce\u9669\u5206\u6700\u9ad8\u7684 N \u6237\uff08\u9ed8\u8ba4 {DEFAULT_TOP}\uff09")
+    sc.add_argument("--strict-codes", action="store_true",
+                    help="\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801\u65e0\u6548\u6216\u91cd\u590d\u65f6\u6309\u6570\u636e\u9519\u8bef\u9000\u51fa")
+    sc.add_argument("--quiet", "-q", action="store_true")
+
+    vc = sub.add_parser("vat", help="\u6309\u6708\u6c47\u603b\u589e\u503c\u7a0e\u7533\u62a5\u8868\u4e3a D/O/P/Q/R")
+    vc.add_argument("--input", "-i", action="append", default=[],
+                    help="\u6708\u5ea6\u7533\u62a5\u8868 .xlsx / .csv\uff08\u53ef\u91cd\u590d\uff0c\u6309\u987a\u5e8f\u8ffd\u52a0\uff09")
+    vc.add_argument("--db", metavar="DB", help="\u6c47\u603b\u5e93\uff08\u9ed8\u8ba4 ~/.taxapp/vat.db\uff09")
+    vc.add_argument("--by", choices=GRANULARITIES, default="year", help="\u671f\u95f4\u7c92\u5ea6\uff08\u9ed8\u8ba4 year\uff09")
+    vc.add_argument("--export", metavar="CSV", help="\u5bfc\u51fa\u6c47\u603b\u7ed3\u679c\uff0c\u53ef\u76f4\u63a5\u4f5c\u4e3a screen \u7684\u8f93\u5165")
+    vc.add_argument("--period", help="\u53ea\u5bfc\u51fa\u8be5\u671f\u95f4")
+    vc.add_argument("--sheet", help="\u5de5\u4f5c\u8868\u540d\u79f0\uff08\u9ed8\u8ba4\u6d3b\u52a8\u5de5\u4f5c\u8868\uff09")
+    vc.add_argument("--encoding", default="utf-8-sig")
+    vc.add_argument("--quiet", "-q", action="store_true")
+
+    jc = sub.add_parser("join", help="\u6309\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801\u5408\u5e76\u5404\u7cfb\u7edf\u5bfc\u51fa\u6570\u636e\u4e3a A-R \u8bb0\u5f55")
+    for source, title in SOURCE_TITLES.items():
+        jc.add_argument(f"--{source}", action="append", default=[], metavar="FILE",
+                        help=f"{title}\u5bfc\u51fa\uff08\u53ef\u91cd\u590d\uff09")
+    jc.add_argument("--output", "-o", required=True, help="\u5408\u5e76\u7ed3\u679c .csv\uff0c\u53ef\u76f4\u63a5\u4f5c\u4e3a screen \u7684\u8f93\u5165")
+    jc.add_argument("--missing", metavar="CSV", help="\u7f3a\u5931\u6765\u6e90\u6e05\u5355")
+    jc.add_argument("--run-rows", type=int, default=RUN_ROWS, help="\u6bcf\u4e2a\u6392\u5e8f\u6bb5\u7684\u884c\u6570\uff08\u63a7\u5236\u5185\u5b58\uff09")
+    jc.add_argument("--tmpdir", help="\u4e34\u65f6\u6392\u5e8f\u6587\u4ef6\u76ee\u5f55")
+    jc.add_argument("--sheet", help="\u5de5\u4f5c\u8868\u540d\u79f0\uff08\u9ed8\u8ba4\u6d3b\u52a8\u5de5\u4f5c\u8868\uff09")
+    jc.add_argument("--encoding", default="utf-8-sig")
+    jc.add_argument("--quiet", "-q", action="store_true")
+
+    fc = sub.add_parser("fetch", help="\u4ece\u67e5\u8be2\u670d\u52a1\u6279\u91cf\u9884\u586b A-R \u5b57\u6bb5")
+    fc.add_argument("--codes", "-i", required=True, help="\u542b\u300c\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801\u300d\u5217\u7684 .xlsx / .csv")
+    fc.add_argument("--url", default=os.environ.get("TAXAPP_FETCH_URL"),
+                    help="\u67e5\u8be2\u670d\u52a1\u5730\u5740\uff08\u9ed8\u8ba4\u53d6 TAXAPP_FETCH_URL\uff09")
+    fc.add_argument("--path", default=PATH_TEMPLATE, help="\u8bf7\u6c42\u8def\u5f84\u6a21\u677f\uff0c{code} \u66ff\u6362\u4e3a\u4fe1\u7528\u4ee3\u7801")
+    fc.add_argument("--output", "-o", required=True, help="\u9884\u586b\u7ed3\u679c .csv\uff0c\u53ef\u76f4\u63a5\u4f5c\u4e3a screen \u7684\u8f93\u5165")
+    fc.add_argument("--concurrency", "-c", type=int, default=CONCURRENCY, help="\u540c\u65f6\u8fdb\u884c\u7684\u8bf7\u6c42\u6570")
+    fc.add_argument("--retries", type=int, default=RETRIES)
+    fc.add_argument("--timeout", type=float, default=TIMEOUT, help="\u5355\u6b21\u8bf7\u6c42\u8d85\u65f6\uff08\u79d2\uff09")
+    fc.add_argument("--sheet", help="\u5de5\u4f5c\u8868\u540d\u79f0\uff08\u9ed8\u8ba4\u6d3b\u52a8\u5de5\u4f5c\u8868\uff09")
+    fc.add_argument("--encoding", default="utf-8-sig")
+    fc.add_argument("--quiet", "-q", action="store_true")
+
+    wc = sub.add_parser("sweep", help="\u9608\u503c\u8bd5\u7b97\uff1a\u4e0d\u540c\u9608\u503c\u4e0b\u5404\u89c4\u5219\u547d\u4e2d\u6237\u6570")
+    wc.add_argument("--input", "-i", required=True, help=".xlsx / .csv \u8f93\u5165\u6587\u4ef6")
+    wc.add_argument("--rule", help="\u89c4\u5219 id\uff08\u9ed8\u8ba4\u5217\u51fa\u6bcf\u4e2a\u53ef\u8c03\u9608\u503c\u7684\u6982\u51b5\uff09")
+    wc.add_argument("--threshold", help="\u9608\u503c\u540d\u79f0\uff0c\u89c4\u5219\u53ea\u6709\u4e00\u4e2a\u53ef\u8c03\u9608\u503c\u65f6\u53ef\u7701\u7565")
+    wc.add_argument("--values", help="\u9017\u53f7\u5206\u9694\u7684\u9608\u503c\u5217\u8868")
+    wc.add_argument("--from", dest="start", type=float, default=0.0)
+    wc.add_argument("--to", dest="stop", type=float, help="\u9ed8\u8ba4\u7565\u8d85\u8fc7 99% \u5206\u4f4d")
+    wc.add_argument("--steps", type=int, default=200)
+    wc.add_argument("--by-industry", action="store_true", help="\u540c\u65f6\u5217\u51fa\u5404\u884c\u4e1a\u547d\u4e2d\u6570")
+    wc.add_argument("--output", "-o", help="\u66f2\u7ebf .csv")
+    wc.add_argument("--no-column-cache", action="store_true", help="\u4e0d\u4f7f\u7528\u5217\u5f0f\u7f13\u5b58\uff0c\u76f4\u63a5\u8bfb\u53d6\u8f93\u5165\u6587\u4ef6")
+    wc.add_argument("--sheet", help="\u5de5\u4f5c\u8868\u540d\u79f0\uff08\u9ed8\u8ba4\u6d3b\u52a8\u5de5\u4f5c\u8868\uff09")
+    wc.add_argument("--encoding", default="utf-8-sig")
+    wc.add_argument("--quiet", "-q", action="store_true")
+
+    cc = sub.add_parser("codes", help="\u6821\u9a8c\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801\uff08GB 32100\uff09\u5e76\u67e5\u627e\u91cd\u590d")
+    cc.add_argument("--input", "-i", required=True, help="\u542b\u300c\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801\u300d\u5217\u7684 .xlsx / .csv")
+    cc.add_argument("--output", "-o", help="\u95ee\u9898\u6e05\u5355 .csv")
+    cc.add_argument("--sheet", help="\u5de5\u4f5c\u8868\u540d\u79f0\uff08\u9ed8\u8ba4\u6d3b\u52a8\u5de5\u4f5c\u8868\uff09")
+    cc.add_argument("--encoding", default="utf-8-sig")
+    cc.add_argument("--quiet", "-q", action="store_true")
+
+    pc = sub.add_parser("peers", help="\u6309\u884c\u4e1a\u5efa\u7acb\u6210\u672c\u7387\u3001\u8d39\u7528\u7387\u7b49\u6307\u6807\u7684\u5206\u4f4d\u6570\u7d22\u5f15")
+    pc.add_argument("--input", "-i", required=True, help=".xlsx / .csv \u8f93\u5165\u6587\u4ef6")
+    pc.add_argument("--index", metavar="NPZ", help="\u7d22\u5f15\u6587\u4ef6\uff08\u9ed8\u8ba4 ~/.taxapp/peers.npz\uff09")
+    pc.add_argument("--append", action="store_true", help="\u5e76\u5165\u5df2\u6709\u7d22\u5f15\uff0c\u800c\u4e0d\u662f\u91cd\u5efa")
+    pc.add_argument("--output", "-o", help="\u6bcf\u6237\u7684\u540c\u884c\u4e1a\u767e\u5206\u4f4d .csv\uff08\u518d\u8bfb\u4e00\u904d\u8f93\u5165\uff09")
+    pc.add_argument("--no-column-cache", action="store_true", help="\u4e0d\u4f7f\u7528\u5217\u5f0f\u7f13\u5b58\uff0c\u76f4\u63a5\u8bfb\u53d6\u8f93\u5165\u6587\u4ef6")
+    pc.add_argument("--sheet", help="\u5de5\u4f5c\u8868\u540d\u79f0\uff08\u9ed8\u8ba4\u6d3b\u52a8\u5de5\u4f5c\u8868\uff09")
+    pc.add_argument("--encoding", default="utf-8-sig")
+    pc.add_argument("--quiet", "-q", action="store_true")
+
+    bc = sub.add_parser("benefits", help="\u6279\u91cf\u6c47\u603b\u672a\u4eab\u4f18\u60e0\uff08\u6309\u7a0e\u76ee\u3001\u884c\u4e1a\u53ca\u91d1\u989d\u6700\u5927\u4f01\u4e1a\uff09")
+    bc.add_argument("--input", "-i", required=True, help="\u542b\u5e94\u4eab/\u5df2\u4eab\u5217\u7684 .xlsx / .csv")
+    bc.add_argument("--top", type=int, default=20, help="\u5217\u51fa\u672a\u4eab\u91d1\u989d\u6700\u5927\u7684\u4f01\u4e1a\u6570\uff08\u9ed8\u8ba4 20\uff09")
+    bc.add_argument("--output", "-o", help="\u6c47\u603b\u7ed3\u679c .csv")
+    bc.add_argument("--sheet", help="\u5de5\u4f5c\u8868\u540d\u79f0\uff08\u9ed8\u8ba4\u6d3b\u52a8\u5de5\u4f5c\u8868\uff09")
+    bc.add_argument("--encoding", default="utf-8-sig")
+    bc.add_argument("--quiet", "-q", action="store_true")
+    return parser
+
+
+def _status(quiet):
+    if quiet or sys.stderr is None:
+        return None
+    return lambda msg: print(f"\u25b6  {msg}", file=sys.stderr, flush=True)
+
+
+def run_screen(args):
+    status = _status(args.quiet)
+    worst = EXIT_OK
+    rows = flagged = 0
+    started = time.perf_counter()
+
+    bfh = bw = store = cache = None
+    cases = []
+    codes = CodeCheck()
+    queue = RiskQueue(args.rank_top) if args.rank else None
+    version = active_ruleset().version
+    if args.metrics:
+        METRICS.enable()
+    if args.cache is not None:
+        cache = ResultCache(active_ruleset(), args.cache or None)
+    if args.store:
+        store = CaseStore(args.store)
+    if args.benefits:
+        bfh = open(args.benefits, "w", newline="", encoding="utf-8-sig")
+        bw = csv.writer(bfh)
+        bw.writerow(["\u884c\u53f7", "\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801", "\u4f01\u4e1a\u540d\u79f0"] + TAX_ITEMS + ["\u5408\u8ba1"])
+    try:
+        chunks = iter_chunks(args.input, args.chunk_size, args.sheet, args.encoding)
+        with ResultsSink(args.output) as sink:
+            for sr in screen_parallel(chunks, args.workers, status, cache=cache):
+                rows += 1
+                sink.add_screened(sr)
+                codes.add(sr.credit_code, sr.row)
+                if queue is not None:
+                    queue.add_screened(sr)
+                if sr.error:
+                    worst = max(worst, EXIT_DATA_ERROR)
+                    continue
+                if sr.issues:
+                    flagged += 1
+                    worst = max([worst] + [_SEVERITY_EXIT.get(s, EXIT_OK) for _, s in sr.issues])
+                diffs = None
+                if (bw is not None or store is not None) and has_benefit_data(sr.record):
+                    try:
+                        diffs, total = calculate_benefits(sr.record)
+                    except ValueError as ex:
+                        sink.add_error(sr.credit_code, str(ex), sr.record.get(COMPANY_NAME_KEY, ""), sr.row)
+                        worst = max(worst, EXIT_DATA_ERROR)
+                        continue
+                    if bw is not None:
+                        bw.writerow([sr.row, sr.credit_code, sr.record.get(COMPANY_NAME_KEY, "")]
+                                    + [f"{diffs[i]:.2f}" for i in TAX_ITEMS] + [f"{total:.2f}"])
+                if store is not None and sr.credit_code:
+                    cases.append(_case(sr, diffs, version))
+                    if len(cases) >= BATCH_ROWS:
+                        store.save_many(cases)
+                        cases.clear()
+        if store is not None and cases:
+            store.save_many(cases)
+        codes.flush()
+    finally:
+        if bfh is not None:
+            bfh.close()
+        if store is not None:
+            store.close()
+        if cache is not None:
+            cache.close()
+
+    if status:
+        status(f"\u6279\u91cf\u68c0\u67e5\u5b8c\u6210 \u2014 \u5171 {rows:,} \u6237\uff0c\u6709\u7591\u70b9 {flagged:,} \u6237\uff0c"
+               f"\u7528\u65f6 {time.perf_counter() - started:.1f} \u79d2")
+        if cache is not None:
+            status(cache.summary())
+        if codes.invalid or codes.duplicates:
+            status(codes.summary())
+    if queue is not None:
+        write_queue(args.rank, queue)
+        if status:
+            status(f"\u98ce\u9669\u6392\u5e8f\u961f\u5217\u5df2\u5199\u5165 {args.rank}\uff08\u5171 {queue.scored:,} \u6237\u6709\u98ce\u9669\u5206\uff0c\u4fdd\u7559\u524d {len(queue):,} \u6237\uff09")
+    if args.metrics:
+        METRICS.write(args.metrics)
+        if status:
+            status(f"\u8fd0\u884c\u6307\u6807\u5df2\u5199\u5165 {args.metrics}")
+    if args.strict_codes and (codes.invalid or codes.duplicates):
+        worst = max(worst, EXIT_DATA_ERROR)
+    return worst
+
+
+class CodeCheck:
+    """Counts invalid and repeated credit codes in batches of ``CHUNK_SIZE``."""
+
+    def __init__(self):
+        self.index = CodeIndex()
+        self.invalid = self.duplicates = 0
+        self.examples = []
+        self._codes, self._rows = [], []
+
+    def add(self, code, row):
+        self._codes.append(code)
+        self._rows.append(row)
+        if len(self._codes) >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self._codes:
+            return
+        invalid, dups = self.index.add_many(self._codes, self._rows)
+        self.invalid += len(invalid)
+        self.duplicates += len(dups)
+        for row, first in dups[:max(0, 5 - len(self.examples))]:
+            self.examples.append(f"\u7b2c {row} \u884c\u4e0e\u7b2c {first} \u884c\u91cd\u590d")
+        self._codes, self._rows = [], []
+
+    def summary(self):
+        text = f"\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801\u65e0\u6548 {self.invalid:,} \u884c\uff0c\u91cd\u590d {self.duplicates:,} \u884c"
+        if self.examples:
+            text += "\uff08" + "\uff1b".join(self.examples) + "\uff09"
+        return text
+
+
+def run_vat(args):
+    status = _status(args.quiet)
+    worst = EXIT_OK
+    started = time.perf_counter()
+    with VatStore(args.db, args.by) as vs:
+        for path in args.input:
+            st = vs.ingest_file(path, args.sheet, args.encoding)
+            if status:
+                status(f"{path} \u2014 {st.rows:,} \u884c\uff0c\u65b0\u589e {st.months:,} \u4e2a\u6708\u5ea6\uff0c\u9519\u8bef {st.errors:,} \u884c")
+                for msg in st.messages:
+                    status(msg)
+            if st.errors:
+                worst = EXIT_DATA_ERROR
+        if args.export:
+            n = vs.export_csv(args.export, args.period, args.encoding)
+            if status:
+                status(f"\u5df2\u5bfc\u51fa {n:,} \u6237\u671f\u95f4\u81f3 {args.export}")
+    if status:
+        status(f"\u589e\u503c\u7a0e\u6c47\u603b\u5b8c\u6210\uff0c\u7528\u65f6 {time.perf_counter() - started:.1f} \u79d2")
+    return worst
+
+
+def run_join(args):
+    status = _status(args.quiet)
+    started = time.perf_counter()
+    join = SourceJoin(args.run_rows, args.tmpdir, args.sheet, args.encoding)
+    for source in SOURCE_TITLES:
+        for path in getattr(args, source):
+            join.add(source, path)
+    if not join.inputs:
+        raise ValueError("\u81f3\u5c11\u9700\u8981\u4e00\u4e2a\u6765\u6e90\u6587\u4ef6\uff08--cit / --vat / --its / --stamp / --invoice\uff09")
+    write_joined(join, args.output, args.missing)
+    if status:
+        status(f"{join.summary()}\uff0c\u7528\u65f6 {time.perf_counter() - started:.1f} \u79d2")
+    st = join.stats
+    return EXIT_DATA_ERROR if st.missing or st.duplicates or st.invalid else EXIT_OK
+
+
+def run_fetch(args):
+    status = _status(args.quiet)
+    if not args.url:
+        raise ValueError("\u672a\u6307\u5b9a\u67e5\u8be2\u670d\u52a1\u5730\u5740\uff08--url \u6216 TAXAPP_FETCH_URL\uff09")
+    started = time.perf_counter()
+    codes = list(codes_from_rows(iter_rows(args.codes, args.sheet, args.encoding)))
+    step = max(1, len(codes) // 20)
+
+    def progress(done, total):
+        if status and (done % step == 0 or done == total):
+            status(f"\u5df2\u67e5\u8be2 {done:,} / {total:,}")
+
+    results, fetcher = fetch_records(codes, args.url, args.path, args.concurrency,
+                                     args.retries, args.timeout, progress=progress)
+    head = [CREDIT_CODE_KEY, COMPANY_NAME_KEY] + list(FIELD_KEYS)
+    with open(args.output, "w", newline="", encoding="utf-8-sig") as fh:
+        w = csv.writer(fh)
+        w.writerow(head)
+        for res in results:
+            if res.error is None:
+                rec = dict(res.record, **{CREDIT_CODE_KEY: res.credit_code})
+                w.writerow([rec.get(k, "") for k in head])
+            elif status:
+                status(f"{res.credit_code}\uff1a{res.error}")
+    if status:
+        status(f"\u9884\u586b\u5b8c\u6210 \u2014 {len(codes):,} \u6237\uff0c{fetcher.summary()}\uff0c"
+               f"\u7528\u65f6 {time.perf_counter() - started:.1f} \u79d2")
+    return EXIT_DATA_ERROR if fetcher.failed else EXIT_OK
+
+
+def run_peers(args):
+    status = _status(args.quiet)
+    started = time.perf_counter()
+    index = (PeerIndex.load(args.index) if args.append else None) or PeerIndex()
+    table = _column_table(args, status)
+    if table is not None:
+        for _, cols, keep in table.iter_columns():
+            index.add_columns(cols, keep=keep)
+        index.skipped += len(table.errors) + len(table.fallback)
+        table.close()
+    else:
+        build_index(iter_chunks(args.input, CHUNK_SIZE, args.sheet, args.encoding), index)
+    path = index.save(args.index)
+    if not args.quiet:
+        print("\t".join(["\u884c\u4e1a", "\u6237\u6570"] + [f"{METRIC_TITLES[m]} P50/P90" for m in PEER_METRICS]))
+        for industry in INDUSTRY_CHOICES:
+            n = index.count(industry)
+            if n:
+                cells = []
+                for m in PEER_METRICS:
+                    q50, q90 = index.quantile(industry, m, 0.5), index.quantile(industry, m, 0.9)
+                    cells.append("-" if q50 is None else
+                                 f"{q50:.2f}/{q90:.2f}" if m.endswith("ratio") else f"{q50:,.0f}/{q90:,.0f}")
+                print("\t".join([industry, f"{n:,}"] + cells))
+
+    rows = 0
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8-sig") as fh:
+            w = csv.writer(fh)
+            head = ["\u884c\u53f7", CREDIT_CODE_KEY, COMPANY_NAME_KEY, "\u4e3b\u8425\u884c\u4e1a"]
+            for m in PEER_METRICS:
+                head += [METRIC_TITLES[m], f"{METRIC_TITLES[m]}\u767e\u5206\u4f4d"]
+            w.writerow(head)
+            for chunk in iter_chunks(args.input, CHUNK_SIZE, args.sheet, args.encoding):
+                for n, record in chunk:
+                    try:
+                        found = index.compare(record)
+                    except ValueError:
+                        continue
+                    row = [n, record.get(CREDIT_CODE_KEY, ""), record.get(COMPANY_NAME_KEY, ""),
+                           record.get(INDUSTRY_KEY, "")]
+                    for m in PEER_METRICS:
+                        value, pct = found.get(m, (None, None))
+                        row += ["" if value is None else f"{value:.4f}" if m.endswith("ratio") else f"{value:.2f}",
+                                "" if pct is None else f"{pct:.1f}"]
+                    w.writerow(row)
+                    rows += 1
+    if status:
+        status(f"\u540c\u884c\u4e1a\u7d22\u5f15\u5df2\u5199\u5165 {path}\uff0c\u5171 {sum(index.count(i) for i in INDUSTRY_CHOICES):,} \u6237"
+               + (f"\uff0c\u683c\u5f0f\u9519\u8bef\u8df3\u8fc7 {index.skipped:,} \u884c" if index.skipped else "")
+               + (f"\uff0c\u767e\u5206\u4f4d {rows:,} \u6237" if args.output else "")
+               + f"\uff0c\u7528\u65f6 {time.perf_counter() - started:.1f} \u79d2")
+    return EXIT_DATA_ERROR if index.skipped else EXIT_OK
+
+
+def _column_table(args, status):
+    """The input's memory-mapped column cache (built on first use), or None
+    when disabled or it cannot be written."""
+    if args.no_column_cache:
+        return None
+    progress = None
+    if status:
+        progress = lambda n: status(f"\u9996\u6b21\u8bfb\u53d6\uff0c\u5efa\u7acb\u5217\u5f0f\u7f13\u5b58 \u2014 \u5df2\u8bfb\u53d6 {n:,} \u884c")
+    try:
+        return open_columns(args.input, args.sheet, args.encoding, progress=progress)
+    except OSError as ex:
+        if status:
+            status(f"\u5217\u5f0f\u7f13\u5b58\u4e0d\u53ef\u7528\uff08{ex}\uff09\uff0c\u76f4\u63a5\u8bfb\u53d6\u8f93\u5165\u6587\u4ef6")
+        return None
+
+
+def run_sweep(args):
+    status = _status(args.quiet)
+    started = time.perf_counter()
+    if args.rule:
+        names = [name for rid, name in SWEEPS if rid == args.rule]
+        if not names:
+            print(f"\u53ef\u8c03\u89c4\u5219\uff1a{', '.join(sorted({rid for rid, _ in SWEEPS}))}", file=sys.stderr)
+            return EXIT_USAGE
+        name = args.threshold or (names[0] if len(names) == 1 else None)
+        if name not in names:
+            print(f"{args.rule} \u7684\u9608\u503c\uff1a{', '.join(names)}", file=sys.stderr)
+            return EXIT_USAGE
+    try:
+        sweep = ThresholdSweep()
+    except ValueError as ex:
+        print(str(ex), file=sys.stderr)
+        return EXIT_FAILURE
+    table = _column_table(args, status)
+    if table is not None:
+        for _, cols, keep in table.iter_columns():
+            sweep.add_columns(cols, keep)
+        table.close()
+    else:
+        sweep.add_chunks(iter_chunks(args.input, CHUNK_SIZE, args.sheet, args.encoding))
+    built = time.perf_counter() - started
+
+    if not args.rule:
+        # overview: every sweepable threshold at half, current, and double
+        print("\t".join(["\u89c4\u5219", "\u9608\u503c", "\u5f53\u524d\u503c", "\u00d70.5", "\u00d70.8", "\u5f53\u524d", "\u00d71.25", "\u00d72"]))
+        for rid, name in SWEEPS:
+            cur = sweep.current(rid, name)
+            hits = sweep.counts(rid, name, [cur * Decimal(f) for f in ("0.5", "0.8", "1", "1.25", "2")])
+            print("\t".join([rid, name, str(cur)] + [f"{n:,}" for n in hits]))
+        if status:
+            status(f"\u5171 {sweep.rows:,} \u6237\uff0c\u8bfb\u53d6\u4e0e\u6392\u5e8f {built:.1f} \u79d2")
+        return EXIT_DATA_ERROR if sweep.skipped else EXIT_OK
+
+    if args.values:
+        xs = [float(v) for v in args.values.split(",") if v.strip()]
+    elif args.stop is not None:
+        xs = [args.start + (args.stop - args.start) * i / max(1, args.steps - 1) for i in range(args.steps)]
+    else:
+        xs = sweep.grid(args.rule, name, args.steps)
+    t0 = time.perf_counter()
+    columns = [("\u5408\u8ba1", sweep.counts(args.rule, name, xs))]
+    if args.by_industry:
+        columns += [(g or "\u672a\u77e5\u884c\u4e1a", sweep.counts(args.rule, name, xs, g)) for g in SWEEP_GROUPS]
+    spent = time.perf_counter() - t0
+    head = [f"{args.rule}.{name}"] + [title for title, _ in columns]
+    rows = [[f"{x:g}"] + [int(c[i]) for _, c in columns] for i, x in enumerate(xs)]
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8-sig") as fh:
+            w = csv.writer(fh)
+            w.writerow(head)
+            w.writerows(rows)
+    if not args.quiet and not args.output:
+        print("\t".join(head))
+        for row in rows:
+            print("\t".join(str(v) for v in row))
+    if status:
+        status(f"\u5171 {sweep.rows:,} \u6237\uff0c\u5f53\u524d\u9608\u503c {sweep.current(args.rule, name)} \u547d\u4e2d "
+               f"{sweep.count(args.rule, name, sweep.current(args.rule, name)):,} \u6237\uff1b"
+               f"\u8bfb\u53d6\u4e0e\u6392\u5e8f {built:.1f} \u79d2\uff0c{len(xs):,} \u4e2a\u9608\u503c\u8bd5\u7b97 {spent * 1e3:.1f} ms")
+    return EXIT_DATA_ERROR if sweep.skipped else EXIT_OK
+
+
+def run_codes(args):
+    status = _status(args.quiet)
+    started = time.perf_counter()
+    rows = iter_rows(args.input, args.sheet, args.encoding)
+    keys = map_header(next(rows, None) or [])
+    if CREDIT_CODE_KEY not in keys:
+        raise ValueError("\u672a\u8bc6\u522b\u5230\u300c\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801\u300d\u5217")
+    ci = keys.index(CREDIT_CODE_KEY)
+    index = CodeIndex()
+    problems = []   # (row, code, reason)
+    total = 0
+    batch, numbers = [], []
+
+    def flush():
+        invalid, dups = index.add_many(batch, numbers)
+        where = dict(zip(numbers, batch))
+        problems.extend((n, where[n], validate_code(where[n])) for n in invalid)
+        problems.extend((n, where[n], f"\u4e0e\u7b2c {first} \u884c\u91cd\u590d") for n, first in dups)
+        batch.clear()
+        numbers.clear()
+
+    for n, row in enumerate(rows, start=2):
+        if not any(v not in (None, "") for v in row):
+            continue
+        total += 1
+        batch.append(_cell_text(row[ci]) if ci < len(row) else "")
+        numbers.append(n)
+        if len(batch) >= CHUNK_SIZE:
+            flush()
+    if batch:
+        flush()
+    problems.sort()
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8-sig") as fh:
+            w = csv.writer(fh)
+            w.writerow(["\u884c\u53f7", CREDIT_CODE_KEY, "\u95ee\u9898"])
+            w.writerows(problems)
+    elif not args.quiet:
+        for n, code, reason in problems[:50]:
+            print(f"{n}\t{code}\t{reason}")
+    if status:
+        status(f"\u5df2\u6821\u9a8c {total:,} \u884c\uff0c\u6709\u6548\u4e14\u552f\u4e00 {len(index):,} \u6237\uff0c\u95ee\u9898 {len(problems):,} \u884c\uff0c"
+               f"\u7528\u65f6 {time.perf_counter() - started:.1f} \u79d2")
+    return EXIT_DATA_ERROR if problems else EXIT_OK
+
+
+def run_benefits(args):
+    status = _status(args.quiet)
+    started = time.perf_counter()
+    roll = BenefitRollup(args.top)
+    for chunk in iter_chunks(args.input, CHUNK_SIZE, args.sheet, args.encoding, required=BENEFIT_KEYS):
+        for n, rec in chunk:
+            try:
+                roll.add(rec.get(CREDIT_CODE_KEY, ""), rec, rec.get(INDUSTRY_KEY, ""),
+                         rec.get(COMPANY_NAME_KEY, ""))
+            except ValueError as ex:
+                if status:
+                    status(f"\u7b2c {n} \u884c\uff1a{ex}")
+
+    table = [("\u7a0e\u76ee", item, count, yuan) for item, count, yuan in roll.by_item()]
+    table += [("\u884c\u4e1a", industry or "\uff08\u672a\u586b\uff09", count, total)
+              for industry, count, _, total in roll.by_industry()]
+    table += [("\u4f01\u4e1a", f"{code} {company}".strip(), 1, yuan) for code, company, yuan in roll.top()]
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8-sig") as fh:
+            w = csv.writer(fh)
+            w.writerow(["\u7c7b\u522b", "\u540d\u79f0", "\u6237\u6570", "\u672a\u4eab\u4f18\u60e0"])
+            w.writerows([kind, name, count, f"{yuan:.2f}"] for kind, name, count, yuan in table)
+    if not args.quiet:
+        for kind, name, count, yuan in table:
+            print(f"{kind}  {name}\t{count:,}\t{yuan:,.2f}")
+    if status:
+        status(f"\u672a\u4eab\u4f18\u60e0\u5408\u8ba1 {fen_to_yuan(roll.total_fen):,.2f} \u2014 \u5171 {roll.rows:,} \u6237\uff0c"
+               f"\u9519\u8bef {roll.errors:,} \u884c\uff0c\u7528\u65f6 {time.perf_counter() - started:.1f} \u79d2")
+    return EXIT_DATA_ERROR if roll.errors else EXIT_OK
+
+
+def _case(sr, diffs, version):
+    benefits = {}
+    if diffs is not None:
+        benefits = {item: [str(sr.record.get(should_key(item)) or ""),
+                           str(sr.record.get(enjoyed_key(item)) or ""), f"{diffs[item]:,.2f}"]
+                    for item in TAX_ITEMS}
+    return Case(sr.credit_code, company=sr.record.get(COMPANY_NAME_KEY, ""), record=sr.record,
+                benefits=benefits, issues=sr.issues, ruleset=version)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "screen":
+            return run_screen(args)
+        if args.command == "vat":
+            return run_vat(args)
+        if args.command == "join":
+            return run_join(args)
+        if args.command == "fetch":
+            return run_fetch(args)
+        if args.command == "benefits":
+            return run_benefits(args)
+        if args.command == "codes":
+            return run_codes(args)
+        if args.command == "peers":
+            return run_peers(args)
+        if args.command == "sweep":
+            return run_sweep(args)
+    except (OSError, ValueError, sqlite3.Error) as ex:
+        print(f"\u9519\u8bef\uff1a{ex}", file=sys.stderr)
+        return EXIT_FAILURE
+    except KeyboardInterrupt:
+        return EXIT_FAILURE
+    return EXIT_USAGE
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
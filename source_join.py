@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""Join the per-system extracts into complete A-R records by \u793e\u4f1a\u4fe1\u7528\u4ee3\u7801.
+
+Per ``FIELD_SOURCE_MAP`` the fields come from five exports: the \u4f01\u4e1a\u6240\u5f97\u7a0e
+annual return (C, E-I, K), VAT returns (D, O-R; e.g. ``vat --export``), ITS
+payroll (J), stamp-duty details (N) and the invoice analysis (L, M). Each
+source contributes only its own fields; \u4f01\u4e1a\u540d\u79f0, A, B and the \u5e94\u4eab/\u5df2\u4eab
+columns are taken from the first source, in ``SOURCES`` order, that has them.
+
+Credit codes are compared after ``credit_code.normalize`` (trimmed, upper
+case), so one enterprise typed differently in two systems still joins.
+
+The join is an external sort-merge: every extract is read in runs of
+``run_rows`` rows, each run is sorted by credit code and spilled to a temp
+file, and the runs are merged with ``heapq.merge`` (in several passes when
+there are more than ``MAX_FAN_IN``). Memory holds one run while reading and
+one block per run while merging, however large the extracts are.
+"""
+import csv
+import heapq
+import os
+import pickle
+import shutil
+import tempfile
+from collections import Counter, namedtuple
+
+from rule_engine import FIELD_KEYS
+from credit_code import is_valid, normalize as normalize_code, validate as validate_code
+from batch_import import COMPANY_NAME_KEY, CREDIT_CODE_KEY, iter_rows, map_header, _cell_text
+
+# Source name -> the A-R fields it owns (by letter), in FIELD_SOURCE_MAP terms
+SOURCES = {
+    "cit":     "CEFGHIK",
+    "vat":     "DOPQR",
+    "its":     "J",
+    "stamp":   "N",
+    "invoice": "LM",
+}
+SOURCE_TITLES = {
+    "cit": "\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7533\u62a5",
+    "vat": "\u589e\u503c\u7a0e\u7533\u62a5",
+    "its": "\u4e2a\u7a0e\u6263\u7f34",
+    "stamp": "\u5370\u82b1\u7a0e\u7533\u62a5",
+    "invoice": "\u53d1\u7968\u7968\u79cd\u5206\u6790",
+}
+
+RUN_ROWS = 200_000
+MAX_FAN_IN = 64
+_BLOCK = 2000
+
+_BY_LETTER = {key.split("_", 1)[0]: key for key in FIELD_KEYS}
+_OWNED = {key for letters in SOURCES.values() for key in map(_BY_LETTER.get, letters)}
+
+JoinedRecord = namedtuple("JoinedRecord", "credit_code record missing")
+JoinStats = namedtuple("JoinStats", "rows joined complete missing duplicates invalid")
+
+
+def source_keys(source, header_keys):
+    """The record keys ``source`` may contribute, given its mapped header."""
+    own = {_BY_LETTER[c] for c in SOURCES[source]}
+    return [k for k in header_keys
+            if k is not None and k != CREDIT_CODE_KEY and (k in own or k not in _OWNED)]
+
+
+class SourceJoin:
+    """Sort-merge join over any subset of ``SOURCES``.
+
+    ``add(source, path)`` registers an extract; ``records()`` then spills the
+    sorted runs and yields one ``JoinedRecord`` per credit code in code order.
+    Several files may be added for one source (e.g. one per district).
+    """
+
+    def __init__(self, run_rows=RUN_ROWS, tmpdir=None, sheet=None, encoding="utf-8-sig"):
+        self.run_rows = run_rows
+        self.tmpdir = tmpdir
+        self.sheet = sheet
+        self.encoding = encoding
+        self.inputs = []   # (source, path)
+        self.columns = [CREDIT_CODE_KEY, COMPANY_NAME_KEY] + list(FIELD_KEYS)
+        self.stats = None
+
+    def add(self, source, path):
+        if source not in SOURCES:
+            raise ValueError(f"\u672a\u77e5\u7684\u6570\u636e\u6765\u6e90\uff1a{source}")
+        self.inputs.append((source, path))
+
+    # --------------------------------------------------
+    def _spill(self, run, workdir, runs):
+        run.sort(key=_sort_key)
+        path = os.path.join(workdir, f"run{len(runs):05d}.bin")
+        with open(path, "wb") as fh:
+            for i in range(0, len(run), _BLOCK):
+                pickle.dump(run[i:i + _BLOCK], fh, pickle.HIGHEST_PROTOCOL)
+        runs.append(path)
+        run.clear()
+
+    def _read_sources(self, workdir):
+        """Spill every extract as sorted runs; return ``(runs, rows)``."""
+        order = {name: i for i, name in enumerate(SOURCES)}
+        runs, run, rows, seq = [], [], 0, 0
+        for source, path in self.inputs:
+            it = iter_rows(path, self.sheet, self.encoding)
+            header = next(it, None)
+            if header is None:
+                continue
+            keys = map_header(header)
+            if CREDIT_CODE_KEY not in keys:
+                raise ValueError(f"{path}\uff1a\u672a\u8bc6\u522b\u5230\u300c\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801\u300d\u5217")
+            wanted = set(source_keys(source, keys))
+            self.columns += [k for k in keys if k in wanted and k not in self.columns]
+            cols = [(i, k) for i, k in enumerate(keys) if k in wanted]
+            ci = keys.index(CREDIT_CODE_KEY)
+            for row in it:
+                code = normalize_code(_cell_text(row[ci])) if ci < len(row) else ""
+                if not code:
+                    continue
+                values = {k: _cell_text(row[i]) for i, k in cols if i < len(row)}
+                rows += 1
+                seq += 1
+                run.append((code, order[source], seq, values))
+                if len(run) >= self.run_rows:
+                    self._spill(run, workdir, runs)
+        if run:
+            self._spill(run, workdir, runs)
+        return runs, rows
+
+    def _merge_runs(self, runs, workdir):
+        # keep the number of open files bounded
+        while len(runs) > MAX_FAN_IN:
+            merged = []
+            for i in range(0, len(runs), MAX_FAN_IN):
+                group = runs[i:i + MAX_FAN_IN]
+                if len(group) == 1:
+                    merged.append(group[0])
+                    continue
+                path = os.path.join(workdir, f"merge{len(merged):05d}-{len(runs)}.bin")
+                with open(path, "wb") as fh:
+                    block = []
+                    for item in heapq.merge(*map(_read_run, group), key=_sort_key):
+                        block.append(item)
+                        if len(block) >= _BLOCK:
+                            pickle.dump(block, fh, pickle.HIGHEST_PROTOCOL)
+                            block = []
+                    if block:
+                        pickle.dump(block, fh, pickle.HIGHEST_PROTOCOL)
+                for p in group:
+                    os.remove(p)
+                merged.append(path)
+            runs = merged
+        return heapq.merge(*map(_read_run, runs), key=_sort_key)
+
+    def records(self):
+        """Yield ``JoinedRecord(credit_code, record, missing)`` in credit-code order.
+
+        ``missing`` lists the registered sources with no row for that code.
+        When a source has several rows for one code the last one read wins.
+        """
+        wanted = [(i, s) for i, s in enumerate(SOURCES) if any(src == s for src, _ in self.inputs)]
+        rows = joined = complete = duplicates = invalid = 0
+        missing_by = Counter()
+        workdir = tempfile.mkdtemp(prefix="taxapp-join-", dir=self.tmpdir)
+        try:
+            runs, rows = self._read_sources(workdir)
+            code = None
+            parts = {}
+            for item in self._merge_runs(runs, workdir):
+                if item[0] != code:
+                    if code is not None:
+                        jr = _combine(code, parts, wanted)
+                        joined += 1
+                        complete += not jr.missing
+                        missing_by.update(jr.missing)
+                        invalid += not is_valid(code)
+                        yield jr
+                    code = item[0]
+                    parts = {}
+                if item[1] in parts:
+                    duplicates += 1
+                parts[item[1]] = item[3]
+            if code is not None:
+                jr = _combine(code, parts, wanted)
+                joined += 1
+                complete += not jr.missing
+                missing_by.update(jr.missing)
+                invalid += not is_valid(code)
+                yield jr
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+            self.stats = JoinStats(rows, joined, complete, dict(missing_by), duplicates, invalid)
+
+    def summary(self):
+        st = self.stats
+        if st is None:
+            return ""
+        text = (f"\u5408\u5e76 {st.rows:,} \u884c\u4e3a {st.joined:,} \u6237\uff0c\u6570\u636e\u9f50\u5168 {st.complete:,} \u6237"
+                f"\uff0c\u91cd\u590d\u884c {st.duplicates:,}\uff0c\u4fe1\u7528\u4ee3\u7801\u65e0\u6548 {st.invalid:,} \u6237")
+        for source in SOURCES:
+            n = st.missing.get(source)
+            if n:
+                text += f"\uff1b\u7f3a{SOURCE_TITLES[source]} {n:,} \u6237"
+        return text
+
+
+def _sort_key(item):
+    return item[0], item[1], item[2]
+
+
+def _read_run(path):
+    with open(path, "rb") as fh:
+        while True:
+            try:
+                block = pickle.load(fh)
+            except EOFError:
+                return
+            yield from block
+
+
+def _combine(code, parts, wanted):
+    record = {CREDIT_CODE_KEY: code}
+    # parts are keyed by source index, so iteration follows SOURCES order
+    for idx in sorted(parts):
+        for k, v in parts[idx].items():
+            if v and not record.get(k):
+                record[k] = v
+    missing = tuple(s for i, s in wanted if i not in parts)
+    return JoinedRecord(code, record, missing)
+
+
+def write_joined(join, output, missing_report=None, encoding="utf-8-sig"):
+    """Run ``join`` into ``output`` (a CSV ``screen --input`` reads) and list the
+    codes with a missing side in ``missing_report``; return the row count."""
+    n = 0
+    mfh = mw = None
+    with open(output, "w", newline="", encoding=encoding) as fh:
+        w = csv.writer(fh)
+        if missing_report:
+            mfh = open(missing_report, "w", newline="", encoding=encoding)
+            mw = csv.writer(mfh)
+            mw.writerow([CREDIT_CODE_KEY, COMPANY_NAME_KEY, "\u7f3a\u5931\u6765\u6e90"])
+        try:
+            for jr in join.records():
+                if n == 0:
+                    # the headers are all known once the first code comes out
+                    head = join.columns
+                    w.writerow(head)
+                rec = jr.record
+                w.writerow([rec.get(k, "") for k in head])
+                if mw is not None:
+                    problems = [SOURCE_TITLES[s] for s in jr.missing]
+                    err = validate_code(jr.credit_code)
+                    if err:
+                        problems.append(err)
+                    if problems:
+                        mw.writerow([jr.credit_code, rec.get(COMPANY_NAME_KEY, ""), "\u3001".join(problems)])
+                n += 1
+        finally:
+            if mfh is not None:
+                mfh.close()
+        if n == 0:
+            w.writerow(join.columns)
+    return n
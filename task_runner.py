@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""Run long jobs off the Tk main thread.
+
+``TaskRunner.submit(fn, ...)`` calls ``fn(job)`` on a worker thread. The job
+reports with ``job.progress(done, total)`` and polls ``job.check()``, which
+raises ``Cancelled`` once ``TaskRunner.cancel()`` was called. Nothing on the
+worker touches Tk: progress, the result and any exception go through a queue
+that the main loop drains with ``root.after`` every ``POLL_MS``, and the
+callbacks run there. Progress is coalesced on the worker to one message per
+``PROGRESS_EVERY`` seconds, so a million-row run cannot flood the loop.
+
+CPU-bound work should hand its heavy part to processes (``batch_parallel``)
+and keep the thread for I/O and bookkeeping; a pure-Python loop on the thread
+still shares the interpreter lock with the window.
+"""
+import queue
+import threading
+import time
+
+POLL_MS = 40
+PROGRESS_EVERY = 0.1
+
+
+class Cancelled(Exception):
+    """Raised inside a job by ``Job.check`` after a cancel request."""
+
+
+class Job:
+    def __init__(self, outbox):
+        self._outbox = outbox
+        self._cancel = threading.Event()
+        self._last = 0.0
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    def progress(self, done, total=None, text=None, force=False):
+        now = time.monotonic()
+        if force or now - self._last >= PROGRESS_EVERY:
+            self._last = now
+            self._outbox.put(("progress", (done, total, text)))
+
+
+class TaskRunner:
+    """One background job at a time, reporting to the Tk loop of ``root``."""
+
+    def __init__(self, root):
+        self.root = root
+        self._queue = queue.Queue()
+        self._job = None
+        self._thread = None
+        self._handlers = None
+        self._poll_id = None
+
+    @property
+    def busy(self):
+        return self._job is not None
+
+    def submit(self, fn, on_done=None, on_error=None, on_progress=None, on_cancel=None):
+        """Start ``fn(job)``; its return value goes to ``on_done``.
+
+        ``on_error(exc)`` gets any other exception, ``on_cancel()`` runs when
+        the job stopped on ``Cancelled``, ``on_progress(done, total, text)``
+        runs for every progress message. Raises RuntimeError while busy.
+        """
+        if self.busy:
+            raise RuntimeError("\u5df2\u6709\u4efb\u52a1\u5728\u8fd0\u884c")
+        self._queue = queue.Queue()
+        job = self._job = Job(self._queue)
+        self._handlers = (on_done, on_error, on_progress, on_cancel)
+        self._thread = threading.Thread(target=self._run, args=(fn, job, self._queue),
+                                        name="taxapp-task", daemon=True)
+        self._thread.start()
+        self._poll_id = self.root.after(POLL_MS, self._poll)
+        return job
+
+    def cancel(self):
+        if self._job is not None:
+            self._job._cancel.set()
+
+    def shutdown(self, timeout=5.0):
+        """Cancel the running job and wait up to ``timeout`` for it to stop."""
+        self.cancel()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+
+    @staticmethod
+    def _run(fn, job, outbox):
+        try:
+            result = fn(job)
+        except Cancelled:
+            outbox.put(("cancelled", None))
+        except BaseException as ex:
+            outbox.put(("error", ex))
+        else:
+            outbox.put(("done", result))
+
+    def _poll(self):
+        self._poll_id = None
+        on_done, on_error, on_progress, on_cancel = self._handlers
+        latest = None
+        final = None
+        try:
+            while True:
+                kind, payload = self._queue.get_nowait()
+                if kind == "progress":
+                    latest = payload
+                else:
+                    final = (kind, payload)
+        except queue.Empty:
+            pass
+        if latest is not None and on_progress is not None:
+            on_progress(*latest)
+        if final is None:
+            self._poll_id = self.root.after(POLL_MS, self._poll)
+            return
+        self._job = self._thread = None
+        kind, payload = final
+        if kind == "done" and on_done is not None:
+            on_done(payload)
+        elif kind == "error" and on_error is not None:
+            on_error(payload)
+        elif kind == "cancelled" and on_cancel is not None:
+            on_cancel()
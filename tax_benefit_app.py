@@ -1,10 +1,40 @@
 # -*- coding: utf-8 -*-
+import sys
+
+# Headless batch mode: dispatch before tkinter is ever imported.
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1 and sys.argv[1] in ("screen", "vat", "join", "fetch", "benefits", "codes", "peers", "sweep", "-h", "--help"):
+        from screen_cli import main as _cli_main
+        sys.exit(_cli_main(sys.argv[1:]))
+
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
+import os
 import re
-import sys
-from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+import sqlite3
+from decimal import Decimal, InvalidOperation
 import datetime
+from collections import Counter
+
+from rule_engine import (
+    FIELD_SOURCE_MAP, FIELD_KEYS, INDUSTRY_CHOICES, INDUSTRY_KEY, PERIOD_KEY, parse_dec,
+)
+from rule_table import active_ruleset, guide_lines
+from live_rules import LiveEvaluator
+from case_store import Case, CaseStore
+from column_cache import open_columns
+from credit_code import normalize as normalize_credit_code, validate as validate_credit_code
+from benefits import TAX_ITEMS, should_key, enjoyed_key, calculate_benefits as compute_benefits
+from metrics import METRICS
+from peer_stats import METRIC_TITLES, PeerIndex
+from risk_score import RiskQueue, issue_text, queue_rows, write_queue
+from threshold_sweep import GROUPS as SWEEP_GROUPS, SWEEPS, ThresholdSweep
+from batch_import import CHUNK_SIZE, estimate_rows, iter_chunks
+from batch_parallel import default_workers, progress_text, screen_parallel
+from results_sink import ResultsSink
+from task_runner import TaskRunner
 
 # ====================== Design System ======================
 # Palette: Official Chinese Government Authority
@@ -72,135 +102,24 @@ F = {
     "tag":      (_CH, 9, "bold"),
 }
 
-# ====================== Data ======================
-ISSUE_GUIDE_MAP = {
-    "\u540c\u671f\u7533\u62a5\u7684\u589e\u503c\u7a0e\u6536\u5165\u4e0e\u4f01\u4e1a\u6240\u5f97\u7a0e\u6536\u5165\u6709\u5dee\u5f02": [
-        "1. \u662f\u5426\u7531\u4e8e\u4e24\u7a0e\u786e\u8ba4\u6536\u5165\u65f6\u95f4\u4e0d\u4e00\u81f4\u3002",
-        "2. \u662f\u5426\u7531\u4e8e\u4e24\u7a0e\u786e\u8ba4\u6536\u5165\u53e3\u5f84\u4e0d\u4e00\u81f4\u5bfc\u81f4\u3002",
-        "3. \u7ed3\u5408\u5408\u540c\u7b7e\u8ba2\u60c5\u51b5\u3001\u9879\u76ee\u8fdb\u5ea6\u3001\u9280\u884c\u6d41\u6c34\u65f6\u95f4\u8fdb\u884c\u7efc\u5408\u5224\u65ad\u3002",
-    ],
-    "\u5de5\u5546\u4e1a\u7eb3\u7a0e\u4eba\u6210\u672c\u8d39\u7528\u5360\u6bd4\u5f02\u5e38": [
-        "1. \u68c0\u67e5\u4ee3\u53d1\u4eba\u5458\u5de5\u8d44\u662f\u5426\u771f\u5b9e\u5230\u8d26\uff08\u9280\u884c\u6d41\u6c34\uff09\u3002",
-        "2. \u5b9e\u5730\u6838\u67e5\u5e93\u5b58\uff0c\u56fa\u5b9a\u8d44\u4ea7\u8fdb\u884c\u81ea\u67e5\u6e05\u70b9\u3002",
-        "3. \u6838\u67e5\u8fd0\u8f93\u53d1\u7968\u3001\u51fa\u8d27\u6e05\u5355\u7b49\u8f85\u52a9\u6750\u6599\u3002",
-    ],
-    "\u8d39\u7528\u504f\u9ad8": [
-        "1. \u6838\u5b9e\u8d39\u7528\u662f\u5426\u771f\u5b9e\u53d1\u751f\u3002",
-        "2. \u68c0\u67e5\u8d39\u7528\u5bf9\u5e94\u7684\u5408\u540c\u3001\u53d1\u7968\u53ca\u9280\u884c\u6d41\u6c34\u3002",
-        "3. \u5224\u65ad\u662f\u5426\u5b58\u5728\u4e2a\u4eba\u6d88\u8d39\u6216\u865a\u5217\u8d39\u7528\u60c5\u5f62\u3002",
-    ],
-    "\u6210\u672c\u504f\u9ad8": [
-        "1. \u6838\u5b9e\u6210\u672c\u662f\u5426\u771f\u5b9e\u53d1\u751f\u3002",
-        "2. \u6838\u67e5\u5e93\u5b58\u3001\u51fa\u5165\u5e93\u8bb0\u5f55\u53ca\u5bf9\u5e94\u53d1\u7968\u3002",
-        "3. \u5224\u65ad\u662f\u5426\u5b58\u5728\u865a\u5217\u6210\u672c\u60c5\u5f62\u3002",
-    ],
-    "\u670d\u52a1\u4e1a\u7eb3\u7a0e\u4eba\u6210\u672c\u8d39\u7528\u5360\u6bd4\u5f02\u5e38": [
-        "1. \u68c0\u67e5\u4eba\u5de5\u6210\u672c\u662f\u5426\u771f\u5b9e\uff08\u9280\u884c\u6d41\u6c34\uff09\u3002",
-        "2. \u6838\u67e5\u5916\u5305\u5408\u540c\u53ca\u5bf9\u5e94\u53d1\u7968\u3002",
-        "3. \u4e0e\u540c\u884c\u4e1a\u5e73\u5747\u6c34\u5e73\u5bf9\u6bd4\u5206\u6790\u3002",
-    ],
-    "\u7591\u4f3c\u672a\u53d6\u5f97\u5408\u6cd5\u6709\u6548\u51ed\u8bc1\u5217\u652f": [
-        "1. \u662f\u5426\u5c5e\u4e8e\u4ee5\u4e0b\u516b\u7c7b\u53ef\u7a0e\u524d\u6263\u9664\u60c5\u5f62\uff1a",
-        "   \u2022 \u5883\u5916\u8d39\u7528\u5f62\u5f0f\u53d1\u7968",
-        "   \u2022 \u5dee\u65c5\u5305\u5e72\u5185\u90e8\u51ed\u8bc1",
-        "   \u2022 \u653f\u5e9c\u6536\u8d39\u8d22\u653f\u7968\u636e",
-        "   \u2022 \u653f\u5e9c\u5e94\u7a0e\u6536\u6b3e\u51ed\u8bc1",
-        "   \u2022 \u6c34\u7535\u8d39\u5206\u5272\u6263\u9664",
-        "   \u2022 \u4e0a\u5e74\u5e93\u5b58\u672c\u5e74\u7ed3\u8f6c",
-        "   \u2022 \u6682\u4f30\u5165\u5e93\u8de8\u671f\u7968\u636e",
-        "2. \u9664\u4e0a\u8ff0\u60c5\u5f62\u5916\uff0c\u76f8\u5173\u652f\u51fa\u4e0d\u5f97\u7a0e\u524d\u6263\u9664\u3002",
-        "3. \u901a\u8fc7\u9280\u884c\u6d41\u6c34\u3001\u5408\u540c\u3001\u7269\u6d41\u8d44\u6599\u8fdb\u884c\u4ea4\u53c9\u6838\u5b9e\u3002",
-    ],
-    "\u7591\u4f3c\u591a\u5217\u5de5\u8d44\u85aa\u91d1\u652f\u51fa\u6216\u5c11\u6263\u7f34\u4e2a\u4eba\u6240\u5f97\u7a0e": [
-        "1. \u662f\u5426\u5b58\u5728\u591a\u5217\u5de5\u8d44\u652f\u51fa\u3001\u5c11\u7f34\u4e2a\u4eba\u6240\u5f97\u7a0e\u60c5\u5f62\u3002",
-        "2. \u8981\u6c42\u63d0\u4f9b\u52b3\u52a8\u5408\u540c\u3001\u5de5\u8d44\u652f\u4ed8\u8bb0\u5f55\u3002",
-        "3. \u6838\u5bf9\u5458\u5de5\u82b1\u540d\u518c\uff0c\u5e76\u8fdb\u884c\u4eba\u5458\u8bbf\u8c08\u3002",
-    ],
-    "\u8fdb\u4e00\u6b65\u6838\u5b9e\u7eb3\u7a0e\u4eba\u662f\u5426\u5c11\u8ba1\u5370\u82b1\u7a0e\u8ba1\u7a0e\u4f9d\u636e": [
-        "1. \u5411\u4e0a\u6e38\u5355\u4f4d\u53d1\u51fd\uff0c\u5f00\u5c55\u5f02\u5730\u534f\u67e5\u3002",
-        "2. \u67e5\u9605\u5408\u540c\u3001\u53d1\u7968\u53ca\u9280\u884c\u6d41\u6c34\uff0c\u7ea6\u8c08\u4f01\u4e1a\u8fdb\u884c\u6838\u5b9e\u3002",
-    ],
-    "\u7591\u4f3c\u5c11\u8f6c\u51fa\u7528\u4e8e\u7b80\u6613\u8ba1\u7a0e\u7684\u8fdb\u9879\u7a0e\u989d": [
-        "1. \u67e5\u627e\u6297\u6263\u8fdb\u9879\u53d1\u7968\uff0c\u662f\u5426\u5b58\u5728\u201c\u623f\u5c4b\u51fa\u51fa\u79df\u201d\u201c\u7269\u4e1a\u670d\u52a1\u201d\u7b49\u540c\u65f6\u7528\u4e8e\u5e94\u7a0e/\u514d\u7a0e\u9879\u76ee\u3002",
-        "2. \u6838\u67e5\u662f\u5426\u5b58\u5728\u514d\u7a0e\u8d27\u7269\u9500\u552e\u4f46\u672a\u8f6c\u51fa\u8fdb\u9879\u7a0e\u989d\u60c5\u5f62\u3002",
-    ],
-}
 
-FIELD_SOURCE_MAP = {
-    "A_\u4e3b\u8425\u884c\u4e1a": {
-        "title": "\u4e3b\u8425\u884c\u4e1a",
-        "source": "\u91d1\u7a0e\u4e09\u671f\u7cfb\u7edf \u2014 \u7a0e\u52a1\u767b\u8bb0\u4fe1\u606f\u67e5\u8be2\u6a21\u5757\u4e0b\u300c\u884c\u4e1a\u300d\u67e5\u8be2\u7ed3\u679c\u9009\u62e9\u3002",
-    },
-    "B_\u671f\u95f4": {
-        "title": "\u671f\u95f4",
-        "source": "\u4e0d\u5c11\u4e8e\u4e00\u4e2a\u7eb3\u7a0e\u671f\uff0c\u5efa\u8bae\u5f55\u5165\u5b8c\u6574\u5e74\u5ea6\u3002",
-    },
-    "C_\u8425\u4e1a\u6536\u5165": {
-        "title": "\u8425\u4e1a\u6536\u5165",
-        "source": "\u300a\u4e2d\u534e\u4eba\u6c11\u5171\u548c\u56fd\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u8868\u300b\u300c\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u4e3b\u8868\u300d\u7b2c 1 \u680f\u300c\u4e00\u3001\u8425\u4e1a\u6536\u5165\u300d\u3002",
-    },
-    "D_\u9500\u552e\u6536\u5165": {
-        "title": "\u9500\u552e\u6536\u5165",
-        "source": "\u5404\u6708\u300a\u589e\u503c\u7a0e\u53ca\u9644\u52a0\u7a0e\u8d39\u7533\u62a5\u8868\uff08\u4e00\u822c\u7eb3\u7a0e\u4eba\u9002\u7528\uff09\u300b\u7b2c 1\u30015\u30017\u30018 \u680f\u4e4b\u548c\u3002\u540c\u4e00\u5e74\u5ea6\u8fde\u7eed\u5404\u6708\u53ef\u53c2\u8003\u6700\u540e\u4e00\u671f\u7d2f\u8ba1\u6570\u636e\u3002",
-    },
-    "E_\u6210\u672c": {
-        "title": "\u6210\u672c",
-        "source": "\u300a\u4e2d\u534e\u4eba\u6c11\u5171\u548c\u56fd\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u8868\u300b\u300c\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u4e3b\u8868\u300d\u7b2c 2 \u680f\u300c\u51cf\uff1a\u8425\u4e1a\u6210\u672c\u300d\u3002",
-    },
-    "F_\u9500\u552e\u8d39\u7528": {
-        "title": "\u9500\u552e\u8d39\u7528",
-        "source": "\u300a\u4e2d\u534e\u4eba\u6c11\u5171\u548c\u56fd\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u8868\u300b\u300c\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u4e3b\u8868\u300d\u7b2c 4 \u680f\u300c\u51cf\uff1a\u9500\u552e\u8d39\u7528\u300d\u3002",
-    },
-    "G_\u7ba1\u7406\u8d39\u7528": {
-        "title": "\u7ba1\u7406\u8d39\u7528",
-        "source": "\u300a\u4e2d\u534e\u4eba\u6c11\u5171\u548c\u56fd\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u8868\u300b\u300c\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u4e3b\u8868\u300d\u7b2c 5 \u680f\u300c\u51cf\uff1a\u7ba1\u7406\u8d39\u7528\u300d\u3002",
-    },
-    "H_\u8d22\u52a1\u8d39\u7528": {
-        "title": "\u8d22\u52a1\u8d39\u7528",
-        "source": "\u300a\u4e2d\u534e\u4eba\u6c11\u5171\u548c\u56fd\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u8868\u300b\u300c\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u4e3b\u8868\u300d\u7b2c 5 \u680f\u300c\u51cf\uff1a\u8d22\u52a1\u8d39\u7528\u300d\u3002",
-    },
-    "I_\u5de5\u8d44\u85aa\u91d1": {
-        "title": "\u5de5\u8d44\u85aa\u91d1",
-        "source": "\u300a\u4e2d\u534e\u4eba\u6c11\u5171\u548c\u56fd\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u8868\u300b A105050 \u804c\u5de5\u85aa\u916c\u652f\u51fa\u53ca\u7eb3\u7a0e\u8c03\u6574\u660e\u7ec6\u8868\u7b2c 1 \u680f\u300c\u4e00\u3001\u5de5\u8d44\u85aa\u91d1\u652f\u51fa\u2014\u5b9e\u9645\u53d1\u751f\u989d\u300d\u3002",
-    },
-    "J_\u4e2a\u7a0e\u6263\u7f34\u5de5\u8d44\u603b\u989d": {
-        "title": "\u4e2a\u7a0e\u6263\u7f34\u5de5\u8d44\u603b\u989d",
-        "source": "\u81ea\u7136\u4eba\u7535\u5b50\u7a0e\u52a1\u5c40 \u2014 \u6263\u7f34\u7533\u62a5\u5206\u6237\u6e05\u518c\u67e5\u8be2\uff08ITS\uff09\uff0c\u8f93\u5165\u7a0e\u53f7\uff0c\u67e5\u8be2\u4e2a\u4eba\u6240\u5f97\u7a0e\u4ee3\u6263\u4ee3\u7f34\u5de5\u8d44\u603b\u989d\u3002",
-    },
-    "K_\u8ba1\u63d0\u6298\u65f7": {
-        "title": "\u8ba1\u63d0\u6298\u65f7",
-        "source": "\u300a\u4e2d\u534e\u4eba\u6c11\u5171\u548c\u56fd\u4f01\u4e1a\u6240\u5f97\u7a0e\u5e74\u5ea6\u7eb3\u7a0e\u7533\u62a5\u8868\u300b A105080 \u8d44\u4ea7\u6298\u65f7\u3001\u6478\u9500\u53ca\u7eb3\u7a0e\u8c03\u6574\u660e\u7ec6\u8868\u7b2c 30 \u680f\u300c\u672c\u5e74\u6298\u65f7\u3001\u6478\u9500\u989d\u2014\u5408\u8ba1\u300d\u3002",
-    },
-    "L_\u5f53\u671f\u5f00\u7968\u989d\u5ea6": {
-        "title": "\u5f53\u671f\u5f00\u7968\u989d\u5ea6",
-        "source": "\u91d1\u7a0e\u4e09\u671f\u7cfb\u7edf \u2014 \u98ce\u9669\u7ba1\u7406\u7cfb\u7edf\u9996\u9875 \u2014 \u7eb3\u7a0e\u4eba\u53d1\u7968\u7968\u79cd\u5206\u6790\u3002",
-    },
-    "M_\u5f53\u671f\u53d7\u7968\u989d\u5ea6": {
-        "title": "\u5f53\u671f\u53d7\u7968\u989d\u5ea6",
-        "source": "\u91d1\u7a0e\u4e09\u671f\u7cfb\u7edf \u2014 \u98ce\u9669\u7ba1\u7406\u7cfb\u7edf\u9996\u9875 \u2014 \u7eb3\u7a0e\u4eba\u53d1\u7968\u7968\u79cd\u5206\u6790\u3002",
-    },
-    "N_\u5370\u82b1\u7a0e\u8ba1\u7a0e\u4f9d\u636e": {
-        "title": "\u5370\u82b1\u7a0e\u8ba1\u7a0e\u4f9d\u636e",
-        "source": "\u91d1\u7a0e\u4e09\u671f\u7cfb\u7edf \u2014 \u7533\u62a5\u660e\u7ec6\u67e5\u8be2\uff0c\u9009\u62e9\u5bf9\u5e94\u5c5e\u671f\u3001\u5f55\u5165\u7eb3\u7a0e\u4eba\u8bc6\u522b\u53f7\uff0c\u300c\u5f81\u6536\u9879\u76ee\u300d\u9009\u62e9\u300c\u5370\u82b1\u7a0e\u300d\uff0c\u67e5\u8be2\u7ed3\u679c\u4e2d\u7684\u300c\u8ba1\u7a0e\u4f9d\u636e\u300d\u5408\u8ba1\u3002",
-    },
-    "O_\u7b80\u6613\u8ba1\u7a0e\u9500\u552e\u989d": {
-        "title": "\u7b80\u6613\u8ba1\u7a0e\u9500\u552e\u989d",
-        "source": "\u5404\u6708\u300a\u589e\u503c\u7a0e\u53ca\u9644\u52a0\u7a0e\u8d39\u7533\u62a5\u8868\uff08\u4e00\u822c\u7eb3\u7a0e\u4eba\u9002\u7528\uff09\u300b\u7b2c 5 \u680f\u300c\u6309\u7b80\u6613\u5f81\u6536\u529e\u6cd5\u8ba1\u7a0e\u9500\u552e\u989d\u300d\u4e4b\u548c\u3002",
-    },
-    "P_\u514d\u7a0e\u9500\u552e\u989d": {
-        "title": "\u514d\u7a0e\u9500\u552e\u989d",
-        "source": "\u5404\u6708\u300a\u589e\u503c\u7a0e\u53ca\u9644\u52a0\u7a0e\u8d39\u7533\u62a5\u8868\uff08\u4e00\u822c\u7eb3\u7a0e\u4eba\u9002\u7528\uff09\u300b\u7b2c 8 \u680f\u300c\u514d\u7a0e\u9500\u552e\u989d\u300d\u4e4b\u548c\u3002",
-    },
-    "Q_\u8fdb\u9879\u7a0e\u989d": {
-        "title": "\u8fdb\u9879\u7a0e\u989d",
-        "source": "\u5404\u6708\u300a\u589e\u503c\u7a0e\u53ca\u9644\u52a0\u7a0e\u8d39\u7533\u62a5\u8868\uff08\u4e00\u822c\u7eb3\u7a0e\u4eba\u9002\u7528\uff09\u300b\u7b2c 12 \u680f\u300c\u8fdb\u9879\u7a0e\u989d\u300d\u4e4b\u548c\u3002",
-    },
-    "R_\u8fdb\u9879\u7a0e\u989d\u8f6c\u51fa": {
-        "title": "\u8fdb\u9879\u7a0e\u989d\u8f6c\u51fa\u989d",
-        "source": "\u5404\u6708\u300a\u589e\u503c\u7a0e\u53ca\u9644\u52a0\u7a0e\u8d39\u7533\u62a5\u8868\uff08\u4e00\u822c\u7eb3\u7a0e\u4eba\u9002\u7528\uff09\u300b\u7b2c 13 \u680f\u300c\u8fdb\u9879\u7a0e\u989d\u8f6c\u51fa\u300d\u4e4b\u548c\u3002",
-    },
+# Pause after the last keystroke before the live risk badge is refreshed
+LIVE_DEBOUNCE_MS = 250
+
+# 阈值试算 curve colours: all industries, then one per SWEEP_GROUPS entry
+SWEEP_COLORS = ("#0a2463", "#c0392b", "#1a7a4a", "#b8860b", "#6c3483", "#117a8b", "#7f8c8d", "#aab4c8")
+
+# metrics phase -> 操作控制台 label
+PHASE_TITLES = {
+    "build":  "\u754c\u9762\u6784\u5efa",
+    "parse":  "\u5b57\u6bb5\u89e3\u6790",
+    "rules":  "\u89c4\u5219\u68c0\u67e5",
+    "render": "\u7ed3\u679c\u5c55\u793a",
+    "read":   "\u6587\u4ef6\u8bfb\u53d6",
+    "issues": "\u7591\u70b9\u6c47\u603b",
 }
 
+
 # ====================== UI Helpers ======================
 def _hex_to_rgb(h):
     h = h.lstrip("#")
@@ -251,7 +170,7 @@ def hdivider(parent, color=None, pady=0):
     return f
 
 def section_label(parent, text):
-    """Red left-bar section header — standard government form style"""
+    """Red left-bar section header \u2014 standard government form style"""
     row = tk.Frame(parent, bg=C["surface"])
     row.pack(fill=tk.X, pady=(14, 8))
     tk.Frame(row, bg=C["navy"], width=4).pack(side=tk.LEFT, fill=tk.Y)
@@ -273,6 +192,123 @@ def popup_base(root, title, w=680, h=460):
     tk.Frame(hdr, bg=C["gold"], width=3).pack(side=tk.LEFT, fill=tk.Y)
     return win, hdr
 
+
+class VirtualIssueList:
+    """Issue list that only builds widgets for the rows in view.
+
+    A fixed pool of row frames is ``place``d over the viewport and refilled
+    as the view scrolls pixel by pixel, so the widget count stays constant
+    however many issues are loaded. Items are ``(msg, severity)`` pairs from
+    the single-enterprise card; batch runs list their rows in Treeviews.
+    """
+    ROW_H = 56
+    GAP = 6
+
+    def __init__(self, parent, on_guide):
+        self.on_guide = on_guide
+        self.items = []
+        self.top = 0
+        self.rows = []
+        self.frame = tk.Frame(parent, bg=C["surface"])
+        self.sb = ttk.Scrollbar(self.frame, orient="vertical",
+                                command=self._on_scrollbar, style="Gov.Vertical.TScrollbar")
+        self.sb.pack(side=tk.RIGHT, fill=tk.Y)
+        self.view = tk.Frame(self.frame, bg=C["surface"])
+        self.view.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.view.bind("<Configure>", lambda e: self._fit_pool())
+        self._bind_wheel(self.view)
+
+    def _bind_wheel(self, w):
+        # "break" keeps the main window's bind_all wheel handler out of it
+        w.bind("<MouseWheel>", lambda e: self._wheel(-1 if e.delta > 0 else 1))
+        w.bind("<Button-4>", lambda e: self._wheel(-1))
+        w.bind("<Button-5>", lambda e: self._wheel(1))
+
+    def _wheel(self, direction):
+        self.scroll_to(self.top + direction * (self.ROW_H // 2))
+        return "break"
+
+    def _new_row(self):
+        row = tk.Frame(self.view, highlightbackground=C["border_dark"], highlightthickness=1)
+        row.bar = tk.Frame(row, width=5)
+        row.bar.pack(side=tk.LEFT, fill=tk.Y)
+        row.num = tk.Label(row, font=F["small_b"], fg="#fff", pady=10, padx=4)
+        row.num.pack(side=tk.LEFT)
+        row.tag = tk.Label(row, font=F["tag"], fg="#fff", padx=6, pady=3)
+        row.tag.pack(side=tk.LEFT, padx=(8, 4), pady=10)
+        row.msg = tk.Label(row, font=F["body_b"], fg=C["text"],
+                           wraplength=440, justify="left", anchor="w")
+        row.msg.pack(side=tk.LEFT, padx=8, pady=10, fill=tk.X, expand=True)
+        row.guide = mk_flat_btn(row, "\u5904\u7f6e\u6307\u5f15", C["btn_primary"],
+                                command=lambda r=row: self.on_guide(r.key),
+                                width=8, padx=10, pady=6)
+        row.idx = row.key = None
+        for w in (row, row.bar, row.num, row.tag, row.msg, row.guide):
+            self._bind_wheel(w)
+        return row
+
+    def _fit_pool(self):
+        need = self.view.winfo_height() // self.ROW_H + 2
+        while len(self.rows) < need:
+            self.rows.append(self._new_row())
+        self._redraw()
+
+    def _fill(self, row, idx):
+        msg, sev = self.items[idx]
+        if sev == "red":
+            bar_c, bg, fg, tag = C["danger"], C["danger_bg"], C["danger"], "\u9ad8\u98ce\u9669"
+        else:
+            bar_c, bg, fg, tag = C["warn"], C["warn_bg"], C["warn"], "\u9700\u6838\u5b9e"
+        row.config(bg=bg)
+        row.bar.config(bg=bar_c)
+        row.num.config(text=f" {idx+1:02d} ", bg=bar_c)
+        row.tag.config(text=f" {tag} ", bg=fg)
+        row.msg.config(text=msg, bg=bg)
+        if guide_lines(msg):
+            row.guide.pack(side=tk.RIGHT, padx=10, pady=8)
+        else:
+            row.guide.pack_forget()
+        row.idx, row.key = idx, msg
+
+    def _redraw(self):
+        n = len(self.items)
+        total = n * self.ROW_H
+        vh = max(1, self.view.winfo_height())
+        self.top = max(0, min(self.top, total - vh))
+        first, off = divmod(self.top, self.ROW_H)
+        for i, row in enumerate(self.rows):
+            idx = first + i
+            if idx >= n:
+                row.place_forget()
+                continue
+            if row.idx != idx:
+                self._fill(row, idx)
+            row.place(x=0, y=i * self.ROW_H - off + self.GAP // 2,
+                      relwidth=1.0, height=self.ROW_H - self.GAP)
+        if total:
+            self.sb.set(self.top / total, min(1.0, (self.top + vh) / total))
+        else:
+            self.sb.set(0.0, 1.0)
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(value) * len(self.items) * self.ROW_H))
+        elif unit == "pages":
+            self.scroll_to(self.top + int(value) * self.view.winfo_height())
+        else:
+            self.scroll_to(self.top + int(value) * (self.ROW_H // 2))
+
+    def scroll_to(self, top):
+        self.top = int(top)
+        self._redraw()
+
+    def set_items(self, items):
+        self.items = items
+        self.top = 0
+        for row in self.rows:
+            row.idx = None
+        self._redraw()
+
 # ====================== Main App ======================
 class TaxBenefitApp:
     def __init__(self, root):
@@ -284,19 +320,23 @@ class TaxBenefitApp:
 
         self._setup_styles()
 
-        self.tax_items = [
-            "\u5236\u9020\u4e1a\u7f13\u7a0e",
-            "\u4ea4\u901a\u8fd0\u8f93\u51cf\u514d",
-            "\u5c0f\u5fae\u4f01\u4e1a\u51cf\u514d",
-            "\u9ad8\u65b0\u6280\u672f\u4f01\u4e1a\u51cf\u514d",
-            "\u73af\u4fdd\u8bbe\u5907\u51cf\u514d",
-            "\u7814\u53d1\u8d39\u7528\u52a0\u8ba1\u6263\u9664",
-        ]
+        self.tax_items = list(TAX_ITEMS)
         self.entries = {}
         self.rule_inputs = {}
+        self._popups = {}        # kind -> (Toplevel, parts), built on first use
+        self._source_text = {}   # FIELD_SOURCE_MAP key -> rendered texts
+        self._guide_text = {}    # issue msg -> rendered guide texts
+        self._live = LiveEvaluator(active_ruleset())
+        self._live_job = None
+        self._store = None       # CaseStore, opened on first save/load
+        self._tasks = TaskRunner(root)
+        self._peers = None       # PeerIndex, loaded on first check; False if none saved
+        self._queue = None       # RiskQueue of the last batch run
+        self._sweep = None       # ThresholdSweep of the file loaded in 阈值试算
         self._status_var = tk.StringVar(value="\u5c31\u7eea  \u8bf7\u586b\u5199\u4f01\u4e1a\u4fe1\u606f\u5e76\u5f55\u5165\u68c0\u6d4b\u6570\u636e")
 
-        self._build()
+        with METRICS.phase("build"):
+            self._build()
 
         self.root.lift()
         self.root.attributes("-topmost", True)
@@ -330,6 +370,12 @@ class TaxBenefitApp:
         )
         s.map("Gov.Vertical.TScrollbar",
             background=[("active", C["navy_light"])])
+        s.configure("Gov.Horizontal.TProgressbar",
+            background=C["navy"],
+            troughcolor=C["surface2"],
+            bordercolor=C["border"],
+            thickness=10,
+        )
 
     # --------------------------------------------------
     def _build(self):
@@ -393,19 +439,24 @@ class TaxBenefitApp:
         hdivider(sb, color="#1e3a70", pady=0)
 
         menu_items = [
-            ("\u2022  \u4f01\u4e1a\u4fe1\u606f\u767b\u8bb0",  True),
-            ("\u2022  \u7591\u70b9\u89c4\u5219\u68c0\u67e5",   True),
-            ("\u2022  \u7a0e\u6536\u4f18\u60e0\u6838\u67e5",   True),
-            ("\u2022  \u64cd\u4f5c\u63a7\u5236\u53f0",         True),
+            ("\u2022  \u4f01\u4e1a\u4fe1\u606f\u767b\u8bb0",  True, None),
+            ("\u2022  \u7591\u70b9\u89c4\u5219\u68c0\u67e5",   True, None),
+            ("\u2022  \u7a0e\u6536\u4f18\u60e0\u6838\u67e5",   True, None),
+            ("\u2022  \u98ce\u9669\u6392\u5e8f\u961f\u5217",     True, self._show_queue),
+            ("\u2022  \u9608\u503c\u8bd5\u7b97",         True, self._show_sweep),
+            ("\u2022  \u64cd\u4f5c\u63a7\u5236\u53f0",         True, self._show_console),
         ]
-        for label, active in menu_items:
+        for label, active, command in menu_items:
             bg = "#0d2d6b" if active else C["navy"]
             fg = "#e8ecf4" if active else "#4a6898"
             f = tk.Frame(sb, bg=bg, cursor="hand2")
             f.pack(fill=tk.X)
-            tk.Label(f, text=label, font=F["body"],
-                     bg=bg, fg=fg,
-                     padx=16, pady=10, anchor="w").pack(fill=tk.X)
+            lbl = tk.Label(f, text=label, font=F["body"],
+                           bg=bg, fg=fg,
+                           padx=16, pady=10, anchor="w")
+            lbl.pack(fill=tk.X)
+            if command is not None:
+                lbl.bind("<Button-1>", lambda e, cmd=command: cmd())
             hdivider(f, color="#1e3a70")
 
         # Sidebar footer: legal note
@@ -506,8 +557,7 @@ class TaxBenefitApp:
 
         fields = [
             {"name":"\u4e3b\u8425\u884c\u4e1a (A)", "key":"A_\u4e3b\u8425\u884c\u4e1a", "type":"select",
-             "choices":["\u6279\u53d1\u96f6\u552e","\u5236\u9020","\u5efa\u7b51\u5b89\u88c5",
-                        "\u4ea4\u901a\u8fd0\u8f93","\u751f\u6d3b\u670d\u52a1","\u5176\u4ed6"]},
+             "choices":INDUSTRY_CHOICES},
             {"name":"\u671f\u95f4 (B)",                 "key":"B_\u671f\u95f4",              "type":"text"},
             {"name":"\u8425\u4e1a\u6536\u5165 (C)",     "key":"C_\u8425\u4e1a\u6536\u5165", "type":"number"},
             {"name":"\u9500\u552e\u6536\u5165 (D)",     "key":"D_\u9500\u552e\u6536\u5165", "type":"number"},
@@ -575,12 +625,14 @@ class TaxBenefitApp:
                                   font=F["body"], style="Gov.TCombobox")
                 cb.pack(side=tk.LEFT, ipady=3)
                 cb.set(f["choices"][0])
+                cb.bind("<<ComboboxSelected>>", lambda e, k=fkey: self._live_edit(k))
                 self.rule_inputs[fkey] = cb
             else:
                 e = mk_entry(inp_cell, width=17)
                 e.pack(side=tk.LEFT, ipady=4)
                 if f["type"] == "number":
                     e.bind("<KeyRelease>", self._num_hint)
+                    e.bind("<KeyRelease>", lambda ev, k=fkey: self._live_edit(k), add="+")
                 self.rule_inputs[fkey] = e
 
             # Source button
@@ -686,6 +738,9 @@ class TaxBenefitApp:
         btns = [
             ("\u67e5\u8be2\u4f18\u60e0",         C["btn_primary"],  self.calculate_benefits,  "\u8ba1\u7b97\u7a0e\u6536\u4f18\u60e0\u672a\u4eab\u91d1\u989d"),
             ("\u89c4\u5219\u68c0\u67e5",          C["btn_success"],  self.run_rule_checks,     "\u8fd0\u884c\u5168\u90e8\u7591\u70b9\u68c0\u6d4b\u89c4\u5219"),
+            ("\u6279\u91cf\u68c0\u67e5",          C["btn_success"],  self.run_batch,           "\u5bfc\u5165\u8868\u683c\uff0c\u540e\u53f0\u6279\u91cf\u68c0\u67e5"),
+            ("\u4fdd\u5b58\u6848\u4f8b",          C["btn_neutral"],  self.save_case,           "\u6309\u4fe1\u7528\u4ee3\u7801\u4e0e\u671f\u95f4\u5b58\u6863"),
+            ("\u8c03\u53d6\u6848\u4f8b",          C["btn_neutral"],  self.load_case,           "\u8c03\u53d6\u5df2\u5b58\u6863\u7684\u5386\u53f2\u6848\u4f8b"),
             ("\u6e05\u7a7a\u8868\u5355",          C["btn_warn"],     self.reset_form,          "\u6e05\u7a7a\u6240\u6709\u8f93\u5165\u5185\u5bb9"),
             ("\u9000\u51fa\u7cfb\u7edf",          C["btn_danger"],   self.exit_app,            "\u9000\u51fa\u5e94\u7528\u7a0b\u5e8f"),
         ]
@@ -706,6 +761,18 @@ class TaxBenefitApp:
         tk.Label(info, text="\u5185\u90e8\u5408\u89c4\u68c0\u6d4b\u5de5\u5177  \u4ec5\u4f9b\u5de5\u4f5c\u4eba\u5458\u4f7f\u7528",
                  font=F["small"], bg=C["surface"], fg=C["text_3"]).pack(anchor="e")
 
+        # Background task row, shown only while a batch job runs
+        self._task_row = tk.Frame(card, bg=C["surface"], padx=20)
+        self._task_label = tk.Label(self._task_row, font=F["small"], bg=C["surface"],
+                                    fg=C["text_2"], anchor="w", width=48)
+        self._task_label.pack(side=tk.LEFT)
+        self._task_cancel = mk_flat_btn(self._task_row, "\u53d6\u6d88", C["btn_danger"],
+                                        command=self._tasks.cancel, width=6, padx=8, pady=2)
+        self._task_cancel.pack(side=tk.RIGHT)
+        self._task_bar = ttk.Progressbar(self._task_row, style="Gov.Horizontal.TProgressbar",
+                                         orient="horizontal", mode="determinate")
+        self._task_bar.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=12)
+
     # --------------------------------------------------
     def _build_statusbar(self):
         bar = tk.Frame(self.root, bg=C["navy_dark"], height=28)
@@ -724,188 +791,559 @@ class TaxBenefitApp:
                  font=F["small_b"], bg=C["navy_dark"],
                  fg=C["ok"]).pack(side=tk.RIGHT, padx=16)
 
+        # Live risk badge, refreshed as the rules card is edited
+        self._risk_badge = tk.Label(bar, font=F["tag"], fg="#ffffff",
+                                    padx=8, cursor="hand2")
+        self._risk_badge.pack(side=tk.RIGHT, pady=4)
+        self._risk_badge.bind("<Button-1>", lambda e: self.run_rule_checks())
+        self._update_risk_badge()
+
     def _set_status(self, msg):
         self._status_var.set(f"\u25b6  {msg}")
 
+    def _update_risk_badge(self):
+        live = self._live
+        if live.errors:
+            self._risk_badge.config(text=" \u5b9e\u65f6 \u00b7 \u5f85\u4fee\u6b63\u683c\u5f0f ", bg=C["text_3"])
+            return
+        sev = Counter(s for _, s in live.issues())
+        if sev["red"]:
+            text, bg = f" \u5b9e\u65f6 \u00b7 \u9ad8\u98ce\u9669 {sev['red']}  \u9700\u6838\u5b9e {sev['yellow']} ", C["danger"]
+        elif sev["yellow"]:
+            text, bg = f" \u5b9e\u65f6 \u00b7 \u9700\u6838\u5b9e {sev['yellow']} ", C["warn"]
+        else:
+            text, bg = " \u5b9e\u65f6 \u00b7 \u672a\u53d1\u73b0\u7591\u70b9 ", C["ok"]
+        self._risk_badge.config(text=text, bg=bg)
+
     # ====================== Popups ======================
+    def _popup(self, kind, title, w, h):
+        """Return ``(win, parts, fresh)`` for popup ``kind``, shown and modal.
+
+        Each kind is built once through ``popup_base``; closing only
+        withdraws it, and the next call re-positions and deiconifies it.
+        ``fresh`` tells the caller to build the body into ``parts``.
+        """
+        cached = self._popups.get(kind)
+        if cached and cached[0].winfo_exists():
+            win, parts = cached
+            win.title(title)
+            win.geometry(f"{w}x{h}+{self.root.winfo_x()+60}+{self.root.winfo_y()+60}")
+            win.deiconify()
+            win.lift()
+            win.grab_set()
+            return win, parts, False
+        win, hdr = popup_base(self.root, title, w, h)
+        win.protocol("WM_DELETE_WINDOW", lambda: self._hide_popup(kind))
+        parts = {"hdr": hdr}
+        self._popups[kind] = (win, parts)
+        return win, parts, True
+
+    def _hide_popup(self, kind):
+        win, _ = self._popups[kind]
+        win.grab_release()
+        win.withdraw()
+        # Hand the grab back to a popup still on screen (results under guide)
+        for other, (w, _) in self._popups.items():
+            if other != kind and w.winfo_exists() and w.winfo_viewable():
+                w.grab_set()
+                break
+
     def _show_source(self, field_key):
         info = FIELD_SOURCE_MAP.get(field_key)
         if not info:
             return
-        win, hdr = popup_base(self.root, "\u6570\u636e\u6765\u6e90\u8bf4\u660e", 660, 280)
-
-        tk.Label(hdr, text=f"   \u6570\u636e\u6765\u6e90\u8bf4\u660e  \u2014  {info['title']}",
-                 font=F["h1"], bg=C["navy_dark"], fg="#ffffff",
-                 padx=12).pack(side=tk.LEFT)
-
-        body = tk.Frame(win, bg=C["surface"], padx=28, pady=20)
-        body.pack(fill=tk.BOTH, expand=True)
+        win, p, fresh = self._popup("source", "\u6570\u636e\u6765\u6e90\u8bf4\u660e", 660, 280)
+        if fresh:
+            p["head"] = tk.Label(p["hdr"], font=F["h1"], bg=C["navy_dark"],
+                                 fg="#ffffff", padx=12)
+            p["head"].pack(side=tk.LEFT)
+
+            body = tk.Frame(win, bg=C["surface"], padx=28, pady=20)
+            body.pack(fill=tk.BOTH, expand=True)
+
+            # Field label row
+            lbl_row = tk.Frame(body, bg=C["surface2"],
+                               highlightbackground=C["border"], highlightthickness=1)
+            lbl_row.pack(fill=tk.X, pady=(0, 12))
+            tk.Label(lbl_row, text="  \u5b57\u6bb5", font=F["small_b"],
+                     bg=C["surface2"], fg=C["text_3"], pady=5).pack(side=tk.LEFT)
+            p["title"] = tk.Label(lbl_row, font=F["body_b"],
+                                  bg=C["surface2"], fg=C["navy"], padx=8)
+            p["title"].pack(side=tk.LEFT)
+
+            # Source path
+            tk.Label(body, text="\u67e5\u8be2\u8def\u5f84 / \u6570\u636e\u6765\u6e90",
+                     font=F["small_b"], bg=C["surface"],
+                     fg=C["text_3"]).pack(anchor="w")
+            tk.Frame(body, bg=C["navy"], height=1).pack(fill=tk.X, pady=(2, 8))
+
+            p["source"] = tk.Label(body, font=F["body"], bg=C["surface"], fg=C["text"],
+                                   wraplength=580, justify="left", anchor="w")
+            p["source"].pack(anchor="w")
+
+            mk_flat_btn(win, "\u786e\u8ba4", C["btn_primary"],
+                        command=lambda: self._hide_popup("source"), width=8).pack(pady=14)
+
+        text = self._source_text.get(field_key)
+        if text is None:
+            text = self._source_text[field_key] = (
+                f"   \u6570\u636e\u6765\u6e90\u8bf4\u660e  \u2014  {info['title']}", info["title"], info["source"])
+        p["head"].config(text=text[0])
+        p["title"].config(text=text[1])
+        p["source"].config(text=text[2])
+
+    def _show_results(self, issues, peers=None):
+        win, p, fresh = self._popup("results", "\u89c4\u5219\u68c0\u67e5\u7ed3\u679c", 860, 560)
 
-        # Field label row
-        lbl_row = tk.Frame(body, bg=C["surface2"],
-                           highlightbackground=C["border"], highlightthickness=1)
-        lbl_row.pack(fill=tk.X, pady=(0, 12))
-        tk.Label(lbl_row, text="  \u5b57\u6bb5", font=F["small_b"],
-                 bg=C["surface2"], fg=C["text_3"], pady=5).pack(side=tk.LEFT)
-        tk.Label(lbl_row, text=info["title"], font=F["body_b"],
-                 bg=C["surface2"], fg=C["navy"], padx=8).pack(side=tk.LEFT)
-
-        # Source path
-        tk.Label(body, text="\u67e5\u8be2\u8def\u5f84 / \u6570\u636e\u6765\u6e90",
-                 font=F["small_b"], bg=C["surface"],
-                 fg=C["text_3"]).pack(anchor="w")
-        tk.Frame(body, bg=C["navy"], height=1).pack(fill=tk.X, pady=(2, 8))
-
-        tk.Label(body, text=info["source"],
-                 font=F["body"], bg=C["surface"], fg=C["text"],
-                 wraplength=580, justify="left", anchor="w").pack(anchor="w")
-
-        mk_flat_btn(win, "\u786e\u8ba4", C["btn_primary"],
-                    command=win.destroy, width=8).pack(pady=14)
+        count = len(issues)
+        by_sev = Counter(sev for _, sev in issues)
+        red_c, yel_c = by_sev["red"], by_sev["yellow"]
+
+        if fresh:
+            tk.Label(p["hdr"], text=f"   \u89c4\u5219\u68c0\u67e5\u7ed3\u679c\u62a5\u544a",
+                     font=F["h1"], bg=C["navy_dark"], fg="#ffffff", padx=12).pack(side=tk.LEFT)
+            # Summary badges on header right, refilled per run
+            p["badges"] = tk.Frame(p["hdr"], bg=C["navy_dark"])
+            p["badges"].pack(side=tk.RIGHT)
+
+            # Body
+            body = tk.Frame(win, bg=C["surface"])
+            body.pack(fill=tk.BOTH, expand=True)
+
+            # Summary strip
+            summ = tk.Frame(body, bg=C["surface2"],
+                            highlightbackground=C["border"], highlightthickness=1)
+            summ.pack(fill=tk.X, padx=20, pady=(14, 6))
+            p["summary"] = tk.Label(summ, font=F["small"], bg=C["surface2"], fg=C["text_2"],
+                                    pady=6, anchor="w")
+            p["summary"].pack(side=tk.LEFT)
+            p["peers"] = tk.Label(body, font=F["small"], bg=C["surface"], fg=C["text_2"],
+                                  anchor="w", justify=tk.LEFT)
 
-    def _show_results(self, issues):
-        win, hdr = popup_base(self.root, "\u89c4\u5219\u68c0\u67e5\u7ed3\u679c", 860, 560)
+            ok_frame = tk.Frame(body, bg=C["ok_bg"],
+                                highlightbackground=C["ok"], highlightthickness=1)
+            tk.Label(ok_frame,
+                     text="  \u2714  \u672a\u53d1\u73b0\u4efb\u4f55\u7591\u70b9\uff0c\u6240\u6709\u6307\u6807\u5747\u5728\u6b63\u5e38\u8303\u56f4\u5185\u3002",
+                     font=F["body_b"], bg=C["ok_bg"], fg=C["ok"],
+                     pady=14, anchor="w", padx=16).pack(fill=tk.X)
+            p["ok"] = ok_frame
 
-        count = len(issues)
-        red_c = sum(1 for _, s in issues if s == "red")
-        yel_c = sum(1 for _, s in issues if s == "yellow")
+            # Virtualized list: constant widget count however many issues
+            p["list"] = VirtualIssueList(body, self._show_guide)
 
-        tk.Label(hdr, text=f"   \u89c4\u5219\u68c0\u67e5\u7ed3\u679c\u62a5\u544a",
-                 font=F["h1"], bg=C["navy_dark"], fg="#ffffff", padx=12).pack(side=tk.LEFT)
+            # Close button
+            foot = tk.Frame(win, bg=C["surface2"],
+                            highlightbackground=C["border"], highlightthickness=1)
+            foot.pack(fill=tk.X, side=tk.BOTTOM)
+            mk_flat_btn(foot, "\u5173\u95ed", C["btn_neutral"],
+                        command=lambda: self._hide_popup("results"), width=8).pack(pady=10)
 
-        # Summary badges on header right
+        for w in p["badges"].winfo_children():
+            w.destroy()
         if count == 0:
-            tk.Label(hdr, text=" \u65e0\u7591\u70b9 ", font=F["small_b"],
+            tk.Label(p["badges"], text=" \u65e0\u7591\u70b9 ", font=F["small_b"],
                      bg=C["ok"], fg="#fff", padx=6, pady=3).pack(side=tk.RIGHT, padx=16)
         else:
             if red_c:
-                tk.Label(hdr, text=f" \u9ad8\u98ce\u9669 {red_c} ", font=F["small_b"],
+                tk.Label(p["badges"], text=f" \u9ad8\u98ce\u9669 {red_c} ", font=F["small_b"],
                          bg=C["danger"], fg="#fff", padx=6, pady=3).pack(side=tk.RIGHT, padx=4)
             if yel_c:
-                tk.Label(hdr, text=f" \u9700\u6838\u5b9e {yel_c} ", font=F["small_b"],
+                tk.Label(p["badges"], text=f" \u9700\u6838\u5b9e {yel_c} ", font=F["small_b"],
                          bg=C["warn"], fg="#fff", padx=6, pady=3).pack(side=tk.RIGHT, padx=4)
 
-        # Body
-        body = tk.Frame(win, bg=C["surface"])
-        body.pack(fill=tk.BOTH, expand=True)
-
-        # Summary strip
-        summ = tk.Frame(body, bg=C["surface2"],
-                        highlightbackground=C["border"], highlightthickness=1)
-        summ.pack(fill=tk.X, padx=20, pady=(14, 6))
         now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        tk.Label(summ,
-                 text=f"  \u68c0\u67e5\u65f6\u95f4\uff1a{now}    \u53d1\u73b0\u7591\u70b9\u5171 {count} \u6761",
-                 font=F["small"], bg=C["surface2"], fg=C["text_2"],
-                 pady=6, anchor="w").pack(side=tk.LEFT)
+        p["summary"].config(text=f"  \u68c0\u67e5\u65f6\u95f4\uff1a{now}    \u53d1\u73b0\u7591\u70b9\u5171 {count:,} \u6761"
+                 + (f"\uff08\u9ad8\u98ce\u9669 {red_c:,} / \u9700\u6838\u5b9e {yel_c:,}\uff09" if count else ""))
+        p["ok"].pack_forget()
+        p["list"].frame.pack_forget()
+        if peers:
+            p["peers"].config(text=peers)
+            p["peers"].pack(fill=tk.X, padx=22, pady=(0, 6))
+        else:
+            p["peers"].pack_forget()
 
         if count == 0:
-            ok_frame = tk.Frame(body, bg=C["ok_bg"],
-                                highlightbackground=C["ok"], highlightthickness=1)
-            ok_frame.pack(fill=tk.X, padx=20, pady=10)
-            tk.Label(ok_frame,
-                     text="  \u2714  \u672a\u53d1\u73b0\u4efb\u4f55\u7591\u70b9\uff0c\u6240\u6709\u6307\u6807\u5747\u5728\u6b63\u5e38\u8303\u56f4\u5185\u3002",
-                     font=F["body_b"], bg=C["ok_bg"], fg=C["ok"],
-                     pady=14, anchor="w", padx=16).pack(fill=tk.X)
+            p["ok"].pack(fill=tk.X, padx=20, pady=10)
+            return
+        p["list"].frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 6))
+
+        p["list"].set_items(issues)
+
+    def _show_guide(self, issue_msg):
+        guide = self._guide_text.get(issue_msg)
+        if guide is None:
+            lines = guide_lines(issue_msg)
+            guide = self._guide_text[issue_msg] = (
+                f"  {issue_msg}", tuple(lines), min(520, 180 + len(lines)*34))
+        head, lines, height = guide
+        win, p, fresh = self._popup("guide", "\u7591\u70b9\u5904\u7f6e\u6307\u5f15", 680, height)
+
+        if fresh:
+            tk.Label(p["hdr"], text="   \u7591\u70b9\u5904\u7f6e\u6307\u5f15",
+                     font=F["h1"], bg=C["navy_dark"], fg="#ffffff", padx=12).pack(side=tk.LEFT)
+
+            body = tk.Frame(win, bg=C["surface"], padx=24, pady=18)
+            body.pack(fill=tk.BOTH, expand=True)
+
+            # Issue label
+            iss_row = tk.Frame(body, bg=C["danger_bg"],
+                               highlightbackground=C["danger"], highlightthickness=1)
+            iss_row.pack(fill=tk.X, pady=(0, 14))
+            tk.Frame(iss_row, bg=C["danger"], width=4).pack(side=tk.LEFT, fill=tk.Y)
+            p["issue"] = tk.Label(iss_row, font=F["body_b"], bg=C["danger_bg"], fg=C["danger"],
+                                  wraplength=580, justify="left", padx=8, pady=10)
+            p["issue"].pack(side=tk.LEFT, fill=tk.X)
+
+            # Guide steps
+            tk.Label(body, text="\u5904\u7f6e\u6b65\u9aa4\u4e0e\u6838\u67e5\u8981\u70b9\uff1a",
+                     font=F["h2"], bg=C["surface"],
+                     fg=C["navy"]).pack(anchor="w", pady=(0, 6))
+            tk.Frame(body, bg=C["navy"], height=1).pack(fill=tk.X, pady=(0, 8))
+            p["steps"] = tk.Frame(body, bg=C["surface"])
+            p["steps"].pack(fill=tk.X)
+            p["rows"] = []
+
+            # Close button
+            mk_flat_btn(win, "\u5173\u95ed", C["btn_neutral"],
+                        command=lambda: self._hide_popup("guide"), width=8).pack(pady=14)
+
+        p["issue"].config(text=head)
+        # Reuse the step labels; grow the pool only for longer guides
+        rows = p["rows"]
+        while len(rows) < len(lines):
+            row = tk.Frame(p["steps"], bg=C["surface"])
+            lbl = tk.Label(row, font=F["body"], bg=C["surface"], fg=C["text"],
+                           anchor="w", justify="left", wraplength=580)
+            lbl.pack(anchor="w", padx=4)
+            rows.append((row, lbl))
+        for i, (row, lbl) in enumerate(rows):
+            if i < len(lines):
+                lbl.config(text=lines[i])
+                row.pack(fill=tk.X, pady=2)
+            else:
+                row.pack_forget()
+
+    def _show_console(self):
+        win, p, fresh = self._popup("console", "\u64cd\u4f5c\u63a7\u5236\u53f0", 860, 560)
+
+        if fresh:
+            tk.Label(p["hdr"], text="   \u64cd\u4f5c\u63a7\u5236\u53f0  \u2014  \u8fd0\u884c\u6307\u6807",
+                     font=F["h1"], bg=C["navy_dark"], fg="#ffffff", padx=12).pack(side=tk.LEFT)
+
+            body = tk.Frame(win, bg=C["surface"], padx=20, pady=12)
+            body.pack(fill=tk.BOTH, expand=True)
+
+            bar = tk.Frame(body, bg=C["surface2"],
+                           highlightbackground=C["border"], highlightthickness=1)
+            bar.pack(fill=tk.X, pady=(0, 10))
+            p["state"] = tk.Label(bar, font=F["small_b"], bg=C["surface2"], padx=10, pady=6)
+            p["state"].pack(side=tk.LEFT)
+            p["toggle"] = mk_flat_btn(bar, "", C["btn_primary"], width=8, padx=8, pady=4,
+                                      command=self._console_toggle)
+            p["toggle"].pack(side=tk.RIGHT, padx=4, pady=4)
+            for text, cmd in (("\u5bfc\u51fa\u2026", self._console_export),
+                              ("\u6e05\u96f6", self._console_reset),
+                              ("\u5237\u65b0", self._show_console)):
+                mk_flat_btn(bar, text, C["btn_neutral"], width=6, padx=8, pady=4,
+                            command=cmd).pack(side=tk.RIGHT, padx=4, pady=4)
+
+            def table(title, columns, height):
+                tk.Label(body, text=title, font=F["small_b"], bg=C["surface"],
+                         fg=C["text_3"]).pack(anchor="w")
+                tree = ttk.Treeview(body, columns=[c for c, _ in columns], show="headings",
+                                    height=height)
+                for i, (col, width) in enumerate(columns):
+                    tree.heading(col, text=col)
+                    tree.column(col, width=width, anchor="w" if i == 0 else "e")
+                tree.pack(fill=tk.X, pady=(2, 10))
+                return tree
+
+            p["phases"] = table("\u5404\u9636\u6bb5\u8017\u65f6", [
+                ("\u9636\u6bb5", 200), ("\u6b21\u6570", 90), ("\u5408\u8ba1 ms", 120),
+                ("p50 ms", 120), ("p95 ms", 120)], 5)
+            p["rules"] = table("\u5404\u89c4\u5219\u8017\u65f6\uff08\u8017\u65f6\u591a\u8005\u5728\u524d\uff09", [
+                ("\u89c4\u5219", 300), ("\u884c\u6570", 80), ("\u547d\u4e2d", 70),
+                ("\u5408\u8ba1 ms", 100), ("\u5355\u884c \u00b5s", 90), ("p95 ms", 90)], 9)
+
+            foot = tk.Frame(win, bg=C["surface2"],
+                            highlightbackground=C["border"], highlightthickness=1)
+            foot.pack(fill=tk.X, side=tk.BOTTOM)
+            mk_flat_btn(foot, "\u5173\u95ed", C["btn_neutral"],
+                        command=lambda: self._hide_popup("console"), width=8).pack(pady=10)
+
+        if METRICS.enabled:
+            p["state"].config(text="\u25cf \u6b63\u5728\u8bb0\u5f55\u5404\u9636\u6bb5\u4e0e\u5404\u89c4\u5219\u8017\u65f6", fg=C["ok"])
+            p["toggle"].config(text="\u505c\u6b62\u8bb0\u5f55")
         else:
-            # Scrollable list
-            cont = tk.Frame(body, bg=C["surface"])
-            cont.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 6))
-
-            cv = tk.Canvas(cont, bg=C["surface"], highlightthickness=0)
-            sb = ttk.Scrollbar(cont, orient="vertical",
-                               command=cv.yview, style="Gov.Vertical.TScrollbar")
-            cv.configure(yscrollcommand=sb.set)
+            p["state"].config(text="\u25cb \u672a\u8bb0\u5f55\uff08\u5f00\u542f\u540e\u518d\u8fd0\u884c\u89c4\u5219\u68c0\u67e5\uff09", fg=C["text_3"])
+            p["toggle"].config(text="\u5f00\u59cb\u8bb0\u5f55")
+
+        p["phases"].delete(*p["phases"].get_children())
+        for name, calls, total, p50, p95 in METRICS.phase_table():
+            p["phases"].insert("", tk.END, values=(
+                PHASE_TITLES.get(name, name), f"{calls:,}", f"{total * 1e3:,.2f}",
+                f"{p50 * 1e3:.3f}", f"{p95 * 1e3:.3f}"))
+        rules = active_ruleset().by_id
+        p["rules"].delete(*p["rules"].get_children())
+        for rid, calls, rows, hits, total, p95 in METRICS.rule_table():
+            title = rules[rid].message if rid in rules else rid
+            p["rules"].insert("", tk.END, values=(
+                title, f"{rows:,}", f"{hits:,}", f"{total * 1e3:,.2f}",
+                f"{total / rows * 1e6:.2f}" if rows else "-", f"{p95 * 1e3:.3f}"))
+
+    def _show_queue(self):
+        win, p, fresh = self._popup("queue", "\u98ce\u9669\u6392\u5e8f\u961f\u5217", 960, 580)
+
+        if fresh:
+            tk.Label(p["hdr"], text="   \u98ce\u9669\u6392\u5e8f\u961f\u5217  \u2014  \u4f18\u5148\u6838\u67e5",
+                     font=F["h1"], bg=C["navy_dark"], fg="#ffffff", padx=12).pack(side=tk.LEFT)
+
+            body = tk.Frame(win, bg=C["surface"], padx=20, pady=12)
+            body.pack(fill=tk.BOTH, expand=True)
+
+            bar = tk.Frame(body, bg=C["surface2"],
+                           highlightbackground=C["border"], highlightthickness=1)
+            bar.pack(fill=tk.X, pady=(0, 10))
+            p["state"] = tk.Label(bar, font=F["small"], bg=C["surface2"], fg=C["text_2"],
+                                  padx=10, pady=6)
+            p["state"].pack(side=tk.LEFT)
+            mk_flat_btn(bar, "\u5bfc\u51fa\u2026", C["btn_neutral"], width=6, padx=8, pady=4,
+                        command=self._queue_export).pack(side=tk.RIGHT, padx=4, pady=4)
+
+            columns = [("\u6392\u540d", 50), ("\u98ce\u9669\u5206", 70), ("\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801", 170),
+                       ("\u4f01\u4e1a\u540d\u79f0", 180), ("\u884c\u4e1a", 80), ("\u672a\u4eab\u4f18\u60e0", 100),
+                       ("\u7591\u70b9", 320)]
+            frame = tk.Frame(body, bg=C["surface"])
+            frame.pack(fill=tk.BOTH, expand=True)
+            tree = ttk.Treeview(frame, columns=[c for c, _ in columns], show="headings")
+            for col, width in columns:
+                tree.heading(col, text=col)
+                tree.column(col, width=width, anchor="e" if width <= 100 else "w",
+                            stretch=col == columns[-1][0])
+            sb = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+            tree.configure(yscrollcommand=sb.set)
             sb.pack(side=tk.RIGHT, fill=tk.Y)
-            cv.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-            lf = tk.Frame(cv, bg=C["surface"])
-            lf.bind("<Configure>",
-                lambda e: cv.configure(scrollregion=cv.bbox("all")))
-            cwin = cv.create_window((0, 0), window=lf, anchor="nw")
-            cv.bind("<Configure>", lambda e: cv.itemconfig(cwin, width=e.width))
-
-            for idx, (msg, sev) in enumerate(issues):
-                if sev == "red":
-                    bar_c, bg, fg, tag = C["danger"], C["danger_bg"], C["danger"], "\u9ad8\u98ce\u9669"
-                else:
-                    bar_c, bg, fg, tag = C["warn"], C["warn_bg"], C["warn"], "\u9700\u6838\u5b9e"
-
-                item_frame = tk.Frame(lf, bg=bg,
-                                      highlightbackground=C["border_dark"],
-                                      highlightthickness=1)
-                item_frame.pack(fill=tk.X, pady=3)
-
-                # Left severity bar
-                tk.Frame(item_frame, bg=bar_c, width=5).pack(side=tk.LEFT, fill=tk.Y)
-
-                # Index number
-                tk.Label(item_frame, text=f" {idx+1:02d} ",
-                         font=F["small_b"], bg=bar_c, fg="#fff",
-                         pady=10, padx=4).pack(side=tk.LEFT)
-
-                # Severity tag
-                tk.Label(item_frame, text=f" {tag} ",
-                         font=F["tag"], bg=fg, fg="#fff",
-                         padx=6, pady=3).pack(side=tk.LEFT, padx=(8, 4), pady=10)
-
-                # Message
-                tk.Label(item_frame, text=msg,
-                         font=F["body_b"], bg=bg, fg=C["text"],
-                         wraplength=440, justify="left",
-                         anchor="w").pack(side=tk.LEFT, padx=8, pady=10, fill=tk.X, expand=True)
-
-                # Guide button
-                if msg in ISSUE_GUIDE_MAP:
-                    gb = mk_flat_btn(item_frame, "\u5904\u7f6e\u6307\u5f15",
-                                     C["btn_primary"], command=lambda m=msg: self._show_guide(m),
-                                     width=8, padx=10, pady=6)
-                    gb.pack(side=tk.RIGHT, padx=10, pady=8)
-
-        # Close button
-        foot = tk.Frame(win, bg=C["surface2"],
-                        highlightbackground=C["border"], highlightthickness=1)
-        foot.pack(fill=tk.X, side=tk.BOTTOM)
-        mk_flat_btn(foot, "\u5173\u95ed", C["btn_neutral"],
-                    command=win.destroy, width=8).pack(pady=10)
+            tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+            tree.bind("<<TreeviewSelect>>", self._queue_select)
+            p["tree"] = tree
+            p["detail"] = tk.Label(body, font=F["small"], bg=C["surface"], fg=C["text_2"],
+                                   anchor="w", justify=tk.LEFT, wraplength=900)
+            p["detail"].pack(fill=tk.X, pady=(8, 0))
+
+            foot = tk.Frame(win, bg=C["surface2"],
+                            highlightbackground=C["border"], highlightthickness=1)
+            foot.pack(fill=tk.X, side=tk.BOTTOM)
+            mk_flat_btn(foot, "\u5173\u95ed", C["btn_neutral"],
+                        command=lambda: self._hide_popup("queue"), width=8).pack(pady=10)
+
+        q = self._queue
+        p["tree"].delete(*p["tree"].get_children())
+        p["detail"].config(text="")
+        if q is None:
+            p["state"].config(text="\u5c1a\u65e0\u6392\u5e8f\u7ed3\u679c \u2014 \u8bf7\u5148\u8fd0\u884c\u6279\u91cf\u68c0\u67e5")
+            return
+        p["state"].config(text=f"\u5171 {q.rows:,} \u6237\uff0c\u6709\u98ce\u9669\u5206 {q.scored:,} \u6237\uff0c"
+                               f"\u6309\u98ce\u9669\u5206\u5217\u51fa\u524d {len(q):,} \u6237")
+        for rank, score, row, code, company, industry, yuan, issues in queue_rows(q):
+            p["tree"].insert("", tk.END, iid=str(rank),
+                             values=(rank, score, code, company, industry, yuan, issues))
+
+    def _queue_select(self, event):
+        sel = event.widget.selection()
+        if not sel or self._queue is None:
+            return
+        rank, score, e = self._queue.ranked()[int(sel[0]) - 1]
+        self._popups["queue"][1]["detail"].config(
+            text=f"\u7b2c {e['row']} \u884c  {e['company']}  \u98ce\u9669\u5206 {score:.2f}\n{issue_text(e['issues'])}")
 
-    def _show_guide(self, issue_msg):
-        lines = ISSUE_GUIDE_MAP.get(issue_msg, [])
-        win, hdr = popup_base(self.root, "\u7591\u70b9\u5904\u7f6e\u6307\u5f15",
-                              680, min(520, 180 + len(lines)*34))
+    def _queue_export(self):
+        if not self._queue:
+            return
+        path = filedialog.asksaveasfilename(
+            parent=self._popups["queue"][0], title="\u5bfc\u51fa\u98ce\u9669\u6392\u5e8f\u961f\u5217",
+            defaultextension=".csv", filetypes=[("CSV", "*.csv")])
+        if not path:
+            return
+        try:
+            write_queue(path, self._queue)
+        except OSError as ex:
+            messagebox.showerror("\u9519\u8bef", f"\u961f\u5217\u5bfc\u51fa\u5931\u8d25\uff1a{ex}")
+            return
+        self._set_status(f"\u98ce\u9669\u6392\u5e8f\u961f\u5217\u5df2\u5bfc\u51fa \u2014 {path}")
 
-        tk.Label(hdr, text="   \u7591\u70b9\u5904\u7f6e\u6307\u5f15",
-                 font=F["h1"], bg=C["navy_dark"], fg="#ffffff", padx=12).pack(side=tk.LEFT)
+    def _show_sweep(self):
+        win, p, fresh = self._popup("sweep", "\u9608\u503c\u8bd5\u7b97", 960, 600)
 
-        body = tk.Frame(win, bg=C["surface"], padx=24, pady=18)
-        body.pack(fill=tk.BOTH, expand=True)
+        if fresh:
+            tk.Label(p["hdr"], text="   \u9608\u503c\u8bd5\u7b97  \u2014  \u547d\u4e2d\u6237\u6570\u968f\u9608\u503c\u53d8\u5316",
+                     font=F["h1"], bg=C["navy_dark"], fg="#ffffff", padx=12).pack(side=tk.LEFT)
 
-        # Issue label
-        iss_row = tk.Frame(body, bg=C["danger_bg"],
-                           highlightbackground=C["danger"], highlightthickness=1)
-        iss_row.pack(fill=tk.X, pady=(0, 14))
-        tk.Frame(iss_row, bg=C["danger"], width=4).pack(side=tk.LEFT, fill=tk.Y)
-        tk.Label(iss_row, text=f"  {issue_msg}",
-                 font=F["body_b"], bg=C["danger_bg"], fg=C["danger"],
-                 wraplength=580, justify="left",
-                 padx=8, pady=10).pack(side=tk.LEFT, fill=tk.X)
-
-        # Guide steps
-        tk.Label(body, text="\u5904\u7f6e\u6b65\u9aa4\u4e0e\u6838\u67e5\u8981\u70b9\uff1a",
-                 font=F["h2"], bg=C["surface"],
-                 fg=C["navy"]).pack(anchor="w", pady=(0, 6))
-        tk.Frame(body, bg=C["navy"], height=1).pack(fill=tk.X, pady=(0, 8))
-
-        for line in lines:
-            row = tk.Frame(body, bg=C["surface"])
-            row.pack(fill=tk.X, pady=2)
-            tk.Label(row, text=line, font=F["body"],
-                     bg=C["surface"], fg=C["text"],
-                     anchor="w", justify="left",
-                     wraplength=580).pack(anchor="w", padx=4)
+            body = tk.Frame(win, bg=C["surface"], padx=20, pady=12)
+            body.pack(fill=tk.BOTH, expand=True)
+
+            bar = tk.Frame(body, bg=C["surface2"],
+                           highlightbackground=C["border"], highlightthickness=1)
+            bar.pack(fill=tk.X, pady=(0, 8))
+            rules = active_ruleset().by_id
+            p["keys"] = list(SWEEPS)
+            p["choice"] = ttk.Combobox(bar, state="readonly", width=44, font=F["small"], values=[
+                f"{rules[rid].message if rid in rules else rid} \u00b7 {name}" for rid, name in p["keys"]])
+            p["choice"].current(0)
+            p["choice"].pack(side=tk.LEFT, padx=8, pady=6)
+            p["choice"].bind("<<ComboboxSelected>>", lambda e: self._sweep_draw())
+            p["by_industry"] = tk.BooleanVar(value=False)
+            tk.Checkbutton(bar, text="\u6309\u884c\u4e1a", variable=p["by_industry"], font=F["small"],
+                           bg=C["surface2"], command=self._sweep_draw).pack(side=tk.LEFT, padx=4)
+            p["load"] = mk_flat_btn(bar, "\u8f7d\u5165\u6570\u636e\u2026", C["btn_primary"], width=10, padx=8, pady=4,
+                                    command=self._sweep_load)
+            p["load"].pack(side=tk.RIGHT, padx=4, pady=4)
+
+            p["state"] = tk.Label(body, font=F["small"], bg=C["surface"], fg=C["text_2"], anchor="w")
+            p["state"].pack(fill=tk.X)
+            p["canvas"] = tk.Canvas(body, bg=C["surface"], highlightthickness=1,
+                                    highlightbackground=C["border"])
+            p["canvas"].pack(fill=tk.BOTH, expand=True, pady=(6, 6))
+            p["canvas"].bind("<Configure>", lambda e: self._sweep_draw())
+            p["canvas"].bind("<Motion>", self._sweep_hover)
+            p["readout"] = tk.Label(body, font=F["small_b"], bg=C["surface"], fg=C["navy"], anchor="w")
+            p["readout"].pack(fill=tk.X)
+
+            foot = tk.Frame(win, bg=C["surface2"],
+                            highlightbackground=C["border"], highlightthickness=1)
+            foot.pack(fill=tk.X, side=tk.BOTTOM)
+            mk_flat_btn(foot, "\u5173\u95ed", C["btn_neutral"],
+                        command=lambda: self._hide_popup("sweep"), width=8).pack(pady=10)
+
+        self._sweep_draw()
+
+    def _sweep_key(self):
+        p = self._popups["sweep"][1]
+        return p["keys"][p["choice"].current()]
+
+    def _sweep_draw(self):
+        p = self._popups["sweep"][1]
+        cv = p["canvas"]
+        cv.delete("all")
+        p["plot"] = None
+        sw = self._sweep
+        if sw is None:
+            if not self._tasks.busy:
+                p["state"].config(text="\u8bf7\u5148\u8f7d\u5165\u4e00\u4efd\u4f01\u4e1a\u6570\u636e\uff08.xlsx / .csv\uff09\uff0c\u518d\u9009\u62e9\u8981\u8bd5\u7b97\u7684\u89c4\u5219\u9608\u503c")
+            return
+        rule, name = self._sweep_key()
+        cur = sw.current(rule, name)
+        xs = sw.grid(rule, name, 200)
+        lines = [("\u5168\u90e8\u884c\u4e1a", sw.counts(rule, name, xs))]
+        if p["by_industry"].get():
+            lines += [(g or "\u672a\u77e5\u884c\u4e1a", sw.counts(rule, name, xs, g))
+                      for g in SWEEP_GROUPS if sw.eligible(rule, name, g)]
+        p["state"].config(text=f"\u5171 {sw.rows:,} \u6237\uff0c\u6b64\u9608\u503c\u51b3\u5b9a\u7684 {sw.eligible(rule, name):,} \u6237\uff1b"
+                               f"\u5f53\u524d\u9608\u503c {cur}\uff0c\u547d\u4e2d {sw.count(rule, name, cur):,} \u6237")
+
+        w, h = max(cv.winfo_width(), 200), max(cv.winfo_height(), 120)
+        left, right, top, bottom = 70, w - 20, 16, h - 34
+        x0, x1 = xs[0], xs[-1]
+        ymax = max(1, max(int(c.max()) for _, c in lines))
+
+        def px(x):
+            return left + (x - x0) / ((x1 - x0) or 1) * (right - left)
+
+        def py(y):
+            return bottom - y / ymax * (bottom - top)
+
+        cv.create_line(left, bottom, right, bottom, fill=C["border_dark"])
+        cv.create_line(left, top, left, bottom, fill=C["border_dark"])
+        for frac in (0, 0.25, 0.5, 0.75, 1):
+            y = py(ymax * frac)
+            cv.create_line(left - 4, y, left, y, fill=C["border_dark"])
+            cv.create_text(left - 8, y, text=f"{int(ymax * frac):,}", anchor="e",
+                           font=F["small"], fill=C["text_3"])
+            x = x0 + (x1 - x0) * frac
+            cv.create_text(px(x), bottom + 14, text=f"{x:,.4g}", font=F["small"], fill=C["text_3"])
+        cx = px(float(cur))
+        cv.create_line(cx, top, cx, bottom, fill=C["danger"], dash=(4, 3))
+        cv.create_text(cx + 4, top, text=f"\u5f53\u524d {cur}", anchor="nw", font=F["small"], fill=C["danger"])
+        for i, (label, counts) in enumerate(reversed(lines)):
+            color = SWEEP_COLORS[(len(lines) - 1 - i) % len(SWEEP_COLORS)]
+            pts = [v for x, c in zip(xs, counts.tolist()) for v in (px(x), py(c))]
+            cv.create_line(*pts, fill=color, width=2 if i == len(lines) - 1 else 1)
+        for i, (label, _) in enumerate(lines):
+            y = top + 4 + i * 16
+            cv.create_line(right - 120, y, right - 100, y, fill=SWEEP_COLORS[i % len(SWEEP_COLORS)], width=2)
+            cv.create_text(right - 94, y, text=label, anchor="w", font=F["small"], fill=C["text_2"])
+        p["plot"] = (rule, name, x0, x1, left, right)
+
+    def _sweep_hover(self, event):
+        p = self._popups["sweep"][1]
+        if not p.get("plot"):
+            return
+        rule, name, x0, x1, left, right = p["plot"]
+        if not left <= event.x <= right:
+            return
+        amount = SWEEPS[(rule, name)][1]
+        x = round(x0 + (event.x - left) / (right - left) * (x1 - x0), 2 if amount else 4)
+        cur = self._sweep.current(rule, name)
+        p["readout"].config(text=f"\u9608\u503c {x:,}\uff1a\u547d\u4e2d {self._sweep.count(rule, name, x):,} \u6237"
+                                 f"\uff08\u5f53\u524d {cur}\uff1a{self._sweep.count(rule, name, cur):,} \u6237\uff09")
+
+    def _sweep_load(self):
+        p = self._popups["sweep"][1]
+        if self._tasks.busy:
+            self._tasks.cancel()
+            return
+        src = filedialog.askopenfilename(
+            parent=self._popups["sweep"][0], title="\u9009\u62e9\u8bd5\u7b97\u6570\u636e",
+            filetypes=[("Excel / CSV", "*.xlsx *.xlsm *.csv"), ("\u6240\u6709\u6587\u4ef6", "*.*")])
+        if not src:
+            return
 
-        mk_flat_btn(win, "\u5173\u95ed", C["btn_neutral"],
-                    command=win.destroy, width=8).pack(pady=14)
+        def progress(done, total, text=None):
+            count = f"{done:,} / {total:,}" if total else f"{done:,}"
+            text = f"\u6b63\u5728\u8bfb\u53d6 {os.path.basename(src)} \u2014 \u5df2\u8bfb\u53d6 {count} \u884c"
+            p["state"].config(text=text)
+            self._set_status(text)
+
+        def finish(text, sweep=None):
+            p["load"].config(text="\u8f7d\u5165\u6570\u636e\u2026")
+            if sweep is not None:
+                self._sweep = sweep
+            self._set_status(text)
+            self._sweep_draw()
+
+        def failed(ex):
+            finish("\u8f7d\u5165\u5931\u8d25")
+            messagebox.showerror("\u9519\u8bef", f"\u9608\u503c\u8bd5\u7b97\u6570\u636e\u8f7d\u5165\u5f02\u5e38\uff1a{ex}",
+                                 parent=self._popups["sweep"][0])
+
+        p["load"].config(text="\u53d6\u6d88\u8f7d\u5165")
+        p["state"].config(text=f"\u6b63\u5728\u8bfb\u53d6 {os.path.basename(src)} \u2026")
+        self._tasks.submit(
+            lambda job: _sweep_job(job, src),
+            on_done=lambda sw: finish(f"\u9608\u503c\u8bd5\u7b97\u6570\u636e\u5df2\u8f7d\u5165 \u2014 {sw.rows:,} \u6237", sw),
+            on_error=failed, on_progress=progress,
+            on_cancel=lambda: finish("\u9608\u503c\u8bd5\u7b97\u6570\u636e\u8f7d\u5165\u5df2\u53d6\u6d88"))
+
+    def _console_toggle(self):
+        METRICS.enable(not METRICS.enabled)
+        self._show_console()
+
+    def _console_reset(self):
+        METRICS.reset()
+        self._show_console()
+
+    def _console_export(self):
+        path = filedialog.asksaveasfilename(
+            parent=self._popups["console"][0], title="\u5bfc\u51fa\u8fd0\u884c\u6307\u6807",
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("Prometheus \u6587\u672c", "*.prom")])
+        if not path:
+            return
+        try:
+            METRICS.write(path)
+        except OSError as ex:
+            messagebox.showerror("\u9519\u8bef", f"\u6307\u6807\u5bfc\u51fa\u5931\u8d25\uff1a{ex}")
+            return
+        self._set_status(f"\u8fd0\u884c\u6307\u6807\u5df2\u5bfc\u51fa \u2014 {path}")
 
     # ====================== Logic ======================
     def _num_hint(self, event):
@@ -927,12 +1365,32 @@ class TaxBenefitApp:
         widget = self.rule_inputs[key]
         if isinstance(widget, ttk.Combobox):
             raise ValueError(f"{key} \u662f\u4e0b\u62c9\u6846")
-        txt = widget.get().strip()
-        if not txt:
-            return Decimal("0")
-        if not re.match(r'^\d+(\.\d{1,2})?$', txt):
-            raise ValueError(f"\u300c{key}\u300d \u683c\u5f0f\u4e0d\u6b63\u786e\uff0c\u8bf7\u8f93\u5165\u6574\u6570\u6216\u4e24\u4f4d\u5c0f\u6570")
-        return Decimal(txt).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        return parse_dec(key, widget.get())
+
+    def _rule_record(self):
+        """Snapshot the rules card as a plain A-R record for the engine."""
+        return {key: self.rule_inputs[key].get() for key in FIELD_KEYS}
+
+    # ---------- Live risk ----------
+    def _live_edit(self, key):
+        self._live.set_field(key, self.rule_inputs[key].get())
+        if self._live_job is not None:
+            self.root.after_cancel(self._live_job)
+        self._live_job = self.root.after(LIVE_DEBOUNCE_MS, self._live_flush)
+
+    def _live_flush(self):
+        self._live_job = None
+        if self._live.flush():
+            self._update_risk_badge()
+
+    def _live_sync(self):
+        """Catch up with edits that raised no key event (paste, reset, load)."""
+        if self._live_job is not None:
+            self.root.after_cancel(self._live_job)
+            self._live_job = None
+        self._live.load(self._rule_record())
+        self._live.flush()
+        self._update_risk_badge()
 
     def _set_ro(self, entry, value, flag=False):
         entry.config(state="normal")
@@ -950,18 +1408,21 @@ class TaxBenefitApp:
         if not self.credit_code_entry.get().strip() or not self.company_name_entry.get().strip():
             messagebox.showwarning("\u63d0\u793a", "\u8bf7\u5148\u5b8c\u6210\u4e00\u3001\u4f01\u4e1a\u57fa\u672c\u4fe1\u606f\u586b\u5199")
             return
+        if self._credit_code() is None:
+            return
         try:
-            total = 0.0
-            any_diff = False
+            record = {}
             for item in self.tax_items:
                 refs = self.entries[item]
-                s = float(refs["should"].get().strip() or 0)
-                j = float(refs["enjoyed"].get().strip() or 0)
-                diff = max(0.0, s - j)
-                total += diff
+                record[should_key(item)] = refs["should"].get()
+                record[enjoyed_key(item)] = refs["enjoyed"].get()
+            diffs, total = compute_benefits(record)
+            any_diff = False
+            for item in self.tax_items:
+                diff = diffs[item]
                 if diff > 0:
                     any_diff = True
-                self._set_ro(refs["not_enjoyed"], f"{diff:,.2f}", diff > 0)
+                self._set_ro(self.entries[item]["not_enjoyed"], f"{diff:,.2f}", diff > 0)
 
             if any_diff:
                 self._set_status(f"\u67e5\u8be2\u5b8c\u6210 \u2014 \u603b\u672a\u4eab\u4f18\u60e0 \uffe5{total:,.2f} \u5143\uff0c\u5efa\u8bae\u5462\u5411\u4f01\u4e1a\u544a\u77e5")
@@ -976,66 +1437,12 @@ class TaxBenefitApp:
     # ---------- Rules ----------
     def run_rule_checks(self):
         try:
-            A   = self.rule_inputs["A_\u4e3b\u8425\u884c\u4e1a"].get().strip()
-            C_v = self._get_dec("C_\u8425\u4e1a\u6536\u5165")
-            D   = self._get_dec("D_\u9500\u552e\u6536\u5165")
-            E   = self._get_dec("E_\u6210\u672c")
-            F_v = self._get_dec("F_\u9500\u552e\u8d39\u7528")
-            G   = self._get_dec("G_\u7ba1\u7406\u8d39\u7528")
-            H   = self._get_dec("H_\u8d22\u52a1\u8d39\u7528")
-            I   = self._get_dec("I_\u5de5\u8d44\u85aa\u91d1")
-            J   = self._get_dec("J_\u4e2a\u7a0e\u6263\u7f34\u5de5\u8d44\u603b\u989d")
-            K   = self._get_dec("K_\u8ba1\u63d0\u6298\u65f7")
-            L   = self._get_dec("L_\u5f53\u671f\u5f00\u7968\u989d\u5ea6")
-            M   = self._get_dec("M_\u5f53\u671f\u53d7\u7968\u989d\u5ea6")
-            N   = self._get_dec("N_\u5370\u82b1\u7a0e\u8ba1\u7a0e\u4f9d\u636e")
-            O   = self._get_dec("O_\u7b80\u6613\u8ba1\u7a0e\u9500\u552e\u989d")
-            P   = self._get_dec("P_\u514d\u7a0e\u9500\u552e\u989d")
-            Q   = self._get_dec("Q_\u8fdb\u9879\u7a0e\u989d")
-            R   = self._get_dec("R_\u8fdb\u9879\u7a0e\u989d\u8f6c\u51fa")
-
-            yellow_keys = {
-                "\u8fdb\u4e00\u6b65\u6838\u5b9e\u7eb3\u7a0e\u4eba\u662f\u5426\u5c11\u8ba1\u5370\u82b1\u7a0e\u8ba1\u7a0e\u4f9d\u636e",
-                "\u5de5\u5546\u4e1a\u7eb3\u7a0e\u4eba\u6210\u672c\u8d39\u7528\u5360\u6bd4\u5f02\u5e38",
-                "\u670d\u52a1\u4e1a\u7eb3\u7a0e\u4eba\u6210\u672c\u8d39\u7528\u5360\u6bd4\u5f02\u5e38",
-                "\u7591\u4f3c\u591a\u5217\u5de5\u8d44\u85aa\u91d1\u652f\u51fa\u6216\u5c11\u6263\u7f34\u4e2a\u4eba\u6240\u5f97\u7a0e",
-                "\u7591\u4f3c\u5c11\u8f6c\u51fa\u7528\u4e8e\u7b80\u6613\u8ba1\u7a0e\u7684\u8fdb\u9879\u7a0e\u989d",
-            }
-            def ws(msg): return (msg, "yellow" if msg in yellow_keys else "red")
-            issues = []
-
-            if abs(D - C_v) > Decimal("100"):
-                issues.append(ws("\u540c\u671f\u7533\u62a5\u7684\u589e\u503c\u7a0e\u6536\u5165\u4e0e\u4f01\u4e1a\u6240\u5f97\u7a0e\u6536\u5165\u6709\u5dee\u5f02"))
-
-            if C_v > 0:
-                total_r = (E + F_v + G + H) / C_v
-                fee_r   = (F_v + G + H) / C_v
-                cost_r  = E / C_v
-                if A in {"\u6279\u53d1\u96f6\u552e", "\u5236\u9020"} and total_r >= Decimal("0.70"):
-                    issues.append(ws("\u5de5\u5546\u4e1a\u7eb3\u7a0e\u4eba\u6210\u672c\u8d39\u7528\u5360\u6bd4\u5f02\u5e38"))
-                    if cost_r > Decimal("0.50"): issues.append(ws("\u6210\u672c\u504f\u9ad8"))
-                    if fee_r  >= Decimal("0.50"): issues.append(ws("\u8d39\u7528\u504f\u9ad8"))
-                if A in {"\u751f\u6d3b\u670d\u52a1", "\u4ea4\u901a\u8fd0\u8f93"} and total_r >= Decimal("0.60"):
-                    issues.append(ws("\u670d\u52a1\u4e1a\u7eb3\u7a0e\u4eba\u6210\u672c\u8d39\u7528\u5360\u6bd4\u5f02\u5e38"))
-                    if cost_r > Decimal("0.50"): issues.append(ws("\u6210\u672c\u504f\u9ad8"))
-                    if fee_r  >= Decimal("0.50"): issues.append(ws("\u8d39\u7528\u504f\u9ad8"))
-
-            if (E + F_v + G + H - I - K - M) > Decimal("20000"):
-                issues.append(ws("\u7591\u4f3c\u672a\u53d6\u5f97\u5408\u6cd5\u6709\u6548\u51ed\u8bc1\u5217\u652f"))
-
-            if I >= Decimal("500000") and (I - J) >= Decimal("100000"):
-                issues.append(ws("\u7591\u4f3c\u591a\u5217\u5de5\u8d44\u85aa\u91d1\u652f\u51fa\u6216\u5c11\u6263\u7f34\u4e2a\u4eba\u6240\u5f97\u7a0e"))
-
-            base = C_v + E + F_v + G - I
-            if base >= Decimal("1000000") and N < base:
-                issues.append(ws("\u8fdb\u4e00\u6b65\u6838\u5b9e\u7eb3\u7a0e\u4eba\u662f\u5426\u5c11\u8ba1\u5370\u82b1\u7a0e\u8ba1\u7a0e\u4f9d\u636e"))
-
-            cands = [D, C_v, L]
-            ts = max(cands) if any(x > 0 for x in cands) else Decimal("0")
-            if Q > 0 and ts > 0:
-                exp = (Q * (O / ts)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-                if R + Decimal("0.01") < exp:
-                    issues.append(ws("\u7591\u4f3c\u5c11\u8f6c\u51fa\u7528\u4e8e\u7b80\u6613\u8ba1\u7a0e\u7684\u8fdb\u9879\u7a0e\u989d"))
+            with METRICS.phase("rules"):
+                self._live_sync()
+                error = self._live.first_error()
+                if error:
+                    raise ValueError(error)
+                issues = self._live.issues()
 
             count = len(issues)
             if count == 0:
@@ -1043,13 +1450,183 @@ class TaxBenefitApp:
             else:
                 red_c = sum(1 for _, s in issues if s == "red")
                 self._set_status(f"\u89c4\u5219\u68c0\u67e5\u5b8c\u6210 \u2014 \u53d1\u73b0 {count} \u6761\u7591\u70b9\uff0c\u5176\u4e2d\u9ad8\u98ce\u9669 {red_c} \u6761\uff0c\u8bf7\u5c3d\u5feb\u6838\u67e5")
-            self._show_results(issues)
+            with METRICS.phase("render"):
+                self._show_results(issues, self._peer_text())
 
         except ValueError as ex:
             messagebox.showerror("\u8f93\u5165\u9519\u8bef", str(ex))
         except Exception as ex:
             messagebox.showerror("\u7cfb\u7edf\u9519\u8bef", f"\u89c4\u5219\u68c0\u67e5\u5f02\u5e38\uff1a{ex}")
 
+    def _peer_text(self):
+        """Where the card stands among its industry in the last saved peer index."""
+        if self._peers is None:
+            try:
+                self._peers = PeerIndex.load() or False
+            except (OSError, ValueError, KeyError):
+                self._peers = False
+        if not self._peers:
+            return None
+        record = self._rule_record()
+        try:
+            found = self._peers.compare(record)
+        except ValueError:
+            return None
+        industry = record.get(INDUSTRY_KEY) or "\u672a\u77e5\u884c\u4e1a"
+        parts = [f"{METRIC_TITLES[m]} " + ("\u6837\u672c\u4e0d\u8db3" if pct is None else f"P{pct:.0f}")
+                 for m, (value, pct) in found.items()]
+        return (f"\u540c\u884c\u4e1a\u5bf9\u6bd4\uff08{industry}\uff0c{self._peers.count(industry):,} \u6237\uff09\uff1a"
+                + "  \u00b7  ".join(parts))
+
+    # ---------- Batch ----------
+    def run_batch(self):
+        if self._tasks.busy:
+            messagebox.showinfo("\u63d0\u793a", "\u6279\u91cf\u68c0\u67e5\u6b63\u5728\u8fdb\u884c\uff0c\u8bf7\u7b49\u5f85\u5b8c\u6210\u6216\u5148\u53d6\u6d88")
+            return
+        src = filedialog.askopenfilename(
+            title="\u9009\u62e9\u6279\u91cf\u68c0\u67e5\u6570\u636e",
+            filetypes=[("Excel / CSV", "*.xlsx *.xlsm *.csv"), ("\u6240\u6709\u6587\u4ef6", "*.*")])
+        if not src:
+            return
+        dst = filedialog.asksaveasfilename(
+            title="\u4fdd\u5b58\u68c0\u67e5\u7ed3\u679c", defaultextension=".xlsx",
+            initialfile=os.path.splitext(os.path.basename(src))[0] + "_\u68c0\u67e5\u7ed3\u679c.xlsx",
+            filetypes=[("Excel", "*.xlsx"), ("CSV", "*.csv"), ("JSON Lines", "*.jsonl")])
+        if not dst:
+            return
+
+        def done(result):
+            rows, flagged, errors, self._peers, self._queue = result
+            self._task_end(f"\u6279\u91cf\u68c0\u67e5\u5b8c\u6210 \u2014 \u5171 {rows:,} \u6237\uff0c\u6709\u7591\u70b9 {flagged:,} \u6237"
+                           + (f"\uff0c\u6570\u636e\u9519\u8bef {errors:,} \u884c" if errors else "") + f"\uff0c\u7ed3\u679c\u5df2\u5199\u5165 {dst}")
+            if len(self._queue):
+                self._show_queue()
+
+        def failed(ex):
+            self._task_end("\u6279\u91cf\u68c0\u67e5\u5931\u8d25")
+            messagebox.showerror("\u9519\u8bef", f"\u6279\u91cf\u68c0\u67e5\u5f02\u5e38\uff1a{ex}")
+
+        self._task_start("\u6279\u91cf\u68c0\u67e5\u51c6\u5907\u4e2d \u2014 \u6b63\u5728\u8bfb\u53d6\u6587\u4ef6")
+        self._tasks.submit(lambda job: _screen_job(job, src, dst),
+                           on_done=done, on_error=failed, on_progress=self._task_progress,
+                           on_cancel=lambda: self._task_end(f"\u6279\u91cf\u68c0\u67e5\u5df2\u53d6\u6d88 \u2014 \u5df2\u68c0\u67e5\u90e8\u5206\u5199\u5165 {dst}"))
+
+    def _task_start(self, text):
+        self._task_label.config(text=text)
+        self._task_bar.config(mode="indeterminate", value=0)
+        self._task_bar.start(60)
+        self._task_row.pack(fill=tk.X, pady=(0, 12))
+        self._set_status(text)
+
+    def _task_progress(self, done, total, text=None):
+        if total and self._task_bar.cget("mode") != "determinate":
+            self._task_bar.stop()
+            self._task_bar.config(mode="determinate", maximum=total)
+        if total:
+            self._task_bar.config(value=min(done, total))
+        text = text or progress_text(done, total)
+        self._task_label.config(text=text)
+        self._set_status(text)
+
+    def _task_end(self, text):
+        self._task_bar.stop()
+        self._task_row.pack_forget()
+        self._set_status(text)
+
+    # ---------- Cases ----------
+    def _case_store(self):
+        if self._store is None:
+            self._store = CaseStore()
+        return self._store
+
+    def _current_case(self):
+        self._live_sync()
+        benefits = {item: [refs["should"].get(), refs["enjoyed"].get(), refs["not_enjoyed"].get()]
+                    for item, refs in self.entries.items()}
+        return Case(normalize_credit_code(self.credit_code_entry.get()),
+                    self.rule_inputs[PERIOD_KEY].get().strip(),
+                    self.company_name_entry.get().strip(),
+                    self._rule_record(), benefits,
+                    [] if self._live.errors else self._live.issues(),
+                    active_ruleset().version)
+
+    def _credit_code(self):
+        """The entered credit code, normalized; None (after a warning) if invalid."""
+        code = self.credit_code_entry.get()
+        err = validate_credit_code(code)
+        if err:
+            messagebox.showwarning("\u63d0\u793a", err)
+            self.credit_code_entry.focus_set()
+            return None
+        return normalize_credit_code(code)
+
+    def save_case(self):
+        if not self.credit_code_entry.get().strip():
+            messagebox.showwarning("\u63d0\u793a", "\u8bf7\u5148\u586b\u5199\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801")
+            return
+        if self._credit_code() is None:
+            return
+        try:
+            case = self._current_case()
+            self._case_store().save(case)
+        except (sqlite3.Error, OSError, ValueError) as ex:
+            messagebox.showerror("\u9519\u8bef", f"\u6848\u4f8b\u4fdd\u5b58\u5931\u8d25\uff1a{ex}")
+            return
+        period = case.period or "\u672a\u586b\u671f\u95f4"
+        self._set_status(f"\u6848\u4f8b\u5df2\u4fdd\u5b58 \u2014 {case.credit_code}  {period}")
+
+    def load_case(self):
+        code = normalize_credit_code(self.credit_code_entry.get())
+        if not code:
+            messagebox.showwarning("\u63d0\u793a", "\u8bf7\u5148\u586b\u5199\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801")
+            return
+        period = self.rule_inputs[PERIOD_KEY].get().strip()
+        try:
+            case = self._case_store().load(code, period or None)
+        except (sqlite3.Error, OSError) as ex:
+            messagebox.showerror("\u9519\u8bef", f"\u6848\u4f8b\u8c03\u53d6\u5931\u8d25\uff1a{ex}")
+            return
+        if case is None:
+            messagebox.showinfo("\u8c03\u53d6\u6848\u4f8b", f"\u672a\u627e\u5230 {code} {period} \u7684\u5b58\u6863\u6848\u4f8b\u3002")
+            return
+        self._fill_case(case)
+        self._set_status(f"\u5df2\u8c03\u53d6\u6848\u4f8b \u2014 {case.credit_code}  {case.period}\uff0c\u5b58\u6863\u4e8e {case.updated_at}")
+
+    def _fill_case(self, case):
+        self.company_name_entry.delete(0, tk.END)
+        self.company_name_entry.insert(0, case.company)
+        for key, widget in self.rule_inputs.items():
+            value = case.record.get(key, "")
+            if isinstance(widget, ttk.Combobox):
+                widget.set(value or widget["values"][0])
+            else:
+                widget.delete(0, tk.END)
+                widget.insert(0, value)
+                widget.config(highlightbackground=C["input_border"])
+        for item in self.tax_items:
+            refs = self.entries[item]
+            should, enjoyed, not_enjoyed = case.benefits.get(item) or ("", "", "")
+            for name, value in (("should", should), ("enjoyed", enjoyed)):
+                refs[name].delete(0, tk.END)
+                refs[name].insert(0, value)
+            try:
+                diff = Decimal(not_enjoyed.replace(",", ""))
+            except InvalidOperation:
+                diff = None
+            if diff is not None:
+                self._set_ro(refs["not_enjoyed"], not_enjoyed, diff > 0)
+            else:
+                self._clear_ro(refs["not_enjoyed"])
+        self._live_sync()
+
+    def _clear_ro(self, entry):
+        entry.config(state="normal")
+        entry.delete(0, tk.END)
+        entry.config(state="readonly",
+                     fg=C["text_3"],
+                     readonlybackground=C["surface2"],
+                     highlightbackground=C["border"])
+
     # ---------- Reset ----------
     def reset_form(self):
         if not messagebox.askyesno("\u786e\u8ba4\u64cd\u4f5c",
@@ -1067,22 +1644,84 @@ class TaxBenefitApp:
             refs = self.entries[item]
             refs["should"].delete(0, tk.END)
             refs["enjoyed"].delete(0, tk.END)
-            refs["not_enjoyed"].config(state="normal")
-            refs["not_enjoyed"].delete(0, tk.END)
-            refs["not_enjoyed"].config(state="readonly",
-                                       fg=C["text_3"],
-                                       readonlybackground=C["surface2"],
-                                       highlightbackground=C["border"])
+            self._clear_ro(refs["not_enjoyed"])
+        self._live_sync()
         self._set_status("\u8868\u5355\u5df2\u91cd\u7f6e \u2014 \u8bf7\u91cd\u65b0\u5f55\u5165\u4f01\u4e1a\u4fe1\u606f")
         messagebox.showinfo("\u64cd\u4f5c\u5b8c\u6210", "\u8868\u5355\u5185\u5bb9\u5df2\u5168\u90e8\u6e05\u7a7a\u3002")
 
     # ---------- Exit ----------
     def exit_app(self):
-        if messagebox.askyesno("\u9000\u51fa\u786e\u8ba4", "\u786e\u5b9a\u8981\u9000\u51fa\u7cfb\u7edf\uff1f"):
+        question = "\u786e\u5b9a\u8981\u9000\u51fa\u7cfb\u7edf\uff1f"
+        if self._tasks.busy:
+            question = "\u6279\u91cf\u68c0\u67e5\u4ecd\u5728\u8fdb\u884c\uff0c\u9000\u51fa\u5c06\u53d6\u6d88\u8be5\u4efb\u52a1\u3002\n" + question
+        if messagebox.askyesno("\u9000\u51fa\u786e\u8ba4", question):
+            self._tasks.shutdown()
+            if self._store is not None:
+                self._store.close()
             self.root.quit()
             self.root.destroy()
 
 
+def _screen_job(job, src, dst):
+    """Screen ``src`` into ``dst`` on a ``TaskRunner`` thread; no Tk calls here."""
+    total = estimate_rows(src)
+    job.progress(0, total, force=True)
+    rows = flagged = errors = 0
+    peers = PeerIndex()
+    queue = RiskQueue()
+    pending = []
+    with ResultsSink(dst) as sink:
+        for sr in screen_parallel(iter_chunks(src), default_workers()):
+            job.check()
+            sink.add_screened(sr)
+            rows += 1
+            flagged += bool(sr.issues)
+            queue.add_screened(sr)
+            if sr.error is None:
+                pending.append(sr.record)
+                if len(pending) >= CHUNK_SIZE:
+                    peers.add_records(pending)
+                    pending = []
+            else:
+                errors += 1
+            job.progress(rows, total)
+    peers.add_records(pending)
+    job.progress(rows, total, force=True)
+    try:
+        peers.save()
+    except OSError:
+        pass
+    return rows, flagged, errors, peers, queue
+
+
+def _sweep_job(job, src):
+    """Load ``src`` into a ``ThresholdSweep`` on a ``TaskRunner`` thread,
+    through its column cache when one can be kept."""
+    sweep = ThresholdSweep()
+    total = estimate_rows(src)
+
+    def progress(rows):
+        job.check()
+        job.progress(rows, total)
+
+    try:
+        table = open_columns(src, progress=progress)
+    except OSError:
+        table = None
+    if table is not None:
+        with table:
+            for _, cols, keep in table.iter_columns():
+                job.check()
+                sweep.add_columns(cols, keep)
+    else:
+        for chunk in iter_chunks(src):
+            job.check()
+            sweep.add_records([record for _, record in chunk])
+            job.progress(sweep.rows + sweep.skipped, total)
+    sweep.counts(*next(iter(SWEEPS)), [0])   # sort here, not on the Tk thread
+    return sweep
+
+
 def main():
     root = tk.Tk()
     app = TaxBenefitApp(root)
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_DIRS = ("TAXAPP_CACHE_DIR", "TAXAPP_COLUMNS", "TAXAPP_PEERS", "TAXAPP_RESULT_CACHE",
+         "TAXAPP_DB", "TAXAPP_VAT_DB")
+
+
+@pytest.fixture(autouse=True)
+def _taxapp_env(tmp_path, monkeypatch):
+    """Keep every store and cache out of ~/.taxapp and use the built-in rules."""
+    for name in _DIRS:
+        monkeypatch.setenv(name, str(tmp_path / name.lower()))
+    monkeypatch.delenv("TAXAPP_RULES", raising=False)
+    import rule_table
+    monkeypatch.setattr(rule_table, "_active", None)
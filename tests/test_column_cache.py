@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import csv
+import os
+import random
+
+import numpy as np
+
+import column_cache
+from batch_import import COMPANY_NAME_KEY, CREDIT_CODE_KEY, iter_chunks
+from column_cache import ColumnTable, build, cache_path, open_columns
+from rule_columns import to_columns
+from rule_engine import FIELD_KEYS, INDUSTRY_CHOICES, INDUSTRY_KEY, NUMERIC_FIELDS
+
+HEADER = [CREDIT_CODE_KEY, COMPANY_NAME_KEY] + list(FIELD_KEYS)
+
+
+def _portfolio(path, n=50, seed=4):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        rec = {key: f"{rng.randrange(10 ** 7)}.{rng.randrange(100):02d}" for key in NUMERIC_FIELDS}
+        rec[INDUSTRY_KEY] = rng.choice(list(INDUSTRY_CHOICES) + ["\u4f4f\u5bbf\u9910\u996e", ""])
+        rec[CREDIT_CODE_KEY] = f"91310000MA{i:08d}"
+        rec[COMPANY_NAME_KEY] = f"\u6d4b\u8bd5\u4f01\u4e1a{i}\u53f7" if i % 5 else ""
+        rows.append(rec)
+    rows[3]["E_\u6210\u672c"] = "1.234"               # malformed
+    rows[7]["C_\u8425\u4e1a\u6536\u5165"] = "9" * 18   # past MAX_FEN
+    with open(path, "w", newline="", encoding="utf-8-sig") as fh:
+        w = csv.writer(fh)
+        w.writerow(HEADER)
+        for rec in rows:
+            w.writerow([rec.get(k, "") for k in HEADER])
+    return str(path)
+
+
+def _records(src):
+    return [item for chunk in iter_chunks(src) for item in chunk]
+
+
+def test_round_trip(tmp_path):
+    src = _portfolio(tmp_path / "p.csv")
+    items = _records(src)
+    errors = []
+    want = to_columns([rec for _, rec in items], errors)
+
+    path = build(src, str(tmp_path / "p.cols"), chunk_size=7)
+    with ColumnTable(path) as table:
+        assert len(table) == len(items)
+        assert table.row.tolist() == [n for n, _ in items]
+        got = table.columns()
+        for key in NUMERIC_FIELDS:
+            assert np.array_equal(got[key], want[key]), key
+        assert np.array_equal(got[INDUSTRY_KEY], want[INDUSTRY_KEY])
+        assert sorted(got["_fallback"]) == sorted(want["_fallback"]) == [7]
+        assert table.errors == {i: e for i, e in enumerate(errors) if e is not None}
+        assert list(table.valid()) == [e is None and i != 7 for i, e in enumerate(errors)]
+        for i, (_, rec) in enumerate(items):
+            assert table.credit_code(i) == rec[CREDIT_CODE_KEY]
+            assert table.company(i) == rec.get(COMPANY_NAME_KEY, "")
+            assert table.industry_name(i) == rec.get(INDUSTRY_KEY, "")
+
+        # slices re-base the fallback rows
+        start, cols, keep = list(table.iter_columns(chunk_size=5))[1]
+        assert start == 5 and list(cols["_fallback"]) == [2] and not keep[2]
+
+
+def test_open_reuses_until_the_source_changes(tmp_path, monkeypatch):
+    src = _portfolio(tmp_path / "p.csv")
+    calls = []
+    real_build = column_cache.build
+    monkeypatch.setattr(column_cache, "build", lambda *a, **k: calls.append(a) or real_build(*a, **k))
+
+    with open_columns(src) as table:
+        first = table.columns()["C_\u8425\u4e1a\u6536\u5165"].copy()
+    with open_columns(src) as table:
+        assert np.array_equal(table.columns()["C_\u8425\u4e1a\u6536\u5165"], first)
+    assert len(calls) == 1
+    assert os.path.dirname(cache_path(src)) == os.environ["TAXAPP_COLUMNS"]
+
+    _portfolio(src, n=20, seed=9)
+    with open_columns(src) as table:
+        assert len(table) == 20
+    assert len(calls) == 2
+
+
+def test_empty_source(tmp_path):
+    src = tmp_path / "empty.csv"
+    with open(src, "w", newline="", encoding="utf-8-sig") as fh:
+        csv.writer(fh).writerow(HEADER)
+    with open_columns(str(src)) as table:
+        assert len(table) == 0
+        assert len(table.columns()["C_\u8425\u4e1a\u6536\u5165"]) == 0
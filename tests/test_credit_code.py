@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import random
+
+from credit_code import CHARSET, CodeIndex, check_char, normalize, validate_many
+
+
+def _codes(n, seed=3):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        body = "91" + "".join(rng.choice(CHARSET) for _ in range(15))
+        code = body + check_char(body)
+        kind = rng.random()
+        if kind < 0.1 and out:
+            code = rng.choice(out)                                    # repeat
+        elif kind < 0.15:
+            code = code[:17] + ("1" if code[17] == "0" else "0")      # bad check
+        elif kind < 0.18:
+            code = code[:12]                                          # too short
+        elif kind < 0.25:
+            code = f" {code.lower()}"
+        out.append(code)
+    return out
+
+
+def test_index_matches_dict():
+    codes = _codes(3000)
+    index = CodeIndex(capacity=16)          # grows several times
+    ref, invalid, dups = {}, [], []
+    start = 0
+    for size in (1, 7, 500, 0, 1200, 1292):
+        batch = codes[start:start + size]
+        bad, rep = index.add_many(batch)
+        invalid += bad
+        dups += rep
+        start += size
+    assert start == len(codes) == index.offered
+
+    ok = validate_many(codes)
+    want_invalid, want_dups = [], []
+    for i, (code, good) in enumerate(zip(codes, ok)):
+        if not good:
+            want_invalid.append(i)
+        elif normalize(code) in ref:
+            want_dups.append((i, ref[normalize(code)]))
+        else:
+            ref[normalize(code)] = i
+    assert invalid == want_invalid and want_invalid
+    assert sorted(dups) == want_dups and want_dups
+    assert len(index) == len(ref)
+    for code in codes:
+        assert index.get(code) == ref.get(normalize(code))
+    assert index.lookup_many(codes).tolist() == [ref.get(normalize(c), -1) for c in codes]
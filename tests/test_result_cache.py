@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import random
+
+from batch_import import CREDIT_CODE_KEY
+from batch_parallel import screen_parallel
+from result_cache import ResultCache
+from rule_engine import INDUSTRY_CHOICES, INDUSTRY_KEY, NUMERIC_FIELDS, PERIOD_KEY
+from rule_table import DEFAULT_RULESET, compile_ruleset
+
+UNREAD_KEY = "P_\u514d\u7a0e\u9500\u552e\u989d"
+
+
+def _records(n, seed=6):
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        rec = {key: f"{rng.randrange(10 ** 7)}.{rng.randrange(100):02d}" for key in NUMERIC_FIELDS}
+        rec[INDUSTRY_KEY] = rng.choice(list(INDUSTRY_CHOICES))
+        rec[PERIOD_KEY] = "2024Q1"
+        rec[CREDIT_CODE_KEY] = f"91310000MA{i:08d}"
+        out.append(rec)
+    return out
+
+
+def _screen(records, cache=None):
+    chunks = [list(enumerate(records, 1))]
+    return [(r.row, r.issues, r.error) for r in screen_parallel(chunks, workers=1, cache=cache)]
+
+
+def test_cache_matches_uncached_screening(tmp_path):
+    rs = compile_ruleset(DEFAULT_RULESET, cache=False)
+    assert UNREAD_KEY not in rs.keys
+    clean = _records(200)
+    # the same figures a quarter later, one row with a bad amount no rule reads
+    later = [dict(rec, **{PERIOD_KEY: "2024Q2"}) for rec in clean]
+    later[5][UNREAD_KEY] = "abc"
+    later[9]["E_\u6210\u672c"] = "1.234"
+
+    path = str(tmp_path / "results.db")
+    with ResultCache(rs, path) as cache:
+        assert _screen(clean, cache) == _screen(clean)
+        assert cache.hits == 0
+    with ResultCache(rs, path) as cache:
+        got = _screen(later, cache)
+        assert cache.hits == len(later) - 2 and cache.misses == 2
+    assert got == _screen(later)
+    assert got[5][2] and got[9][2]
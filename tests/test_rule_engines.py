@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""The scalar engine, the live evaluator, the compiled (and cached) rule set
+and the column kernels must flag exactly the same rules on every record."""
+import copy
+import random
+
+import pytest
+
+import batch_import
+from live_rules import LiveEvaluator
+from rule_columns import evaluate_columns, issues_from_masks, supports, to_columns
+from rule_engine import INDUSTRY_CHOICES, INDUSTRY_KEY, NUMERIC_FIELDS, PERIOD_KEY, evaluate
+from rule_table import DEFAULT_RULESET, RuleError, compile_ruleset, set_active_ruleset
+
+EXTRA_INDUSTRY = "\u4f4f\u5bbf\u9910\u996e"
+
+
+def _amount(rng):
+    kind = rng.random()
+    if kind < 0.15:
+        return ""
+    if kind < 0.3:
+        return str(rng.randrange(0, 200))
+    if kind < 0.9:
+        return f"{rng.randrange(0, 3_000_000)}.{rng.randrange(100):02d}"
+    return str(rng.randrange(0, 10 ** 13))
+
+
+def random_records(n, seed=7):
+    rng = random.Random(seed)
+    industries = list(INDUSTRY_CHOICES) + [EXTRA_INDUSTRY, ""]
+    out = []
+    for _ in range(n):
+        rec = {key: _amount(rng) for key in NUMERIC_FIELDS}
+        rec[INDUSTRY_KEY] = rng.choice(industries)
+        rec[PERIOD_KEY] = rng.choice(["2024Q1", "2024Q2", ""])
+        # land some ratios and gaps exactly on their thresholds
+        c = rng.randrange(1, 1_000_000)
+        if rng.random() < 0.2:
+            rec["C_\u8425\u4e1a\u6536\u5165"] = str(c)
+            rec["E_\u6210\u672c"] = f"{c * 0.5:.2f}"
+        if rng.random() < 0.1:
+            rec["D_\u9500\u552e\u6536\u5165"] = f"{c + 100}"
+            rec["C_\u8425\u4e1a\u6536\u5165"] = str(c)
+        out.append(rec)
+    out.append(dict(out[0], **{"E_\u6210\u672c": "12.345"}))             # malformed
+    out.append(dict(out[1], **{"C_\u8425\u4e1a\u6536\u5165": "9" * 18}))  # past MAX_FEN
+    return out
+
+
+def _ruleset(edit=None):
+    data = copy.deepcopy(DEFAULT_RULESET)
+    if edit:
+        edit(data)
+    return compile_ruleset(data, cache=False)
+
+
+def _extra_service(data):
+    data["sets"]["service"].append(EXTRA_INDUSTRY)
+
+
+def _period_rule(data):
+    data["rules"].append({"id": "q1_wage", "message": "Q1 \u5de5\u8d44\u5f02\u5e38", "severity": "yellow",
+                          "predicate": "B == '2024Q1' and I > limit", "thresholds": {"limit": "100000"}})
+
+
+def _thresholds(data):
+    for rule in data["rules"]:
+        for name, value in rule.get("thresholds", {}).items():
+            rule["thresholds"][name] = str(float(value) * 0.37)
+
+
+RULESETS = {
+    "default": None,
+    "extra_service_industry": _extra_service,
+    "predicate_reads_B": _period_rule,
+    "moved_thresholds": _thresholds,
+}
+
+
+def _scalar(records, rs):
+    out = []
+    for rec in records:
+        try:
+            out.append(evaluate(rec, rs))
+        except ValueError:
+            out.append(None)
+    return out
+
+
+@pytest.mark.parametrize("name", sorted(RULESETS))
+def test_columns_match_scalar(name):
+    rs = _ruleset(RULESETS[name])
+    assert supports(rs) == (name in ("default", "moved_thresholds"))
+    records = random_records(3000)
+    expected = _scalar(records, rs)
+    assert sum(1 for e in expected if e) > 100
+
+    errors = []
+    cols = to_columns(records, errors)
+    found = list(issues_from_masks(evaluate_columns(cols, rs), rs))
+    assert [f if e is None else None for f, e in zip(found, errors)] == expected
+
+
+@pytest.mark.parametrize("name", sorted(RULESETS))
+def test_live_evaluator_matches_scalar(name):
+    rs = _ruleset(RULESETS[name])
+    live = LiveEvaluator(rs)
+    for rec, issues in zip(random_records(500, seed=11), _scalar(random_records(500, seed=11), rs)):
+        live.load(rec)
+        live.flush()
+        if issues is None:
+            assert live.first_error()
+        else:
+            assert live.issues() == issues
+
+
+def test_cached_compile_matches_fresh():
+    data = copy.deepcopy(DEFAULT_RULESET)
+    _extra_service(data)
+    fresh = compile_ruleset(data, cache=False)
+    compile_ruleset(data)              # writes the code cache
+    cached = compile_ruleset(data)     # loads it back
+    records = random_records(500, seed=3)
+    assert _scalar(records, cached) == _scalar(records, fresh)
+
+
+def test_screen_records_uses_active_ruleset():
+    rs = _ruleset(_extra_service)
+    set_active_ruleset(rs)
+    records = random_records(1000, seed=5)
+    results, errors = batch_import.screen_records(records)
+    assert results == _scalar(records, rs)
+    assert sum(e is not None for e in errors) == 1
+
+
+def test_columns_without_records_reject_custom_rules():
+    rs = _ruleset(_extra_service)
+    cols = to_columns(random_records(10)[:10])
+    del cols["_records"]
+    with pytest.raises(ValueError):
+        evaluate_columns(cols, rs)
+
+
+@pytest.mark.parametrize("value", ["abc", "NaN", "Infinity", "-inf", True, None])
+def test_bad_threshold_is_rule_error(value):
+    data = copy.deepcopy(DEFAULT_RULESET)
+    data["rules"][0]["thresholds"]["gap"] = value
+    with pytest.raises(RuleError, match="gap"):
+        compile_ruleset(data, cache=False)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import csv
+import random
+
+import pytest
+
+import source_join
+from batch_import import COMPANY_NAME_KEY, CREDIT_CODE_KEY
+from credit_code import CHARSET, check_char
+from source_join import SourceJoin
+
+C_KEY = "C_\u8425\u4e1a\u6536\u5165"
+D_KEY = "D_\u9500\u552e\u6536\u5165"
+
+
+def _codes(n, seed=1):
+    rng = random.Random(seed)
+    out = set()
+    while len(out) < n:
+        body = "91" + "".join(rng.choice(CHARSET) for _ in range(15))
+        out.add(body + check_char(body))
+    return sorted(out)
+
+
+def _write(path, header, rows):
+    with open(path, "w", newline="", encoding="utf-8-sig") as fh:
+        w = csv.writer(fh)
+        w.writerow(header)
+        w.writerows(rows)
+    return str(path)
+
+
+@pytest.mark.parametrize("run_rows", [7, 100_000])
+def test_join_matches_codes_across_formatting(tmp_path, monkeypatch, run_rows):
+    monkeypatch.setattr(source_join, "MAX_FAN_IN", 3)   # force multi-pass merges
+    codes = _codes(60)
+    rng = random.Random(2)
+    cit = [[c, f"\u4f01\u4e1a{i}", str(i)] for i, c in enumerate(codes)]
+    # the VAT system exports lower case with stray whitespace, in another order
+    vat = [[f"  {c.lower()} " if i % 2 else c.lower(), str(10 * i)] for i, c in enumerate(codes[:50])]
+    rng.shuffle(vat)
+    join = SourceJoin(run_rows=run_rows, tmpdir=str(tmp_path))
+    join.add("cit", _write(tmp_path / "cit.csv", [CREDIT_CODE_KEY, COMPANY_NAME_KEY, C_KEY], cit))
+    join.add("vat", _write(tmp_path / "vat.csv", [CREDIT_CODE_KEY, D_KEY], vat))
+
+    out = list(join.records())
+    assert [jr.credit_code for jr in out] == codes
+    for i, jr in enumerate(out):
+        assert jr.record[C_KEY] == str(i)
+        if i < 50:
+            assert jr.missing == ()
+            assert jr.record[D_KEY] == str(10 * i)
+        else:
+            assert jr.missing == ("vat",)
+    st = join.stats
+    assert (st.rows, st.joined, st.complete, st.duplicates, st.invalid) == (110, 60, 50, 0, 0)
+    assert st.missing == {"vat": 10}
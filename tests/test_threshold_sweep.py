@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import copy
+import random
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from rule_columns import evaluate_columns, to_columns
+from rule_engine import INDUSTRY_CHOICES, INDUSTRY_KEY, NUMERIC_FIELDS
+from rule_table import DEFAULT_RULESET, compile_ruleset
+from threshold_sweep import SWEEPS, ThresholdSweep
+
+
+def _records(n, seed=0):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        c = rng.randrange(1, 4_000_000_00)
+        rec = {key: f"{rng.randrange(0, c) / 100:.2f}" for key in NUMERIC_FIELDS}
+        rec["C_\u8425\u4e1a\u6536\u5165"] = f"{c / 100:.2f}"
+        rec[INDUSTRY_KEY] = rng.choice(list(INDUSTRY_CHOICES) + ["\u4f4f\u5bbf\u9910\u996e"])
+        pick = rng.random()
+        if pick < 0.1:      # cost exactly at a ratio threshold
+            rec["E_\u6210\u672c"] = f"{c * Decimal('0.005'):.2f}"
+        elif pick < 0.2:    # VAT and CIT revenue exactly 100 apart
+            rec["D_\u9500\u552e\u6536\u5165"] = f"{c / 100 + 100:.2f}"
+        elif pick < 0.3:    # wages exactly at wage_min
+            rec["I_\u5de5\u8d44\u85aa\u91d1"] = "500000"
+        out.append(rec)
+    out.append(dict(out[0], **{"E_\u6210\u672c": "bad"}))
+    out.append(dict(out[1], **{"C_\u8425\u4e1a\u6536\u5165": "9" * 18}))
+    return out
+
+
+@pytest.fixture(scope="module")
+def data():
+    records = _records(4000)
+    errors = []
+    cols = to_columns(records, errors)
+    keep = np.array([e is None for e in errors])
+    keep[list(cols["_fallback"])] = False
+    return records, cols, keep
+
+
+def _hits(cols, keep, ruleset, rule_id):
+    masks = evaluate_columns(cols, ruleset)
+    return int((masks[ruleset.by_id[rule_id].message] & keep).sum())
+
+
+def test_current_thresholds_match_rule_hits(data):
+    records, cols, keep = data
+    rs = compile_ruleset(DEFAULT_RULESET, cache=False)
+    sweep = ThresholdSweep(rs)
+    sweep.add_records(records)
+    assert sweep.skipped == 2 and sweep.rows == len(records) - 2
+    for rule_id, name in SWEEPS:
+        want = _hits(cols, keep, rs, rule_id)
+        assert sweep.count(rule_id, name, sweep.current(rule_id, name)) == want, (rule_id, name)
+        per_industry = sum(sweep.count(rule_id, name, sweep.current(rule_id, name), industry)
+                           for industry in list(INDUSTRY_CHOICES) + ["\u4f4f\u5bbf\u9910\u996e"])
+        assert per_industry == want, (rule_id, name)
+
+
+@pytest.mark.parametrize("factor", ["0", "0.37", "0.5", "1.01", "2"])
+def test_moved_threshold_matches_recompiled_rules(data, factor):
+    records, cols, keep = data
+    sweep = ThresholdSweep(compile_ruleset(DEFAULT_RULESET, cache=False))
+    sweep.add_records(records)
+    for rule_id, name in SWEEPS:
+        value = sweep.current(rule_id, name) * Decimal(factor)
+        edited = copy.deepcopy(DEFAULT_RULESET)
+        for rule in edited["rules"]:
+            if rule["id"] == rule_id:
+                rule["thresholds"][name] = str(value)
+        rs = compile_ruleset(edited, cache=False)
+        assert sweep.count(rule_id, name, value) == _hits(cols, keep, rs, rule_id), (rule_id, name)
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""What-if sweeps: how many enterprises a rule flags as one threshold moves.
+
+Every default rule compares one per-enterprise quantity with the threshold
+being tuned (``abs(D - C)`` with ``gap``, ``E / C`` with ``ratio``, ``I`` with
+``wage_min``...), while its other conditions stay fixed at the active rule
+set's values. ``ThresholdSweep`` computes that quantity once for the rows
+that pass the fixed part, sorts it per industry, and then answers "hits at
+X" with one ``searchsorted`` - a whole curve of hundreds of thresholds costs
+microseconds per point whatever the portfolio size.
+
+Amounts are integer fen and the threshold is cut to the fen exactly, so the
+count at the current value equals ``evaluate_columns``. Ratios are sorted as
+float64; the few values within rounding distance of a threshold are decided
+again by integer cross-multiplication. Rows the column engine would hand
+to the scalar path for sheer size (``MAX_FEN``) and rows with malformed
+amounts are left out.
+"""
+import math
+from fractions import Fraction
+
+import numpy as np
+
+from rule_columns import supports, to_columns
+from rule_engine import INDUSTRY_CHOICES, INDUSTRY_KEY
+from rule_table import active_ruleset
+
+# (rule id, threshold) -> (comparison of metric against it, amount in yuan?)
+SWEEPS = {
+    ("revenue_gap", "gap"):        (">", True),
+    ("trade_ratio", "ratio"):      (">=", False),
+    ("service_ratio", "ratio"):    (">=", False),
+    ("cost_high", "ratio"):        (">", False),
+    ("fee_high", "ratio"):         (">=", False),
+    ("voucher", "gap"):            (">", True),
+    ("wage", "wage_min"):          (">=", True),
+    ("wage", "gap"):               (">=", True),
+    ("stamp", "base_min"):         (">=", True),
+    ("input_vat", "tolerance"):    (">", True),
+}
+
+# industry codes as in rule_columns, unknown last
+GROUPS = tuple(INDUSTRY_CHOICES) + ("",)
+_RATIO_EPS = 1e-9
+
+
+def _col(cols, letter):
+    for key in cols:
+        if key.startswith(letter + "_"):
+            return cols[key]
+    raise KeyError(letter)
+
+
+def _round_half_up_div(a, b, den):
+    """``round_half_up(a * b / den)`` for int64 arrays whose product may exceed int64."""
+    x = a.astype(np.float64) * b / den
+    out = np.floor(x + 0.5)
+    # near a .5 tie float64 cannot tell; redo those rows in Python integers
+    near = np.flatnonzero(np.abs(x - np.floor(x) - 0.5) < 1e-6 * np.maximum(1.0, x))
+    for i in near.tolist():
+        out[i] = (2 * int(a[i]) * int(b[i]) + int(den[i])) // (2 * int(den[i]))
+    return out.astype(np.int64)
+
+
+def metrics(cols, ruleset):
+    """``{(rule, threshold): (eligible mask, metric)}``; a ratio metric is a
+    ``(numerator, denominator)`` pair of fen arrays with denominator > 0."""
+    th = {r.id: r.thresholds for r in ruleset.rules}
+    C, D, E, F, G, H, I, J, K, M, N, L, O, Q, R = (
+        _col(cols, x) for x in "CDEFGHIJKMNLOQR")
+    ind = cols[INDUSTRY_KEY]
+    fee = F + G + H
+    total = E + fee
+    has_c = C > 0
+    every = np.ones(len(C), dtype=bool)
+
+    def in_set(name):
+        codes = [INDUSTRY_CHOICES.index(a) for a in ruleset.sets.get(name, ())]
+        return np.isin(ind, codes)
+
+    def ratio_hits(rid, name):
+        r = Fraction(th[rid]["ratio"])
+        return has_c & in_set(name) & (r.denominator * total >= r.numerator * C)
+
+    ratio_hit = ratio_hits("trade_ratio", "trade") | ratio_hits("service_ratio", "service")
+    wage_min = Fraction(th["wage"]["wage_min"]) * 100
+    wage_gap = Fraction(th["wage"]["gap"]) * 100
+    base = C + E + F + G - I
+    ts = np.maximum(np.maximum(D, C), L)
+    live = (Q > 0) & (ts > 0)
+    safe_ts = np.where(live, ts, 1)
+    expected = np.where(live, _round_half_up_div(Q, np.where(live, O, 0), safe_ts), 0)
+    return {
+        ("revenue_gap", "gap"):     (every, np.abs(D - C)),
+        ("trade_ratio", "ratio"):   (has_c & in_set("trade"), (total, C)),
+        ("service_ratio", "ratio"): (has_c & in_set("service"), (total, C)),
+        ("cost_high", "ratio"):     (ratio_hit, (E, C)),
+        ("fee_high", "ratio"):      (ratio_hit, (fee, C)),
+        ("voucher", "gap"):         (every, total - I - K - M),
+        ("wage", "wage_min"):       (wage_gap.denominator * (I - J) >= wage_gap.numerator, I),
+        ("wage", "gap"):            (wage_min.denominator * I >= wage_min.numerator, I - J),
+        ("stamp", "base_min"):      (N < base, base),
+        ("input_vat", "tolerance"): (live, expected - R),
+    }
+
+
+class _Sorted:
+    """One metric's values for one industry, ascending."""
+    __slots__ = ("values", "num", "den")
+
+    def __init__(self, metric):
+        if isinstance(metric, tuple):
+            num, den = metric
+            r = num / den
+            order = np.argsort(r, kind="stable")
+            self.values, self.num, self.den = r[order], num[order], den[order]
+        else:
+            self.values = np.sort(metric)
+            self.num = self.den = None
+
+    def __len__(self):
+        return len(self.values)
+
+
+class ThresholdSweep:
+    """Sorted per-industry metrics for every sweepable rule threshold."""
+
+    def __init__(self, ruleset=None):
+        self.ruleset = rs = ruleset or active_ruleset()
+        if not supports(rs):
+            raise ValueError("\u89c4\u5219\u8868\u542b\u81ea\u5b9a\u4e49\u89c4\u5219\uff0c\u65e0\u6cd5\u8fdb\u884c\u9608\u503c\u8bd5\u7b97")
+        self.rows = 0
+        self.skipped = 0
+        self._parts = {key: [[] for _ in GROUPS] for key in SWEEPS}
+        self._sorted = None
+
+    # --------------------------------------------------
+    def add_records(self, records):
+        errors = []
+        cols = to_columns(records, errors)
+        keep = np.array([e is None for e in errors], dtype=bool)
+        for i in cols.get("_fallback") or ():
+            keep[i] = False
+        self.add_columns(cols, keep)
+
+    def add_columns(self, cols, keep=None):
+        """Add fen columns as from ``rule_columns.to_columns``; ``keep`` masks rows."""
+        n = len(cols[INDUSTRY_KEY])
+        if keep is None:
+            keep = np.ones(n, dtype=bool)
+        self.rows += int(keep.sum())
+        self.skipped += n - int(keep.sum())
+        groups = cols[INDUSTRY_KEY].astype(np.int64)
+        groups = np.where(groups < 0, len(GROUPS) - 1, groups)
+        for key, (eligible, metric) in metrics(cols, self.ruleset).items():
+            ok = eligible & keep
+            for g in np.unique(groups[ok]).tolist():
+                sel = ok & (groups == g)
+                if isinstance(metric, tuple):
+                    self._parts[key][g].append((metric[0][sel], metric[1][sel]))
+                else:
+                    self._parts[key][g].append(metric[sel])
+        self._sorted = None
+
+    def add_chunks(self, chunks):
+        """Feed ``batch_import.iter_chunks`` output."""
+        for chunk in chunks:
+            self.add_records([record for _, record in chunk])
+        return self
+
+    def _index(self):
+        if self._sorted is None:
+            out = {}
+            for key, per_group in self._parts.items():
+                row = []
+                for parts in per_group:
+                    if not parts:
+                        metric = np.zeros(0, dtype=np.int64)
+                        if not SWEEPS[key][1]:
+                            metric = (metric, metric)
+                    elif isinstance(parts[0], tuple):
+                        metric = (np.concatenate([p[0] for p in parts]),
+                                  np.concatenate([p[1] for p in parts]))
+                    else:
+                        metric = np.concatenate(parts)
+                    if parts:
+                        parts[:] = [metric]   # later adds concatenate onto one piece
+                    row.append(_Sorted(metric))
+                out[key] = row
+            self._sorted = out
+        return self._sorted
+
+    # --------------------------------------------------
+    def current(self, rule, name):
+        return self.ruleset.by_id[rule].thresholds[name]
+
+    def eligible(self, rule, name, industry=None):
+        """Rows the threshold decides for (the fixed conditions already hold)."""
+        return sum(len(s) for s in self._groups(rule, name, industry))
+
+    def _groups(self, rule, name, industry):
+        row = self._index()[(rule, name)]
+        if industry is None:
+            return row
+        return [row[GROUPS.index(industry) if industry in GROUPS else len(GROUPS) - 1]]
+
+    def counts(self, rule, name, thresholds, industry=None):
+        """Hits at each of ``thresholds`` (yuan or ratio; Decimal, str or float)
+        as an int64 array; ``industry`` None means every industry."""
+        op, amount = SWEEPS[(rule, name)]
+        fracs = [Fraction(str(x)) for x in thresholds]
+        out = np.zeros(len(fracs), dtype=np.int64)
+        for s in self._groups(rule, name, industry):
+            if not len(s):
+                continue
+            if amount:
+                out += len(s) - np.searchsorted(s.values, _cuts(fracs, op), side="left")
+            else:
+                out += _ratio_counts(s, fracs, op)
+        return out
+
+    def count(self, rule, name, threshold, industry=None):
+        return int(self.counts(rule, name, [threshold], industry)[0])
+
+    def grid(self, rule, name, steps=200, industry=None):
+        """``steps`` thresholds from 0 to a little past the 99th percentile,
+        the current value included."""
+        cur = float(self.current(rule, name))
+        op, amount = SWEEPS[(rule, name)]
+        vals = [s.values for s in self._groups(rule, name, industry) if len(s)]
+        top = cur * 2 or 1.0
+        if vals:
+            v = np.concatenate(vals)
+            top = max(top, float(np.quantile(v, 0.99)) / (100.0 if amount else 1.0) * 1.1)
+        xs = np.linspace(0.0, top, max(2, steps))
+        xs = np.unique(np.append(np.round(xs, 2 if amount else 4), cur))
+        return [float(x) for x in xs]
+
+
+def _cuts(fracs, op):
+    """Smallest integer fen that passes ``metric op threshold`` for each threshold."""
+    out = []
+    for f in fracs:
+        fen = f * 100
+        out.append(math.floor(fen) + 1 if op == ">" else math.ceil(fen))
+    return np.array(out, dtype=np.int64)
+
+
+def _ratio_counts(s, fracs, op):
+    xs = np.array([float(f) for f in fracs])
+    eps = _RATIO_EPS * np.maximum(1.0, np.abs(xs))
+    lo = np.searchsorted(s.values, xs - eps, side="left")
+    hi = np.searchsorted(s.values, xs + eps, side="right")
+    out = len(s) - hi
+    # values within rounding distance of the threshold: decide exactly
+    for j in np.flatnonzero(hi > lo).tolist():
+        p, q = fracs[j].numerator, fracs[j].denominator
+        for i in range(lo[j], hi[j]):
+            a, b = q * int(s.num[i]), p * int(s.den[i])
+            out[j] += a > b if op == ">" else a >= b
+    return out
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""Build D/O/P/Q/R from monthly \u589e\u503c\u7a0e\u7533\u62a5\u8868 rows.
+
+``FIELD_SOURCE_MAP`` defines the five VAT fields as per-month sums of return
+lines: D is lines 1+5+7+8, O line 5, P line 8, Q line 12, R line 13. ``VatStore``
+streams monthly rows for any number of taxpayers, hash-aggregates each batch
+in memory and folds it into per-(\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801, \u671f\u95f4) totals kept in SQLite.
+
+Ingest is incremental: each taxpayer-month is stored once, so appending a new
+month only adds its lines to the totals, and re-filing a month (\u66f4\u6b63\u7533\u62a5; the
+last row for a month wins) adds just the difference. Memory is bounded by the
+batch size, not by the number of rows or taxpayers.
+"""
+import datetime
+import os
+import re
+import sqlite3
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from rule_engine import PERIOD_KEY
+from batch_import import CREDIT_CODE_KEY, HEADER_ALIASES, iter_rows, _cell_text
+
+LINES = (1, 5, 7, 8, 12, 13)
+
+# Rule-input field -> VAT return lines summed into it
+FIELD_LINES = {
+    "D_\u9500\u552e\u6536\u5165":       (1, 5, 7, 8),
+    "O_\u7b80\u6613\u8ba1\u7a0e\u9500\u552e\u989d": (5,),
+    "P_\u514d\u7a0e\u9500\u552e\u989d":     (8,),
+    "Q_\u8fdb\u9879\u7a0e\u989d":       (12,),
+    "R_\u8fdb\u9879\u7a0e\u989d\u8f6c\u51fa":   (13,),
+}
+VAT_FIELDS = tuple(FIELD_LINES)
+
+MONTH_KEY = "\u6240\u5c5e\u671f"
+GRANULARITIES = ("year", "quarter", "month")
+BATCH_ROWS = 50000
+_IN_CHUNK = 500
+
+IngestStats = namedtuple("IngestStats", "rows months errors messages")
+
+_MONTH_RE = re.compile(r'^(\d{4})\s*[-/.\u5e74]?\s*(\d{1,2})(?!\d)')
+_CENT = Decimal("0.01")
+
+
+def _vat_aliases():
+    aliases = {a: k for a, k in HEADER_ALIASES.items() if k == CREDIT_CODE_KEY}
+    for alias in (MONTH_KEY, "\u7a0e\u6b3e\u6240\u5c5e\u671f", "\u7a0e\u6b3e\u6240\u5c5e\u671f\u8d77", "\u6240\u5c5e\u6708\u4efd", "\u6708\u4efd", "\u7533\u62a5\u6240\u5c5e\u671f"):
+        aliases[alias] = MONTH_KEY
+    for n in LINES:
+        for alias in (f"\u7b2c{n}\u680f", f"{n}\u680f", f"\u680f\u6b21{n}", f"line{n}", f"L{n}", str(n)):
+            aliases[alias] = n
+    return aliases
+
+
+VAT_ALIASES = _vat_aliases()
+
+
+def parse_month(value):
+    """Return ``(year, month)`` from ``2024-03``, ``202403``, ``2024\u5e743\u6708`` or a date."""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.year, value.month
+    m = _MONTH_RE.match(str(value or "").strip())
+    if not m or not 1 <= int(m.group(2)) <= 12:
+        raise ValueError(f"\u300c{MONTH_KEY}\u300d \u65e0\u6cd5\u8bc6\u522b\uff1a{value!r}")
+    return int(m.group(1)), int(m.group(2))
+
+
+def period_of(year, month, granularity="year"):
+    if granularity == "year":
+        return f"{year}"
+    if granularity == "quarter":
+        return f"{year}Q{(month - 1) // 3 + 1}"
+    return f"{year}-{month:02d}"
+
+
+def parse_line(n, value):
+    """One return line in fen; signed, because corrections can be negative."""
+    txt = str(value if value is not None else "").replace(",", "").strip()
+    if not txt:
+        return 0
+    whole, dot, cents = txt.partition(".")
+    if whole.isdigit() and whole.isascii() and len(cents) <= 2 and (cents.isdigit() or not dot):
+        return int(whole) * 100 + int(cents.ljust(2, "0"))
+    try:
+        amt = Decimal(txt)
+    except InvalidOperation:
+        raise ValueError(f"\u7b2c{n}\u680f \u91d1\u989d\u683c\u5f0f\u4e0d\u6b63\u786e\uff1a{value!r}") from None
+    if not amt.is_finite():
+        raise ValueError(f"\u7b2c{n}\u680f \u91d1\u989d\u683c\u5f0f\u4e0d\u6b63\u786e\uff1a{value!r}")
+    return int(amt.quantize(_CENT, rounding=ROUND_HALF_UP) * 100)
+
+
+def fen_text(fen):
+    sign = "-" if fen < 0 else ""
+    fen = abs(fen)
+    return f"{sign}{fen // 100}.{fen % 100:02d}"
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vat_months (
+    credit_code TEXT NOT NULL,
+    month       TEXT NOT NULL,
+    l1 INTEGER NOT NULL, l5 INTEGER NOT NULL, l7 INTEGER NOT NULL,
+    l8 INTEGER NOT NULL, l12 INTEGER NOT NULL, l13 INTEGER NOT NULL,
+    PRIMARY KEY (credit_code, month)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS vat_totals (
+    credit_code TEXT NOT NULL,
+    period      TEXT NOT NULL,
+    d INTEGER NOT NULL, o INTEGER NOT NULL, p INTEGER NOT NULL,
+    q INTEGER NOT NULL, r INTEGER NOT NULL,
+    months INTEGER NOT NULL,
+    PRIMARY KEY (credit_code, period)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+_ADD_TOTALS = """
+INSERT INTO vat_totals VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (credit_code, period) DO UPDATE SET
+    d = d + excluded.d, o = o + excluded.o, p = p + excluded.p,
+    q = q + excluded.q, r = r + excluded.r, months = months + excluded.months
+"""
+
+
+class VatStore:
+    """Per-(credit code, period) VAT totals in a SQLite file.
+
+    ``granularity`` (year / quarter / month) decides what a period is and is
+    fixed when the database is created.
+    """
+
+    def __init__(self, path=None, granularity="year", batch_rows=BATCH_ROWS):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"\u4e0d\u652f\u6301\u7684\u671f\u95f4\u7c92\u5ea6\uff1a{granularity}")
+        self.path = path or default_path()
+        self.batch_rows = batch_rows
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'granularity'").fetchone()
+        if row is None:
+            self.conn.execute("INSERT INTO meta VALUES ('granularity', ?)", (granularity,))
+        elif row[0] != granularity:
+            raise ValueError(f"{self.path} \u6309 {row[0]} \u6c47\u603b\uff0c\u4e0d\u80fd\u6309 {granularity} \u8ffd\u52a0")
+        self.granularity = granularity
+
+    # --------------------------------------------------
+    def ingest_rows(self, rows, progress=None):
+        """Fold raw rows (header first, as from ``batch_import.iter_rows``) into the totals."""
+        rows = iter(rows)
+        header = next(rows, None)
+        if header is None:
+            return IngestStats(0, 0, 0, [])
+        keys = [VAT_ALIASES.get(str(h).strip()) if h is not None else None for h in header]
+        if CREDIT_CODE_KEY not in keys or MONTH_KEY not in keys:
+            raise ValueError("\u672a\u8bc6\u522b\u5230\u300c\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801\u300d\u4e0e\u300c\u6240\u5c5e\u671f\u300d\u5217\uff0c\u8bf7\u68c0\u67e5\u8868\u5934")
+        if not any(isinstance(k, int) for k in keys):
+            raise ValueError("\u672a\u8bc6\u522b\u5230\u7533\u62a5\u8868\u680f\u6b21\u5217\uff08\u7b2c1\u30015\u30017\u30018\u300112\u300113\u680f\uff09")
+
+        total = months = errors = 0
+        messages = []
+        batch = {}
+        for n, row in enumerate(rows, start=2):
+            rec = {}
+            for key, value in zip(keys, row):
+                if key is not None:
+                    rec[key] = value
+            code = _cell_text(rec.get(CREDIT_CODE_KEY))
+            if not code and not any(_cell_text(v) for v in rec.values()):
+                continue
+            total += 1
+            try:
+                if not code:
+                    raise ValueError("\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801\u4e3a\u7a7a")
+                year, month = parse_month(rec.get(MONTH_KEY))
+                lines = tuple(parse_line(ln, rec.get(ln)) for ln in LINES)
+            except ValueError as ex:
+                errors += 1
+                if len(messages) < 20:
+                    messages.append(f"\u7b2c {n} \u884c\uff1a{ex}")
+                continue
+            batch[(code, f"{year}-{month:02d}")] = lines   # a re-filed month replaces
+            if len(batch) >= self.batch_rows:
+                months += self._fold(batch)
+                batch.clear()
+                if progress:
+                    progress(total)
+        if batch:
+            months += self._fold(batch)
+            if progress:
+                progress(total)
+        return IngestStats(total, months, errors, messages)
+
+    def ingest_file(self, path, sheet=None, encoding="utf-8-sig", progress=None):
+        return self.ingest_rows(iter_rows(path, sheet, encoding), progress)
+
+    def _fold(self, batch):
+        """Merge one batch of ``{(code, month): lines}``; return the number of new months."""
+        by_month = {}
+        for code, month in batch:
+            by_month.setdefault(month, []).append(code)
+        old = {}
+        for month, codes in by_month.items():
+            for i in range(0, len(codes), _IN_CHUNK):
+                part = codes[i:i + _IN_CHUNK]
+                marks = ",".join("?" * len(part))
+                for code, *lines in self.conn.execute(
+                        "SELECT credit_code, l1, l5, l7, l8, l12, l13 FROM vat_months "
+                        f"WHERE credit_code IN ({marks}) AND month = ?", part + [month]):
+                    old[(code, month)] = tuple(lines)
+
+        deltas = {}   # (code, period) -> [d, o, p, q, r, months]
+        periods = {}
+        new = 0
+        for (code, month), lines in batch.items():
+            prev = old.get((code, month))
+            if prev is None:
+                new += 1
+                l1, l5, l7, l8, l12, l13 = lines
+            else:
+                if prev == lines:
+                    continue
+                l1, l5, l7, l8, l12, l13 = [a - b for a, b in zip(lines, prev)]
+            key = (code, periods.get(month) or periods.setdefault(
+                month, period_of(int(month[:4]), int(month[5:]), self.granularity)))
+            acc = deltas.get(key)
+            if acc is None:
+                acc = deltas[key] = [0, 0, 0, 0, 0, 0]
+            # FIELD_LINES, unrolled: D = 1+5+7+8, O = 5, P = 8, Q = 12, R = 13
+            acc[0] += l1 + l5 + l7 + l8
+            acc[1] += l5
+            acc[2] += l8
+            acc[3] += l12
+            acc[4] += l13
+            acc[5] += prev is None
+
+        self.conn.execute("BEGIN")
+        try:
+            self.conn.executemany("INSERT OR REPLACE INTO vat_months VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                  [k + v for k, v in batch.items()])
+            self.conn.executemany(_ADD_TOTALS, [k + tuple(v) for k, v in deltas.items()])
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return new
+
+    # --------------------------------------------------
+    def totals(self, period=None):
+        """Yield rule-input records ``{\u793e\u4f1a\u4fe1\u7528\u4ee3\u7801, B_\u671f\u95f4, D..R}`` as yuan text."""
+        sql = "SELECT credit_code, period, d, o, p, q, r FROM vat_totals"
+        args = ()
+        if period:
+            sql += " WHERE period = ?"
+            args = (str(period),)
+        for code, per, *fen in self.conn.execute(sql + " ORDER BY credit_code, period", args):
+            rec = {CREDIT_CODE_KEY: code, PERIOD_KEY: per}
+            rec.update(zip(VAT_FIELDS, map(fen_text, fen)))
+            yield rec
+
+    def fields_for(self, credit_code, period):
+        """The five VAT fields for one taxpayer-period, or None when nothing is on file."""
+        row = self.conn.execute(
+            "SELECT d, o, p, q, r FROM vat_totals WHERE credit_code = ? AND period = ?",
+            (str(credit_code).strip(), str(period).strip())).fetchone()
+        return dict(zip(VAT_FIELDS, map(fen_text, row))) if row else None
+
+    def export_csv(self, path, period=None, encoding="utf-8-sig"):
+        """Write the totals in a layout ``screen --input`` reads; return the row count."""
+        import csv
+        n = 0
+        with open(path, "w", newline="", encoding=encoding) as fh:
+            w = csv.writer(fh)
+            w.writerow([CREDIT_CODE_KEY, PERIOD_KEY] + list(VAT_FIELDS))
+            for rec in self.totals(period):
+                w.writerow([rec[CREDIT_CODE_KEY], rec[PERIOD_KEY]] + [rec[f] for f in VAT_FIELDS])
+                n += 1
+        return n
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def default_path():
+    return os.environ.get("TAXAPP_VAT_DB") or os.path.join(
+        os.path.expanduser("~"), ".taxapp", "vat.db")